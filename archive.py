@@ -0,0 +1,257 @@
+import os
+import re
+import sqlite3
+import time
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+DAY_FOLDER_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# Arşiv klasör düzeni: <arşiv>/date=YYYY-MM-DD/saw=<testere>/part-0.parquet
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string()), ("saw", pa.string())]), flavor="hive")
+
+
+def arrow_schema(columns):
+    """
+    config.yaml sütunlarından Arrow şeması oluşturur. Tüm günlerin dosyaları
+    aynı şemayla yazılır, böylece birden fazla gün tek veri kümesi olarak okunabilir.
+    :param columns: Sütun adı -> veri tipi sözlüğü
+    """
+    fields = []
+    for col, dtype in columns.items():
+        dtype = dtype.upper()
+        if col == "timestamp":
+            fields.append(pa.field(col, pa.timestamp("ms")))
+        elif "INTEGER" in dtype:
+            fields.append(pa.field(col, pa.int64()))
+        elif "REAL" in dtype:
+            fields.append(pa.field(col, pa.float64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def find_day_sources(day_folder, total_database_name, default_saw_name):
+    """
+    Günlük klasördeki testere veritabanlarını bulur. Tek testerede veritabanı
+    doğrudan günlük klasörde, birden fazla testerede testere adlı alt klasörlerde bulunur.
+    :return: [(testere adı, veritabanı yolu), ...]
+    """
+    sources = []
+    database_path = os.path.join(day_folder, total_database_name)
+    if os.path.exists(database_path):
+        sources.append((default_saw_name, database_path))
+    for entry in sorted(os.listdir(day_folder)):
+        database_path = os.path.join(day_folder, entry, total_database_name)
+        if os.path.isdir(os.path.join(day_folder, entry)) and os.path.exists(database_path):
+            sources.append((entry, database_path))
+    return sources
+
+
+def finished_days(base_path, today=None):
+    """
+    Bugünden önceki (yazımı bitmiş) günlük klasörleri döndürür.
+    """
+    today = (today or date.today()).isoformat()
+    if not os.path.isdir(base_path):
+        return []
+    return sorted(entry for entry in os.listdir(base_path)
+                  if DAY_FOLDER_PATTERN.match(entry) and entry < today
+                  and os.path.isdir(os.path.join(base_path, entry)))
+
+
+def compact_database(database_path, output_path, columns, row_group_size=65536, compression="zstd"):
+    """
+    Bir testerenin günlük SQLite veritabanını sıkıştırılmış Parquet dosyasına çevirir.
+    Tablo parça parça okunur, her parça bir row group olarak yazılır; row group
+    istatistikleri sayesinde zaman aralığı sorguları ilgisiz grupları okumaz.
+    Dosya önce geçici adla yazılır ve tamamlandığında yerine taşınır.
+    :return: Yazılan satır sayısı
+    """
+    schema = arrow_schema(columns)
+    temp_path = output_path + ".tmp"
+    rows = 0
+    conn = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    try:
+        existing = [row[1] for row in conn.execute("PRAGMA table_info(imas_testere)")]
+        selected = [col for col in columns if col in existing]
+        if not selected:
+            return 0
+        query = "SELECT {} FROM imas_testere ORDER BY rowid".format(", ".join(selected))
+        with pq.ParquetWriter(temp_path, schema, compression=compression) as writer:
+            for chunk in pd.read_sql_query(query, conn, chunksize=row_group_size):
+                for col in columns:
+                    if col not in chunk:
+                        chunk[col] = None  # Eski günlerde olmayan sütunlar boş yazılır
+                if "timestamp" in chunk:
+                    chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], format=TIMESTAMP_FORMAT, errors="coerce")
+                for field in schema:
+                    if pa.types.is_string(field.type):
+                        # SQLite TEXT sütunlarında sayı olarak saklanmış değerler olabilir
+                        chunk[field.name] = chunk[field.name].map(lambda value: None if value is None else str(value))
+                writer.write_table(pa.Table.from_pandas(chunk[list(columns)], schema=schema, preserve_index=False))
+                rows += len(chunk)
+    finally:
+        conn.close()
+    os.replace(temp_path, output_path)
+    return rows
+
+
+def last_modified(database_path):
+    # WAL modunda son yazmalar -wal dosyasında olabilir
+    paths = [database_path, database_path + "-wal"]
+    return max(os.path.getmtime(path) for path in paths if os.path.exists(path))
+
+
+def compact_day(day_folder, archive_root, columns, total_database_name="total.db", default_saw_name="testere",
+                row_group_size=65536, compression="zstd", delete_source=False, min_idle_s=600):
+    """
+    Bir günün tüm testere veritabanlarını arşive yazar. Arşivde zaten bulunan
+    testere/gün bölümleri atlanır. Uygulama gece yarısından sonra da başladığı
+    günün klasörüne yazmaya devam ettiğinden, son `min_idle_s` saniye içinde
+    değişmiş veritabanları henüz arşivlenmez.
+    :return: Testere adı -> yazılan satır sayısı
+    """
+    day = os.path.basename(os.path.normpath(day_folder))
+    written = {}
+    for saw_name, database_path in find_day_sources(day_folder, total_database_name, default_saw_name):
+        partition = os.path.join(archive_root, f"date={day}", f"saw={saw_name}")
+        output_path = os.path.join(partition, "part-0.parquet")
+        if os.path.exists(output_path) or time.time() - last_modified(database_path) < min_idle_s:
+            continue
+        os.makedirs(partition, exist_ok=True)
+        written[saw_name] = compact_database(database_path, output_path, columns, row_group_size, compression)
+        if delete_source:
+            os.remove(database_path)
+    return written
+
+
+class ArchiveCompactor:
+    """
+    Biten günlerin veritabanlarını belirli aralıklarla Parquet arşivine
+    taşıyan arka plan işi. Kendi thread'inde `run` ile çalıştırılır.
+    """
+    def __init__(self, base_path, archive_root, columns, total_database_name="total.db", default_saw_name="testere",
+                 interval_s=3600, row_group_size=65536, compression="zstd", delete_source=False, min_idle_s=600):
+        self.base_path = base_path
+        self.archive_root = archive_root
+        self.columns = dict(columns)
+        self.total_database_name = total_database_name
+        self.default_saw_name = default_saw_name
+        self.interval_s = interval_s
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.delete_source = delete_source
+        self.min_idle_s = min_idle_s
+
+    @classmethod
+    def from_config(cls, base_path, archive_config, database_config, columns, default_saw_name="testere"):
+        return cls(
+            base_path, archive_config.get("path", os.path.join(base_path, "archive")), columns,
+            total_database_name=database_config["total_database_path"],
+            default_saw_name=default_saw_name,
+            interval_s=archive_config.get("interval_s", 3600),
+            row_group_size=archive_config.get("row_group_size", 65536),
+            compression=archive_config.get("compression", "zstd"),
+            delete_source=archive_config.get("delete_source", False),
+            min_idle_s=archive_config.get("min_idle_s", 600),
+        )
+
+    def compact_pending(self):
+        """
+        Arşive alınmamış tüm biten günleri işler.
+        """
+        for day in finished_days(self.base_path):
+            try:
+                written = compact_day(os.path.join(self.base_path, day), self.archive_root, self.columns,
+                                      self.total_database_name, self.default_saw_name,
+                                      self.row_group_size, self.compression, self.delete_source,
+                                      self.min_idle_s)
+                for saw_name, rows in written.items():
+                    print(f"Arşiv: {day} {saw_name} -> {rows} satır")
+            except Exception as e:
+                print(f"Arşiv hatası ({day}): {e}")
+
+    def run(self, stop_flag):
+        """
+        `stop_flag()` True dönene kadar her `interval_s` saniyede bir biten günleri arşivler.
+        """
+        next_run = time.monotonic()
+        while not stop_flag():
+            if time.monotonic() >= next_run:
+                self.compact_pending()
+                next_run = time.monotonic() + self.interval_s
+            time.sleep(1)
+
+
+def archive_dataset(archive_root):
+    """
+    Arşivi tüm bölümlerin sütunlarını içeren ortak şemayla açar. Sütun listesi
+    zamanla değiştiğinden (cut_id, görüntü sütunları) bölümlerin şemaları farklı
+    olabilir; şema ilk dosyadan alınırsa diğer dosyalardaki sütunlar kaybolur.
+    Bir bölümde bulunmayan sütunlar null okunur. Yalnızca dosya altbilgileri okunur.
+    """
+    discovered = ds.dataset(archive_root, format="parquet", partitioning=PARTITIONING)
+    schemas = [pq.read_schema(path) for path in discovered.files]
+    if not schemas:
+        return discovered
+    schema = pa.unify_schemas(schemas + [PARTITIONING.schema])
+    return ds.dataset(discovered.files, schema=schema, format="parquet", partitioning=PARTITIONING,
+                      partition_base_dir=archive_root)
+
+
+def query(archive_root, columns=None, start=None, end=None, saws=None):
+    """
+    Arşivden yalnızca istenen sütunları ve zaman aralığını okur.
+    Gün ve testere filtreleri klasör düzeyinde, zaman filtresi row group
+    istatistikleriyle uygulanır; eşleşmeyen dosya ve gruplar okunmaz.
+    date= bölümü uygulamanın başladığı gündür; gece yarısından sonra yazılan
+    satırlar önceki günün bölümünde kalır. Bu yüzden gün yalnızca bitiş için
+    elenir (bölümdeki satırlar o günden önce olamaz), başlangıç için zaman
+    sütununun istatistiklerine bırakılır.
+    :param archive_root: Arşiv klasörü
+    :param columns: Okunacak sütunlar, None ise hepsi
+    :param start: Başlangıç zamanı (datetime veya "YYYY-MM-DD HH:MM:SS"), dahil
+    :param end: Bitiş zamanı, hariç
+    :param saws: Testere adı veya adları listesi
+    :return: pandas DataFrame
+    """
+    dataset = archive_dataset(archive_root)
+    start = pd.Timestamp(start).to_pydatetime() if start is not None else None
+    end = pd.Timestamp(end).to_pydatetime() if end is not None else None
+
+    expression = None
+
+    def combine(condition):
+        return condition if expression is None else expression & condition
+
+    if start is not None:
+        expression = combine(ds.field("timestamp") >= pa.scalar(start, pa.timestamp("ms")))
+    if end is not None:
+        expression = combine((ds.field("date") <= end.strftime("%Y-%m-%d")) &
+                             (ds.field("timestamp") < pa.scalar(end, pa.timestamp("ms"))))
+    if saws is not None:
+        expression = combine(ds.field("saw").isin([saws] if isinstance(saws, str) else list(saws)))
+
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+if __name__ == "__main__":
+    # Biten günleri elle arşivlemek için: python archive.py
+    import yaml
+
+    from data_handler import record_columns
+
+    with open("config.yaml", "r") as config_file:
+        config = yaml.safe_load(config_file)
+    # Uygulamanın arşiv thread'iyle aynı sütunlar
+    archive_columns = record_columns(config)
+    base = os.path.join(os.getcwd(), "sensor_data")
+    compactor = ArchiveCompactor.from_config(base, config.get("archive", {}), config["database"], archive_columns,
+                                             default_saw_name=config["modbus"].get("name", "testere"))
+    compactor.compact_pending()
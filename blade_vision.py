@@ -0,0 +1,293 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+import cv2
+import numpy as np
+
+from time_alignment import capture_clock
+
+# Telemetriye serit_sapmasi'nın yanına eklenen görüntü özellikleri
+VISION_COLUMNS = {
+    "serit_sapmasi_kamera": "REAL",  # Şerit kenarının ROI merkezinden sapması (mm)
+    "talas_yogunlugu": "REAL",       # ROI'deki parlak (talaş/çapak) piksel oranı
+    "bulaniklik_skoru": "REAL",      # Laplace varyansı; düştükçe kare daha bulanık
+}
+
+# Kare JPEG'den doğrudan küçültülerek çözülür (DCT ölçekleme), tam çözünürlük hiç oluşmaz
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def init_worker():
+    # Her işlem tek thread kullanır; paralellik işlem havuzundan gelir
+    cv2.setNumThreads(1)
+
+
+def worker_ready():
+    return os.getpid()
+
+
+def roi_slices(shape, roi):
+    """
+    Oran olarak verilen ROI'yi (x0, y0, x1, y1) piksel dilimlerine çevirir.
+    """
+    height, width = shape[:2]
+    x0, y0, x1, y1 = roi
+    return slice(int(y0 * height), max(int(y1 * height), int(y0 * height) + 3)), \
+        slice(int(x0 * width), max(int(x1 * width), int(x0 * width) + 3))
+
+
+def peak_rows(response):
+    """
+    Her sütunda yanıtın en büyük olduğu satır, komşu satırlarla parabol uydurularak
+    alt piksel hassasiyetinde. Basamak kenarında Sobel iki satırda eşit yanıt verdiğinde
+    kenar ikisinin ortasına düşer; gürültü eşitliği bozsa da konum sıçramaz.
+    """
+    rows = np.argmax(response, axis=0)
+    inner = np.clip(rows, 1, response.shape[0] - 2)
+    cols = np.arange(response.shape[1])
+    above, center, below = response[inner - 1, cols], response[inner, cols], response[inner + 1, cols]
+    curvature = above - 2 * center + below
+    with np.errstate(divide="ignore", invalid="ignore"):
+        offset = np.where((rows == inner) & (curvature < 0), (above - below) / (2 * curvature), 0.0)
+    return rows + offset
+
+
+def frame_features(gray, mm_per_px=1.0, chip_threshold=200):
+    """
+    Küçültülmüş gri ROI'den kare özelliklerini hesaplar. Tüm işlemler vektöreldir.
+    - Sapma: İşaretli dikey gradyanın en büyük (koyudan açığa) ve en küçük (açıktan
+      koyuya) olduğu satırlar şeridin iki kenarıdır; her sütunda kenarların ortası
+      alınır, sütunların medyanının ROI merkezine uzaklığı mm'ye çevrilir. Orta nokta
+      şerit arka plandan açık da koyu da olsa aynıdır.
+    - Talaş yoğunluğu: Eşik üstündeki parlak piksellerin oranı.
+    - Bulanıklık: Laplace varyansı (hareket bulanıklığında düşer).
+    :param gray: uint8 gri görüntü (ROI)
+    :param mm_per_px: Küçültülmüş görüntüde bir pikselin mm karşılığı
+    :return: VISION_COLUMNS alanları sözlüğü
+    """
+    gradient = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+    blade_rows = (peak_rows(gradient) + peak_rows(-gradient)) / 2
+    deviation_px = float(np.median(blade_rows)) - (gray.shape[0] - 1) / 2
+    return {
+        "serit_sapmasi_kamera": deviation_px * mm_per_px,
+        "talas_yogunlugu": float(np.count_nonzero(gray >= chip_threshold)) / gray.size,
+        "bulaniklik_skoru": float(cv2.Laplacian(gray, cv2.CV_16S).var()),
+    }
+
+
+def analyze_frame(frame, capture_time, roi, reduce=4, mm_per_px=1.0, chip_threshold=200):
+    """
+    İşlem havuzunda çalışan analiz. Kare JPEG baytları veya önceden küçültülmüş gri dizi olabilir.
+    :return: (yakalama zamanı, özellikler)
+    """
+    if isinstance(frame, bytes):
+        gray = cv2.imdecode(np.frombuffer(frame, dtype=np.uint8), REDUCED_DECODE_FLAGS[reduce])
+        if gray is None:
+            raise ValueError("JPEG çözülemedi")
+    else:
+        gray = frame
+    rows, cols = roi_slices(gray.shape, roi)
+    return capture_time, frame_features(gray[rows, cols], mm_per_px * reduce, chip_threshold)
+
+
+def downscale_gray(frame, reduce):
+    """
+    Çözülmüş BGR kareyi işlem havuzuna göndermeden önce küçültür (yakalama thread'inde, ~1 ms).
+    """
+    gray = cv2.cvtColor(frame[::reduce, ::reduce], cv2.COLOR_BGR2GRAY)
+    return np.ascontiguousarray(gray)
+
+
+class BladeVision:
+    """
+    Kamera karelerini yakalama thread'ini bekletmeden bir işlem havuzunda analiz eder.
+    Aynı anda işlenen kare sayısı `max_in_flight` ile sınırlıdır; havuz yetişemezse
+    yeni kareler atlanır (kuyruk birikmez, gecikme artmaz). Son özellikler
+    `latest_features` ile okunur ve testere örneğine eklenir.
+    """
+    def __init__(self, workers=2, max_in_flight=None, roi=(0.0, 0.0, 1.0, 1.0), reduce=4, mm_per_px=1.0,
+                 chip_threshold=200, max_age_s=0.5, log_interval=10):
+        """
+        :param workers: İşlem sayısı
+        :param max_in_flight: Aynı anda analizde olabilecek en fazla kare (varsayılan 2 x workers)
+        :param roi: Şerit bölgesi, kare boyutuna oranla (x0, y0, x1, y1)
+        :param reduce: Çözme ölçeği (1, 2, 4 veya 8)
+        :param mm_per_px: Tam çözünürlükte bir pikselin mm karşılığı
+        :param chip_threshold: Talaş/çapak sayılacak parlaklık eşiği
+        :param max_age_s: Bu süreden eski özellikler örneğe eklenmez
+        """
+        if reduce not in REDUCED_DECODE_FLAGS:
+            raise ValueError(f"Desteklenmeyen küçültme oranı: {reduce}")
+        self.workers = workers
+        self.max_in_flight = max_in_flight or 2 * workers
+        self.roi = tuple(roi)
+        self.reduce = reduce
+        self.mm_per_px = mm_per_px
+        self.chip_threshold = chip_threshold
+        self.max_age_s = max_age_s
+        self.log_interval = log_interval
+        self.executor = None
+        self.lock = Lock()
+        self.in_flight = 0
+        self.latest = None  # (yakalama zamanı, özellikler)
+        self.submitted = 0
+        self.skipped = 0
+        self.completed = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.last_log_time = time.monotonic()
+
+    @classmethod
+    def from_config(cls, vision_config):
+        return cls(
+            workers=vision_config.get("workers", 2),
+            max_in_flight=vision_config.get("max_in_flight"),
+            roi=vision_config.get("roi", (0.0, 0.0, 1.0, 1.0)),
+            reduce=vision_config.get("reduce", 4),
+            mm_per_px=vision_config.get("mm_per_px", 1.0),
+            chip_threshold=vision_config.get("chip_threshold", 200),
+            max_age_s=vision_config.get("max_age_s", 0.5),
+        )
+
+    def start(self):
+        """
+        İşlem havuzunu açar ve tüm işlemler çalışana kadar bekler. ProcessPoolExecutor
+        işlemleri ilk göreve kadar açmadığından boş görevler gönderilir; böylece fork,
+        diğer thread'ler başlamadan önce bu çağrıda yapılır. Havuz kamera durdurulup
+        yeniden başlatılırken açık kalır, yalnızca `close` ile kapanır.
+        """
+        if self.executor is None:
+            # fork ile açılan işlemler ana betiği (main.py) yeniden çalıştırmaz
+            context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                                initializer=init_worker)
+            for future in [self.executor.submit(worker_ready) for _ in range(self.workers)]:
+                future.result()
+
+    def submit(self, frame, capture_time):
+        """
+        Kareyi analize gönderir; havuz doluysa kare atlanır. Yakalama thread'inden çağrılır.
+        :param frame: JPEG baytları veya çözülmüş BGR kare
+        :return: Kare gönderildiyse True
+        """
+        if self.executor is None:
+            return False
+        with self.lock:
+            if self.in_flight >= self.max_in_flight:
+                self.skipped += 1
+                return False
+            self.in_flight += 1
+            self.submitted += 1
+        if not isinstance(frame, bytes):
+            frame = downscale_gray(frame, self.reduce)
+        try:
+            future = self.executor.submit(analyze_frame, frame, capture_time, self.roi, self.reduce,
+                                          self.mm_per_px, self.chip_threshold)
+        except RuntimeError:
+            # Havuz kapatılıyor
+            with self.lock:
+                self.in_flight -= 1
+            return False
+        future.add_done_callback(self._on_done)
+        return True
+
+    def _on_done(self, future):
+        with self.lock:
+            self.in_flight -= 1
+            try:
+                capture_time, features = future.result()
+            except Exception as e:
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"Görüntü analizi hatası: {e}")
+                return
+            self.completed += 1
+            self.latency_sum += capture_clock.now() - capture_time
+            if self.latest is None or capture_time >= self.latest[0]:
+                self.latest = (capture_time, features)
+        self.log_stats()
+
+    def latest_features(self, now=None):
+        """
+        Son analiz edilen karenin özellikleri, `max_age_s` içinde sonuç yoksa None.
+        """
+        latest = self.latest
+        if latest is None:
+            return None
+        now = capture_clock.now() if now is None else now
+        return latest[1] if now - latest[0] <= self.max_age_s else None
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "skipped": self.skipped,
+            "completed": self.completed,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "mean_latency_ms": self.latency_sum / self.completed * 1000 if self.completed else 0.0,
+        }
+
+    def log_stats(self):
+        if self.log_interval is None:
+            return
+        now = time.monotonic()
+        if now - self.last_log_time < self.log_interval:
+            return
+        self.last_log_time = now
+        s = self.stats()
+        print(f"Görüntü analizi: İşlenen={s['completed']}, Atlanan={s['skipped']}, Hata={s['errors']}, "
+              f"Gecikme ort={s['mean_latency_ms']:.1f}ms")
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+
+if __name__ == "__main__":
+    # 1920x1200 MJPEG karelerinde 50 FPS hedefinin sağlanıp sağlanmadığını ölçer: python blade_vision.py [işlem sayısı]
+    import sys
+
+    def synthetic_jpeg(seed, shift=0):
+        rng = np.random.default_rng(seed)
+        image = np.full((1200, 1920, 3), 60, dtype=np.uint8)
+        image[560 + shift:640 + shift] = 180  # Şerit
+        image += rng.integers(0, 30, image.shape, dtype=np.uint8)
+        return cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+    # Sapma kontrolü: aynı şerit farklı gürültüyle aynı değeri, kaydırılmış şerit kaydırma kadar farkı vermeli
+    for shift in (0, 40, -80):
+        deviations = [analyze_frame(synthetic_jpeg(seed, shift), 0.0, (0.25, 0.2, 0.75, 0.8))[1]["serit_sapmasi_kamera"]
+                      for seed in range(10)]
+        # ROI satırları 240..960, merkezi 599.5 (tam çözünürlük); şerit merkezi 599.5 + shift
+        assert max(abs(d - shift) for d in deviations) <= 2.0, (shift, deviations)
+        print(f"Şerit kaydırma {shift:+d} px: sapma {min(deviations):.2f} .. {max(deviations):.2f} px")
+
+    jpeg = synthetic_jpeg(0)
+
+    start_time = time.perf_counter()
+    for _ in range(100):
+        _, features = analyze_frame(jpeg, capture_clock.now(), (0.25, 0.2, 0.75, 0.8))
+    print(f"Tek işlem: {(time.perf_counter() - start_time) / 100 * 1000:.2f} ms/kare, özellikler: {features}")
+
+    vision = BladeVision(workers=int(sys.argv[1]) if len(sys.argv) > 1 else min(4, os.cpu_count() or 1),
+                         roi=(0.25, 0.2, 0.75, 0.8), log_interval=None)
+    vision.start()
+    frames = 500
+    start_time = time.perf_counter()
+    for number in range(frames):
+        vision.submit(jpeg, capture_clock.now())
+        # 50 FPS yakalama hızı
+        time.sleep(max(0.0, start_time + (number + 1) * 0.02 - time.perf_counter()))
+    vision.close()
+    s = vision.stats()
+    print(f"50 FPS akış: {frames} kare, işlenen {s['completed']}, atlanan {s['skipped']}, "
+          f"ortalama gecikme {s['mean_latency_ms']:.1f} ms")
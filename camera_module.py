@@ -1,104 +1,434 @@
 import cv2
 import time
 import os
-from threading import Thread
-import queue
+from collections import deque
+from threading import Thread, Condition, Lock
 from datetime import datetime
 
+from mjpeg_stream import MjpegStreamReader, decode_jpeg
+from frame_archive import SegmentedFrameWriter
+from time_alignment import capture_time
+
+DROP_POLICIES = ("drop_oldest", "drop_newest", "every_nth")
+RECONNECT_MIN_S = 1.0  # Yayına yeniden bağlanma denemeleri arasındaki ilk bekleme
+RECONNECT_MAX_S = 30.0  # Başarısız denemelerde iki katına çıkan beklemenin üst sınırı
+
+
+class FramePool:
+    """
+    Önceden ayrılmış kare tamponları. İlk kare geldiğinde boyutuna göre `size`
+    adet dizi bir kez oluşturulur; yakalama her kareyi boş bir tampona okur
+    (cap.read(tampon)), kayıt tamamlanınca tampon havuza geri döner.
+    """
+    def __init__(self, size):
+        self.size = size
+        self.free = []
+        self.lock = Lock()
+        self.shape = None
+        self.misses = 0  # Havuz boşken yeni dizi ayrılan kare sayısı
+
+    def allocate_like(self, frame):
+        with self.lock:
+            if self.shape == frame.shape:
+                return
+            self.shape = frame.shape
+            self.free = [frame.copy() for _ in range(self.size)]
+
+    def acquire(self):
+        """
+        :return: Boş tampon, havuz henüz oluşturulmadıysa veya boşsa None
+        """
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            if self.shape is not None:
+                self.misses += 1
+            return None
+
+    def release(self, frame):
+        with self.lock:
+            # Çözünürlük değiştiyse eski boyuttaki tampon havuza alınmaz
+            if frame is not None and frame.shape == self.shape and len(self.free) < self.size:
+                self.free.append(frame)
+
+
+class BoundedFrameQueue:
+    """
+    Yakalama ile kayıt thread'leri arasındaki sınırlı kuyruk. `put` hiçbir zaman
+    beklemez; kuyruk doluysa politikaya göre bir kare atılır ve çağırana döner
+    (tamponu havuza iade edilsin diye).
+
+    Politikalar:
+    - "drop_oldest": Kuyruktaki en eski kare atılır, en yeni kareler kaydedilir.
+    - "drop_newest": Gelen kare atılır, kuyruktakiler korunur.
+    - "every_nth": Yalnızca her `keep_every`. kare kuyruğa alınır; kuyruk yine de
+      dolarsa gelen kare atılır.
+    """
+    def __init__(self, maxsize=64, policy="drop_oldest", keep_every=1):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Bilinmeyen atma politikası: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.keep_every = max(1, keep_every)
+        self.items = deque()
+        self.condition = Condition()
+        self.closed = False
+        self.offered = 0
+        self.dropped = 0
+        self.skipped = 0  # every_nth politikasında bilerek atlanan kareler
+        self.max_depth = 0
+
+    def put(self, item):
+        """
+        Kareyi beklemeden kuyruğa ekler.
+        :return: Atılan eleman (gelen veya en eski), atılan yoksa None
+        """
+        with self.condition:
+            self.offered += 1
+            if self.policy == "every_nth" and (self.offered - 1) % self.keep_every:
+                self.skipped += 1
+                return item
+            dropped = None
+            if len(self.items) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == "drop_oldest":
+                    dropped = self.items.popleft()
+                else:
+                    return item
+            self.items.append(item)
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.condition.notify()
+            return dropped
+
+    def get(self):
+        """
+        Sıradaki kareyi bekleyerek alır.
+        :return: Kare, kuyruk kapatılmış ve boşsa None
+        """
+        with self.condition:
+            while not self.items and not self.closed:
+                self.condition.wait()
+            return self.items.popleft() if self.items else None
+
+    def close(self):
+        """
+        Yeni kare kabul edilmez; bekleyen tüm işçiler kuyruk boşalınca None alıp çıkar.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def qsize(self):
+        return len(self.items)
+
 
 class CameraModule:
-    def __init__(self, raspberry_pi_ip):
-        self.url = f"http://{raspberry_pi_ip}:8001/stream.mjpg"
-        self.frame_queue = queue.Queue()
+    def __init__(self, raspberry_pi_ip, port=8001, num_threads=4, queue_size=64, drop_policy="drop_oldest",
+                 keep_every=1, output_dir="./frames", log_interval=1, record_mode="raw", storage="segments",
+                 segment_s=60, max_segment_bytes=512 * 1024 * 1024, sample_clock=None, vision=None):
+        """
+        :param raspberry_pi_ip: MJPEG yayınını yapan Raspberry Pi adresi
+        :param record_mode: "raw" (yayındaki JPEG baytları çözülmeden yazılır) veya
+                            "decoded" (cv2.VideoCapture ile çözülüp cv2.imwrite ile yeniden kodlanır)
+        :param storage: "segments" (kareler zaman bölümlü segment dosyalarına ve indekse, bkz. frame_archive)
+                        veya "files" (her kare ayrı JPEG dosyası)
+        :param segment_s: Segment süresi (saniye)
+        :param max_segment_bytes: Segment boyut sınırı
+        :param sample_clock: Son sensör örneğinin zamanını döndüren fonksiyon; indekse yazılır
+        :param vision: Kareleri yakalama thread'i dışında analiz eden BladeVision (isteğe bağlı)
+        :param num_threads: Kareleri diske yazan işçi thread sayısı
+        :param queue_size: Yazılmayı bekleyebilecek en fazla kare sayısı
+        :param drop_policy: Kuyruk dolunca uygulanacak politika (bkz. BoundedFrameQueue)
+        :param keep_every: "every_nth" politikasında kaydedilecek her N. kare
+        """
+        if record_mode not in ("raw", "decoded"):
+            raise ValueError(f"Bilinmeyen kayıt modu: {record_mode}")
+        if storage not in ("segments", "files"):
+            raise ValueError(f"Bilinmeyen kayıt biçimi: {storage}")
+        self.url = f"http://{raspberry_pi_ip}:{port}/stream.mjpg"
+        self.record_mode = record_mode
+        self.storage = storage
+        self.segment_s = segment_s
+        self.max_segment_bytes = max_segment_bytes
+        self.sample_clock = sample_clock
+        self.vision = vision
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.keep_every = keep_every
+        self.frame_queue = BoundedFrameQueue(queue_size, drop_policy, keep_every)
+        self.frame_pool = FramePool(queue_size + num_threads + 1)
         self.camera_running = False
-        self.num_threads = 4
+        self.num_threads = num_threads
         self.threads = []
-        self.output_dir = "./frames"
+        self.base_output_dir = output_dir
+        self.output_dir = output_dir
         self.frame_count = 0
         self.lost_frames = 0
+        self.disconnects = 0  # Ham modda kopan yayın sayısı
+        self.connection_failures = 0  # Ham modda başarısız yeniden bağlanma denemeleri
+        self.encoded_frames = 0
         self.start_time = None
-        self.log_interval = 1
+        self.log_interval = log_interval
         self.capture_thread = None
         self.log_thread = None
         self.timestamp_format = "%d-%m-%Y_%H:%M:%S"
+        self.counter_lock = Lock()
+        self.latest_jpeg = None  # Ham modda son karenin JPEG baytları (istenirse çözülür)
 
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
+    @classmethod
+    def from_config(cls, camera_config, sample_clock=None, vision=None):
+        """
+        config.yaml'daki camera bölümünden modül oluşturur.
+        :param sample_clock: Son sensör örneğinin zamanını döndüren fonksiyon
+        :param vision: Görüntü analizi (bkz. blade_vision.BladeVision)
+        """
+        return cls(
+            camera_config.get("ip", "192.168.13.97"),
+            port=camera_config.get("port", 8001),
+            num_threads=camera_config.get("workers", 4),
+            queue_size=camera_config.get("queue_size", 64),
+            drop_policy=camera_config.get("drop_policy", "drop_oldest"),
+            keep_every=camera_config.get("keep_every", 1),
+            output_dir=camera_config.get("output_dir", "./frames"),
+            record_mode=camera_config.get("record_mode", "raw"),
+            storage=camera_config.get("storage", "segments"),
+            segment_s=camera_config.get("segment_s", 60),
+            max_segment_bytes=camera_config.get("max_segment_bytes", 512 * 1024 * 1024),
+            sample_clock=sample_clock,
+            vision=vision,
+        )
+
     def save_frame_thread(self):
         while True:
             frame_info = self.frame_queue.get()
-            if frame_info is None:  # Kuyrukta None varsa çıkış yap
+            if frame_info is None:  # Kuyruk kapatıldı ve boşaldı
                 break
-            frame, frame_number = frame_info
-            timestamp = datetime.now().strftime("%d-%m-%Y_%H:%M:%S.%f")
+            frame, frame_number, capture_time, sample_time = frame_info
+            # Dosya adı kaydedildiği anı değil yakalandığı anı taşır
+            timestamp = datetime.fromtimestamp(capture_time).strftime("%d-%m-%Y_%H:%M:%S.%f")
             filename = f"{self.output_dir}/frame_{frame_number:06d}_{timestamp}.jpg"
-            cv2.imwrite(filename, frame)
-            self.frame_queue.task_done()
+            try:
+                if isinstance(frame, bytes):
+                    # Ham JPEG olduğu gibi yazılır, yeniden kodlama yok
+                    with open(filename, "wb") as frame_file:
+                        frame_file.write(frame)
+                else:
+                    cv2.imwrite(filename, frame)
+                with self.counter_lock:
+                    self.encoded_frames += 1
+            except Exception as e:
+                print(f"Kare kaydedilemedi ({filename}): {e}")
+            finally:
+                if not isinstance(frame, bytes):
+                    self.frame_pool.release(frame)
+
+    def segment_writer_thread(self):
+        # Segmentlere tek thread yazar; ham JPEG eklemek kare başına yalnızca bir write çağrısıdır
+        writer = SegmentedFrameWriter(self.output_dir, self.segment_s, self.max_segment_bytes)
+        try:
+            while True:
+                frame_info = self.frame_queue.get()
+                if frame_info is None:
+                    break
+                frame, frame_number, capture_time, sample_time = frame_info
+                try:
+                    if isinstance(frame, bytes):
+                        jpeg = frame
+                    else:
+                        jpeg = cv2.imencode(".jpg", frame)[1].tobytes()
+                    writer.write(jpeg, frame_number, capture_time, sample_time)
+                    self.encoded_frames += 1
+                except Exception as e:
+                    print(f"Kare segmente yazılamadı ({frame_number}): {e}")
+                finally:
+                    if not isinstance(frame, bytes):
+                        self.frame_pool.release(frame)
+        finally:
+            writer.close()
+
+    def sample_time(self):
+        if self.sample_clock is None:
+            return None
+        try:
+            return self.sample_clock()
+        except Exception:
+            return None
 
     def start_camera(self):
+        if self.camera_running:
+            return
         self.camera_running = True
         self.start_time = time.time()
         self.frame_count = 0
         self.lost_frames = 0
+        self.disconnects = 0
+        self.connection_failures = 0
+        self.encoded_frames = 0
+        self.frame_queue = BoundedFrameQueue(self.queue_size, self.drop_policy, self.keep_every)
 
         # Create a new directory for this session
         timestamp = datetime.now().strftime(self.timestamp_format)
-        self.output_dir = os.path.join("./frames", f"frames_{timestamp}")
+        self.output_dir = os.path.join(self.base_output_dir, f"frames_{timestamp}")
         os.makedirs(self.output_dir, exist_ok=True)
 
-        cap = cv2.VideoCapture(self.url)
+        if self.record_mode == "raw":
+            source = MjpegStreamReader(self.url)
+            source.open()
+            capture_frames = self.capture_raw_frames
+        else:
+            source = cv2.VideoCapture(self.url)
+            capture_frames = self.capture_decoded_frames
 
-        if not cap.isOpened():
+        if not source.isOpened():
             print("Cannot open the stream.")
             self.camera_running = False
             return
 
-        def capture_frames():
-            while self.camera_running:
-                ret, frame = cap.read()
-                if not ret:
-                    print("Failed to grab frame")
-                    self.lost_frames += 1
-                    continue
-
-                self.frame_count += 1
-                self.frame_queue.put((frame, self.frame_count))
+        if self.vision is not None:
+            # Havuz normalde uygulama başlarken açılır (main.py); açılmadıysa burada açılır ve kamera durunca kapanmaz
+            self.vision.start()
 
-            cap.release()
-            print(f"Final Total Frames: {self.frame_count}, Final Lost Frames: {self.lost_frames}")
-
-        self.capture_thread = Thread(target=capture_frames)
+        self.capture_thread = Thread(target=capture_frames, args=(source, self.frame_queue))
         self.capture_thread.start()
 
         self.log_thread = Thread(target=self.log_camera_status)
         self.log_thread.start()
 
         # Start worker threads for saving frames
-        for _ in range(self.num_threads):
-            thread = Thread(target=self.save_frame_thread)
+        if self.storage == "segments":
+            workers = [self.segment_writer_thread]
+        else:
+            workers = [self.save_frame_thread] * self.num_threads
+        for worker in workers:
+            thread = Thread(target=worker)
             thread.start()
             self.threads.append(thread)
 
         print("Camera started")
 
+    def capture_decoded_frames(self, cap, frame_queue):
+        while self.camera_running:
+            # Kare havuzdan alınan tampona okunur; disk yazması yakalamayı hiç bekletmez
+            buffer = self.frame_pool.acquire()
+            ret, frame = cap.read(buffer) if buffer is not None else cap.read()
+            if not ret:
+                self.frame_pool.release(buffer)
+                print("Failed to grab frame")
+                self.lost_frames += 1
+                continue
+            if frame is not buffer:
+                # İlk kare veya çözünürlük değişimi: havuz bu boyutla (yeniden) oluşturulur
+                self.frame_pool.allocate_like(frame)
+
+            self.frame_count += 1
+            frame_time = capture_time()
+            if self.vision is not None:
+                # Küçültülmüş kopya gönderilir; tampon kuyruğa girmeden önce
+                self.vision.submit(frame, frame_time)
+            dropped = frame_queue.put((frame, self.frame_count, frame_time, self.sample_time()))
+            if dropped is not None:
+                self.frame_pool.release(dropped[0])
+
+        cap.release()
+        frame_queue.close()
+        print(f"Final Total Frames: {self.frame_count}, Final Lost Frames: {self.lost_frames}")
+
+    def wait_while_running(self, seconds):
+        # Bekleme kamera durdurulunca hemen biter
+        deadline = time.monotonic() + seconds
+        while self.camera_running and time.monotonic() < deadline:
+            time.sleep(min(0.1, deadline - time.monotonic()))
+
+    def capture_raw_frames(self, reader, frame_queue):
+        retry_delay = RECONNECT_MIN_S
+        while self.camera_running:
+            if not reader.isOpened():
+                # Yayın koptu; bağlantı kurulana kadar artan aralıklarla yeniden denenir
+                self.wait_while_running(retry_delay)
+                if not self.camera_running:
+                    break
+                if not reader.open():
+                    self.connection_failures += 1
+                    retry_delay = min(retry_delay * 2, RECONNECT_MAX_S)
+                    continue
+                print("MJPEG yayınına yeniden bağlanıldı")
+                retry_delay = RECONNECT_MIN_S
+            try:
+                for jpeg, capture_time in reader.frames():
+                    self.frame_count += 1
+                    self.latest_jpeg = jpeg
+                    if self.vision is not None:
+                        self.vision.submit(jpeg, capture_time)
+                    frame_queue.put((jpeg, self.frame_count, capture_time, self.sample_time()))
+                    if not self.camera_running:
+                        break
+                else:
+                    print("MJPEG yayını sona erdi")
+                    self.disconnects += 1
+            except Exception as e:
+                print(f"MJPEG yayını koptu: {e}")
+                self.disconnects += 1
+            reader.close()
+
+        reader.close()
+        frame_queue.close()
+        print(f"Final Total Frames: {self.frame_count}, Final Lost Frames: {self.lost_frames}")
+
+    def latest_frame(self):
+        """
+        Ham modda son karenin çözülmüş hali (arayüz veya analiz için); yalnızca çağrıldığında çözülür.
+        :return: BGR kare, henüz kare yoksa None
+        """
+        jpeg = self.latest_jpeg
+        return None if jpeg is None else decode_jpeg(jpeg)
+
     def stop_camera(self):
         self.camera_running = False
-        self.frame_queue.put(None)  # Kuyruğa None ekleyerek işçi thread'lerini sonlandır
         if self.capture_thread:
             self.capture_thread.join()
+            self.capture_thread = None
+        # Kuyruk kapatılınca tüm işçiler kalan kareleri yazıp çıkar
+        self.frame_queue.close()
         if self.log_thread:
             self.log_thread.join()
+            self.log_thread = None
 
         for thread in self.threads:
             thread.join()
 
         self.threads = []
-        print("Camera stopped")
+        print(f"Camera stopped {self.stats()}")
+
+    def stats(self):
+        """
+        Kamera kayıt sayaçları.
+        """
+        stats = {
+            "captured": self.frame_count,
+            "lost": self.lost_frames,
+            "disconnects": self.disconnects,
+            "connection_failures": self.connection_failures,
+            "encoded": self.encoded_frames,
+            "dropped": self.frame_queue.dropped,
+            "skipped": self.frame_queue.skipped,
+            "queue_depth": self.frame_queue.qsize(),
+            "max_queue_depth": self.frame_queue.max_depth,
+            "pool_misses": self.frame_pool.misses,
+        }
+        if self.vision is not None:
+            stats["vision"] = self.vision.stats()
+        return stats
 
     def log_camera_status(self):
         while self.camera_running:
             current_time = time.time()
             elapsed_time = current_time - self.start_time
-            print(f"Recording: {elapsed_time:.2f}s, Total Frames: {self.frame_count}, Lost Frames: {self.lost_frames}")
+            s = self.stats()
+            print(f"Recording: {elapsed_time:.2f}s, Total Frames: {s['captured']}, Lost Frames: {s['lost']}, "
+                  f"Encoded: {s['encoded']}, Dropped: {s['dropped']}, Skipped: {s['skipped']}, "
+                  f"Queue: {s['queue_depth']} (max {s['max_queue_depth']}), "
+                  f"Disconnects: {s['disconnects']}, Connection Failures: {s['connection_failures']}")
             time.sleep(self.log_interval)
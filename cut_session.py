@@ -0,0 +1,208 @@
+import sqlite3
+from datetime import datetime
+
+CUTTING_STATE = 3  # testere_durumu: kesim yapılıyor
+MAX_SAMPLE_GAP_S = 1.0  # Bu süreden uzun veri kesintisi kesimi bitirir (10 Hz'de 10 örnek periyodu)
+
+# cuts tablosu sütunları; cut_id birincil anahtar olduğundan kesim özetine erişim indeksli
+CUTS_COLUMNS = {
+    "cut_id": "INTEGER PRIMARY KEY",
+    "start_time": "TEXT",
+    "end_time": "TEXT",
+    "duration_s": "REAL",
+    "samples": "INTEGER",
+    "energy_as": "REAL",
+    "peak_current_a": "REAL",
+    "mean_current_a": "REAL",
+    "mean_kesme_hizi": "REAL",
+    "mean_inme_hizi": "REAL",
+    "kafa_start_mm": "REAL",
+    "kafa_end_mm": "REAL",
+    "kafa_span_mm": "REAL",
+}
+
+
+def create_cuts_table(conn):
+    """
+    cuts tablosunu ve imas_testere üzerinde cut_id indeksini oluşturur.
+    İndeks sayesinde bir kesimin örnekleri tüm tablo taranmadan okunur.
+    """
+    conn.execute("CREATE TABLE IF NOT EXISTS cuts ({})".format(
+        ", ".join(f"{col} {dtype}" for col, dtype in CUTS_COLUMNS.items())
+    ))
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_cuts_start_time ON cuts (start_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_imas_testere_cut_id ON imas_testere (cut_id)")
+
+
+CUTS_INSERT_QUERY = "INSERT OR REPLACE INTO cuts ({}) VALUES ({})".format(
+    ", ".join(CUTS_COLUMNS.keys()), ", ".join("?" for _ in CUTS_COLUMNS)
+)
+
+
+def format_time(sample_time):
+    return datetime.fromtimestamp(sample_time).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+class CutSummary:
+    """
+    Tamamlanan bir kesimin özeti. Veri kuyruğunda örneklerle aynı sırada
+    taşınır ve DB thread'i tarafından cuts tablosuna yazılır.
+    """
+    __slots__ = tuple(CUTS_COLUMNS.keys())
+
+    def __init__(self, **values):
+        for col in self.__slots__:
+            setattr(self, col, values.get(col))
+
+    def as_row(self):
+        return tuple(getattr(self, col) for col in self.__slots__)
+
+    def to_dict(self):
+        return {col: getattr(self, col) for col in self.__slots__}
+
+    def __repr__(self):
+        return f"CutSummary({self.to_dict()})"
+
+
+class CutSessionDetector:
+    """
+    testere_durumu geçişlerinden kesimleri artımlı olarak ayıran sınıf.
+    Kesim süresince her örneğe aynı cut_id atanır; akım integrali (A·s),
+    tepe akım, ortalama hızlar ve kafa yüksekliği aralığı örnek geldikçe
+    sabit zamanda güncellenir, kesim bitince özet bir kez üretilir.
+
+    cut_id kesim başlangıcının Unix saniyesidir; veritabanına danışmadan
+    yeniden başlatmalar arasında da tekil ve artan kalır.
+
+    İki örnek arasında `max_gap_s`'den uzun kesinti (bağlantı kopması) olursa
+    devam eden kesim son örnekte bitirilir ve kesinti sonrası örnek yeni kesim
+    başlatır; integral ve süre kesintiyi kapsamaz.
+    """
+    def __init__(self, max_gap_s=MAX_SAMPLE_GAP_S):
+        self.max_gap_s = max_gap_s
+        self.last_cut_id = 0
+        self.cut_id = None
+        self._reset()
+
+    def _reset(self):
+        self.start_time = None
+        self.last_time = None
+        self.last_current = None
+        self.samples = 0
+        self.energy = 0.0
+        self.peak_current = 0.0
+        self.current_sum = 0.0
+        self.kesme_sum = 0.0
+        self.inme_sum = 0.0
+        self.kafa_start = None
+        self.kafa_end = None
+        self.kafa_min = None
+        self.kafa_max = None
+
+    def update(self, sample, sample_time):
+        """
+        Örneği işler.
+        :param sample: Ölçeklenmiş örnek (dict veya SampleRecord)
+        :param sample_time: Örneğin alındığı an (time.time())
+        :return: (örneğin cut_id'si veya None, kesim bu örnekle bittiyse CutSummary, aksi halde None)
+        """
+        cutting = sample.get('testere_durumu') == CUTTING_STATE
+        if not cutting:
+            if self.cut_id is None:
+                return None, None
+            return None, self.finish()
+
+        finished = None
+        if self.last_time is not None and sample_time - self.last_time > self.max_gap_s:
+            # Veri kesintisi: kesim kesintiden önceki son örnekte biter
+            finished = self.finish()
+
+        if self.cut_id is None:
+            self.cut_id = max(int(sample_time), self.last_cut_id + 1)
+            self.last_cut_id = self.cut_id
+            self.start_time = sample_time
+
+        current = sample.get('serit_motor_akim_a') or 0.0
+        kafa = sample.get('kafa_yuksekligi_mm')
+        if self.last_time is not None:
+            # Yamuk kuralı ile akım integrali
+            self.energy += 0.5 * (current + self.last_current) * (sample_time - self.last_time)
+        self.last_time = sample_time
+        self.last_current = current
+        self.samples += 1
+        self.peak_current = max(self.peak_current, current)
+        self.current_sum += current
+        self.kesme_sum += sample.get('serit_kesme_hizi') or 0.0
+        self.inme_sum += sample.get('serit_inme_hizi') or 0.0
+        if kafa is not None:
+            if self.kafa_start is None:
+                self.kafa_start = self.kafa_min = self.kafa_max = kafa
+            self.kafa_end = kafa
+            self.kafa_min = min(self.kafa_min, kafa)
+            self.kafa_max = max(self.kafa_max, kafa)
+        return self.cut_id, finished
+
+    def finish(self):
+        """
+        Devam eden kesimi bitirir ve özetini döndürür.
+        :return: CutSummary, devam eden kesim yoksa None
+        """
+        if self.cut_id is None:
+            return None
+        summary = CutSummary(
+            cut_id=self.cut_id,
+            start_time=format_time(self.start_time),
+            end_time=format_time(self.last_time),
+            duration_s=self.last_time - self.start_time,
+            samples=self.samples,
+            energy_as=self.energy,
+            peak_current_a=self.peak_current,
+            mean_current_a=self.current_sum / self.samples,
+            mean_kesme_hizi=self.kesme_sum / self.samples,
+            mean_inme_hizi=self.inme_sum / self.samples,
+            kafa_start_mm=self.kafa_start,
+            kafa_end_mm=self.kafa_end,
+            kafa_span_mm=None if self.kafa_min is None else self.kafa_max - self.kafa_min,
+        )
+        self.cut_id = None
+        self._reset()
+        return summary
+
+
+def load_cut(db_path, cut_id):
+    """
+    Kesim özetini birincil anahtar ile okur.
+    :return: Sütun adı -> değer sözlüğü, kesim yoksa None
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT {} FROM cuts WHERE cut_id = ?".format(", ".join(CUTS_COLUMNS)), (cut_id,)).fetchone()
+    finally:
+        conn.close()
+    return None if row is None else dict(zip(CUTS_COLUMNS, row))
+
+
+def recent_cuts(db_path, limit=20):
+    """
+    Son kesimlerin özetlerini yeniden eskiye döndürür.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT {} FROM cuts ORDER BY cut_id DESC LIMIT ?".format(", ".join(CUTS_COLUMNS)),
+                            (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(CUTS_COLUMNS, row)) for row in rows]
+
+
+def load_cut_samples(db_path, cut_id, columns=("timestamp", "serit_motor_akim_a", "serit_kesme_hizi", "serit_inme_hizi")):
+    """
+    Bir kesime ait örnekleri cut_id indeksi üzerinden okur.
+    :return: Satır listesi (columns sırasıyla)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT {} FROM imas_testere WHERE cut_id = ? ORDER BY rowid".format(", ".join(columns)),
+                            (cut_id,)).fetchall()
+    finally:
+        conn.close()
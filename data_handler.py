@@ -1,5 +1,31 @@
+import gzip
+import io
+import os
 import sqlite3
+import time
+import numpy as np
 from datetime import datetime
+from cut_session import create_cuts_table, CUTS_INSERT_QUERY
+
+
+def record_columns(config):
+    """
+    Kayıtların (veritabanı, metin dosyası, MQTT ve arşiv) sütunları: config.yaml'daki
+    register sütunları ile kontrol, kesim ve (etkinse) görüntü analizi sütunları.
+    Uygulama ve elle arşivleme aynı listeyi kullanır, böylece arşiv bölümleri aynı şemayla yazılır.
+    :param config: config.yaml içeriği
+    :return: Sütun adı -> veri tipi sözlüğü
+    """
+    columns = dict(config["database"]["columns"])
+    columns["fuzzy_output"] = "REAL"
+    columns["akim_degisim"] = "REAL"
+    columns["fuzzy_control"] = "INTEGER"
+    columns["cut_id"] = "INTEGER"
+    if config.get("camera", {}).get("vision", {}).get("enabled", False):
+        # OpenCV yalnızca görüntü analizi açıksa import edilir
+        from blade_vision import VISION_COLUMNS
+        columns.update(VISION_COLUMNS)
+    return columns
 
 
 def create_table(db_path, columns):
@@ -13,93 +39,83 @@ def create_table(db_path, columns):
     conn.close()
 
 
-def insert_to_database(db_path, data, columns):
-    create_table(db_path, columns)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def convert_value(col, value, expected_type):
+    """
+    Değeri sütunun veri tipine göre dönüştürür.
+    :param col: Sütun adı
+    :param value: Dönüştürülecek değer
+    :param expected_type: Sütunun veri tipi (büyük harf)
+    :return: Dönüştürülmüş değer
+    """
+    if value is None:
+        return None
+    if "INTEGER" in expected_type:
+        try:
+            return int(value)
+        except ValueError:
+            print(f"ValueError: Sütun {col} için '{value}' int'e dönüştürülemiyor.")
+            raise
+    elif "REAL" in expected_type:
+        try:
+            return float(value)
+        except ValueError:
+            print(f"ValueError: Sütun {col} için '{value}' float'a dönüştürülemiyor.")
+            raise
+    elif "TEXT" in expected_type:
+        return str(value)
+    elif "BYTE" in expected_type:
+        if isinstance(value, int):
+            return format(value, '02x')  # Byte değerini hex'e çevir
+        return str(value)
+    return value
 
-    # Sütun adlarını ve veri sırasını kontrol et
-    columns_str = ", ".join(columns.keys())
-    placeholders = ", ".join(["?" for _ in columns.keys()])
 
-    # Veriyi uygun sırayla tuple haline getir
+def build_row(data, columns):
+    """
+    Veriyi sütun sırasına göre veritabanına yazılacak tuple haline getirir.
+    :param data: Sütun isimli dict/SampleRecord veya sütun sırasında liste
+    :param columns: Sütun adı -> veri tipi sözlüğü
+    :return: Veri tuple'ı, veri tipi hatalıysa None
+    """
     data_tuple = []
 
-    if isinstance(data, dict):
-        # Eğer 'data' bir dict ise sütun isimlerine göre veri çek
-        for col in columns.keys():
+    if isinstance(data, (dict, SampleRecord)):
+        # Eğer 'data' bir dict veya kayıt ise sütun isimlerine göre veri çek
+        for col, dtype in columns.items():
             value = data.get(col, None)  # Eğer sütun ismi 'data' içinde yoksa None döner
-
-            # Veri tipine göre uygun dönüştürme işlemi yap
-            expected_type = columns[col].upper()
-
-            if value is not None:
-                if "INTEGER" in expected_type:
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        print(f"ValueError: Sütun {col} için '{value}' int'e dönüştürülemiyor.")
-                        raise
-                elif "REAL" in expected_type:
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        print(f"ValueError: Sütun {col} için '{value}' float'a dönüştürülemiyor.")
-                        raise
-                elif "TEXT" in expected_type:
-                    value = str(value)
-                elif "BYTE" in expected_type:
-                    if isinstance(value, int):
-                        value = format(value, '02x')  # Byte değerini hex'e çevir
-                    else:
-                        value = str(value)
-
-            data_tuple.append(value)
+            data_tuple.append(convert_value(col, value, dtype.upper()))
 
     elif isinstance(data, list):
         # Eğer 'data' bir listeyse indeks numarasına göre sütun verilerini al
-        for i, col in enumerate(columns.keys()):
+        for i, (col, dtype) in enumerate(columns.items()):
             try:
                 value = data[i]  # Listeden sırayla eleman al
             except IndexError:
                 print(f"Uyarı: {col} sütunu için yeterli veri yok, None değeri kullanılacak.")
                 value = None  # Eğer yeterli eleman yoksa None kullan
-
-            # Veri tipine göre uygun dönüştürme işlemi yap
-            expected_type = columns[col].upper()
-
-            if value is not None:
-                if "INTEGER" in expected_type:
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        print(f"ValueError: Sütun {col} için '{value}' int'e dönüştürülemiyor.")
-                        raise
-                elif "REAL" in expected_type:
-                    try:
-                        value = float(value)
-                    except ValueError:
-                        print(f"ValueError: Sütun {col} için '{value}' float'a dönüştürülemiyor.")
-                        raise
-                elif "TEXT" in expected_type:
-                    value = str(value)
-                elif "BYTE" in expected_type:
-                    if isinstance(value, int):
-                        value = format(value, '02x')  # Byte değerini hex'e çevir
-                    else:
-                        value = str(value)
-
-            data_tuple.append(value)
+            data_tuple.append(convert_value(col, value, dtype.upper()))
 
     else:
         print(f"Hata: 'data' bir dict veya list olmalı, ancak şu an {type(data)} tipinde.")
-        return
+        return None
+
+    return tuple(data_tuple)
+
+
+def insert_to_database(db_path, data, columns):
+    create_table(db_path, columns)
+
+    # Sütun adlarını ve veri sırasını kontrol et
+    columns_str = ", ".join(columns.keys())
+    placeholders = ", ".join(["?" for _ in columns.keys()])
 
-    # Tüm veriyi tuple olarak hazırladık
-    data_tuple = tuple(data_tuple)
+    # Veriyi uygun sırayla tuple haline getir
+    data_tuple = build_row(data, columns)
+    if data_tuple is None:
+        return
 
-    # print(f"Inserting data: {data_tuple}")
-    # print(f"Using columns: {list(columns.keys())}")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
 
     # SQL sorgusunu çalıştır
     cursor.execute(f'INSERT INTO imas_testere ({columns_str}) VALUES ({placeholders})', data_tuple)
@@ -107,43 +123,492 @@ def insert_to_database(db_path, data, columns):
     conn.close()
 
 
-def write_to_text_file(data, text_file_path):
-    if isinstance(data, dict):
-        data = list(data.values())
-    with open(text_file_path, "a") as file:
-        file.write(", ".join(map(str, data)) + "\n")
+class DatabaseWriter:
+    """
+    Tek bir SQLite bağlantısını açık tutarak satırları toplu halde yazan sınıf.
+    Satırlar tamponda biriktirilir; `batch_size` satıra veya `flush_interval_ms`
+    süresine ulaşıldığında tek bir `executemany` ve commit ile diske yazılır.
+    Bağlantı, oluşturulduğu thread içinde kullanılmalıdır.
+    """
+    def __init__(self, db_path, columns, batch_size=50, flush_interval_ms=1000):
+        self.db_path = db_path
+        self.columns = dict(columns)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.pending_rows = []
+        self.last_flush_time = time.monotonic()
+        self.rows_written = 0
 
+        self.conn = sqlite3.connect(db_path)
+        # WAL modu ile okuyucular yazmayı bloklamaz, her commit'te fsync sayısı azalır
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS imas_testere ({})".format(
+            ", ".join(["{} {}".format(col, dtype) for col, dtype in self.columns.items()])
+        ))
+        # Aynı gün daha eski bir sütun listesiyle oluşturulmuş tabloya yeni sütunlar eklenir
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(imas_testere)")}
+        for col, dtype in self.columns.items():
+            if col not in existing:
+                self.conn.execute(f"ALTER TABLE imas_testere ADD COLUMN {col} {dtype}")
+        if "cut_id" in self.columns:
+            create_cuts_table(self.conn)
+        self.conn.commit()
+        self.pending_cuts = []
 
-def process_row(row_data, fuzzy_output_value=None):
-    # Milisaniye hassasiyetinde zaman damgası ekle
-    row_data['timestamp'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-    row_data['testere_durumu'] = int(row_data['testere_durumu'])
-    row_data['alarm_status'] = int(row_data['alarm_status'])
-    row_data['alarm_bilgisi'] = f"0x{int(row_data['alarm_bilgisi']):04x}"
-    row_data['kafa_yuksekligi_mm'] = row_data['kafa_yuksekligi_mm'] / 10.0
-    row_data['serit_motor_akim_a'] = row_data['serit_motor_akim_a'] / 10.0
-    row_data['serit_motor_tork_percentage'] = row_data['serit_motor_tork_percentage'] / 10.0
-    row_data['inme_motor_akim_a'] = row_data['inme_motor_akim_a'] / 100.0
-    row_data['mengene_basinc_bar'] = row_data['mengene_basinc_bar'] / 10.0
-    row_data['serit_gerginligi_bar'] = row_data['serit_gerginligi_bar'] / 10.0
-    row_data['serit_sapmasi'] = row_data['serit_sapmasi'] / 100.0
-    row_data['ortam_sicakligi_c'] = row_data['ortam_sicakligi_c'] / 10.0
-    row_data['ortam_nem_percentage'] = row_data['ortam_nem_percentage'] / 10.0
-    row_data['sogutma_sivi_sicakligi_c'] = row_data['sogutma_sivi_sicakligi_c'] / 10.0
-    row_data['hidrolik_yag_sicakligi_c'] = row_data['hidrolik_yag_sicakligi_c'] / 10.0
-    row_data['ivme_olcer_x'] = row_data['ivme_olcer_x'] / 1.0
-    row_data['ivme_olcer_y'] = row_data['ivme_olcer_y'] / 1.0
-    row_data['ivme_olcer_z'] = row_data['ivme_olcer_z'] / 1.0
-    row_data['serit_kesme_hizi'] = row_data['serit_kesme_hizi'] * 0.0754
-    if row_data['serit_inme_hizi'] == 0:
-        row_data['serit_inme_hizi'] = 0.0
-    else:
-        row_data['serit_inme_hizi'] = (row_data['serit_inme_hizi'] - 65535) * -0.06
+        # INSERT sorgusu bir kez hazırlanır
+        self.insert_query = "INSERT INTO imas_testere ({}) VALUES ({})".format(
+            ", ".join(self.columns.keys()),
+            ", ".join(["?" for _ in self.columns.keys()])
+        )
+
+    def add(self, data):
+        """
+        Satırı tampona ekler, eşik aşıldıysa tamponu diske yazar.
+        :param data: Sütun isimli dict veya sütun sırasında liste
+        """
+        data_tuple = build_row(data, self.columns)
+        if data_tuple is not None:
+            self.pending_rows.append(data_tuple)
+        self.flush_if_due()
+
+    def add_cut(self, summary):
+        """
+        Kesim özetini bir sonraki yazmada cuts tablosuna eklenmek üzere tampona alır.
+        :param summary: cut_session.CutSummary
+        """
+        self.pending_cuts.append(summary.as_row())
+
+    def flush_if_due(self):
+        """
+        Satır sayısı veya bekleme süresi eşiği aşıldıysa tamponu yazar.
+        """
+        if len(self.pending_rows) >= self.batch_size or \
+                time.monotonic() - self.last_flush_time >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Tampondaki tüm satırları tek bir işlemde veritabanına yazar.
+        """
+        self.last_flush_time = time.monotonic()
+        if not self.pending_rows and not self.pending_cuts:
+            return
+        with self.conn:
+            self.conn.executemany(self.insert_query, self.pending_rows)
+            if self.pending_cuts:
+                self.conn.executemany(CUTS_INSERT_QUERY, self.pending_cuts)
+        self.rows_written += len(self.pending_rows)
+        self.pending_rows = []
+        self.pending_cuts = []
+
+    def close(self):
+        """
+        Bekleyen satırları yazar ve bağlantıyı kapatır.
+        """
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+
+class TextFileWriter:
+    """
+    Satırları açık tutulan bir metin dosyasına tamponlayarak yazan sınıf.
+    Dosyanın başına bir kez sütun başlığı yazılır ve değerler her zaman
+    sütun sırasıyla yazılır. Tampon `flush_bytes` boyutuna veya
+    `flush_interval_ms` süresine ulaşınca diske yazılır. Dosya `max_bytes`
+    boyutunu aştığında veya gün değiştiğinde zaman damgalı adla kenara
+    alınır ve yeni dosya açılır. `compression` ile gzip veya zstd akış
+    sıkıştırması kullanılabilir (zstd için zstandard paketi gerekir).
+    """
+    def __init__(self, path, columns, flush_bytes=65536, flush_interval_ms=1000, max_bytes=None,
+                 rotate_daily=True, compression=None, separator=", "):
+        """
+        :param path: Metin dosyası yolu, sıkıştırmada uzantı (.gz/.zst) eklenir
+        :param columns: Sütun adı -> veri tipi sözlüğü veya sütun adları listesi
+        :param flush_bytes: Tamponun diske yazılacağı boyut
+        :param flush_interval_ms: Tamponun en fazla bekleyeceği süre
+        :param max_bytes: Dosyanın döndürüleceği diskteki boyut (sıkıştırmada sıkıştırılmış boyut),
+                          None ise sınırsız. Yeniden açılışta mevcut dosyanın boyutundan devam edilir
+        :param rotate_daily: Gün değişince dosyayı döndür
+        :param compression: None, "gzip" veya "zstd"
+        :param separator: Değer ayracı
+        """
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError(f"Desteklenmeyen sıkıştırma: {compression}")
+        self.compression = compression
+        self.path = path + {None: "", "gzip": ".gz", "zstd": ".zst"}[compression]
+        self.columns = list(columns)
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.separator = separator
+        self.header = separator.join(self.columns) + "\n"
+
+        self.pending_lines = []
+        self.pending_bytes = 0
+        self.last_flush_time = time.monotonic()
+        self.lines_written = 0
+        self.rotations = 0
+
+        self.file = None
+        self.raw_file = None
+        self._open()
+
+    def _open(self):
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        if self.compression == "gzip":
+            # Her açılış yeni bir gzip üyesi ekler, çok üyeli dosyalar gzip ile sorunsuz okunur
+            self.file = gzip.open(self.path, "at", encoding="utf-8")
+        elif self.compression == "zstd":
+            import zstandard
+            self.raw_file = open(self.path, "ab")
+            self.file = io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(self.raw_file, closefd=False),
+                                         encoding="utf-8")
+        else:
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_date = datetime.now().date()
+        # Diskteki bayt sayısı; sıkıştırmada her flush sonrası dosya boyutundan okunur
+        self.file_bytes = 0 if is_new else os.path.getsize(self.path)
+        if is_new:
+            self.file.write(self.header)
+            if self.compression is None:
+                self.file_bytes += len(self.header.encode("utf-8"))
+
+    def _close_file(self):
+        self.file.close()
+        if self.raw_file is not None:
+            self.raw_file.close()
+            self.raw_file = None
+
+    def _rotate_if_needed(self):
+        day_changed = self.rotate_daily and datetime.now().date() != self.opened_date
+        size_exceeded = self.max_bytes is not None and self.file_bytes >= self.max_bytes
+        if not (day_changed or size_exceeded):
+            return
+        self._close_file()
+        # data.txt -> data.20240920-235959.txt (sıkıştırma uzantısı korunur)
+        stem, extension = self.path, ""
+        for suffix in (".gz", ".zst"):
+            if stem.endswith(suffix):
+                stem, extension = stem[:-len(suffix)], suffix
+        stem, text_extension = os.path.splitext(stem)
+        rotated_stem = f"{stem}.{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        rotated_path = f"{rotated_stem}{text_extension}{extension}"
+        counter = 1
+        while os.path.exists(rotated_path):
+            # Aynı saniyede birden fazla döndürmede önceki dosyanın üzerine yazılmaz
+            rotated_path = f"{rotated_stem}-{counter}{text_extension}{extension}"
+            counter += 1
+        os.replace(self.path, rotated_path)
+        self.rotations += 1
+        self._open()
 
-    if row_data['inme_motor_akim_a'] > 15:
-        row_data['inme_motor_akim_a'] = 655.35 - row_data['inme_motor_akim_a']
+    def add(self, data):
+        """
+        Satırı tampona ekler, eşik aşıldıysa tamponu dosyaya yazar.
+        :param data: Sütun isimli dict/SampleRecord veya sütun sırasında liste
+        """
+        if isinstance(data, (dict, SampleRecord)):
+            values = [data.get(col) for col in self.columns]
+        else:
+            values = data
+        line = self.separator.join(map(str, values)) + "\n"
+        self.pending_lines.append(line)
+        self.pending_bytes += len(line.encode("utf-8"))
+        self.flush_if_due()
 
-    if abs(row_data['serit_sapmasi']) > 1.5:
-        row_data['serit_sapmasi'] = abs(row_data['serit_sapmasi']) - 655.35
+    def flush_if_due(self):
+        """
+        Tampon boyutu veya bekleme süresi eşiği aşıldıysa tamponu yazar.
+        """
+        if self.pending_bytes >= self.flush_bytes or \
+                time.monotonic() - self.last_flush_time >= self.flush_interval:
+            self.flush()
 
+    def flush(self):
+        """
+        Tampondaki satırları tek yazma çağrısıyla dosyaya yazar.
+        """
+        self.last_flush_time = time.monotonic()
+        if not self.pending_lines:
+            return
+        self._rotate_if_needed()
+        self.file.write("".join(self.pending_lines))
+        self.file.flush()
+        if self.compression is None:
+            self.file_bytes += self.pending_bytes
+        else:
+            # flush sıkıştırıcıyı da boşaltır; diskteki boyut açılıştaki ölçümle aynı birimdedir
+            self.file_bytes = os.path.getsize(self.path)
+        self.lines_written += len(self.pending_lines)
+        self.pending_lines = []
+        self.pending_bytes = 0
+
+    def close(self):
+        """
+        Bekleyen satırları yazar ve dosyayı kapatır.
+        """
+        try:
+            self.flush()
+        finally:
+            self._close_file()
+
+
+# Register ölçekleme kuralları. Register değeri önce `divisor` ile bölünür,
+# `offset` eklenip `multiplier` ile çarpılır. `wrap` PLC'nin işaretsiz olarak
+# gönderdiği negatif değerleri düzeltir: ('above', eşik, taban) için değer
+# eşiği aşarsa `taban - değer`, ('abs_above', eşik, taban) için mutlak değer
+# eşiği aşarsa `|değer| - taban` kullanılır. `zero` tanımlıysa ham 0 değeri
+# ölçeklenmeden bu değere eşlenir.
+REGISTER_RULES = {
+    'testere_durumu': {'type': 'int'},
+    'alarm_status': {'type': 'int'},
+    'alarm_bilgisi': {'type': 'hex'},
+    'kafa_yuksekligi_mm': {'divisor': 10.0},
+    'serit_motor_akim_a': {'divisor': 10.0},
+    'serit_motor_tork_percentage': {'divisor': 10.0},
+    'inme_motor_akim_a': {'divisor': 100.0, 'wrap': ('above', 15, 655.35)},
+    'mengene_basinc_bar': {'divisor': 10.0},
+    'serit_gerginligi_bar': {'divisor': 10.0},
+    'serit_sapmasi': {'divisor': 100.0, 'wrap': ('abs_above', 1.5, 655.35)},
+    'ortam_sicakligi_c': {'divisor': 10.0},
+    'ortam_nem_percentage': {'divisor': 10.0},
+    'sogutma_sivi_sicakligi_c': {'divisor': 10.0},
+    'hidrolik_yag_sicakligi_c': {'divisor': 10.0},
+    'ivme_olcer_x': {'divisor': 1.0},
+    'ivme_olcer_y': {'divisor': 1.0},
+    'ivme_olcer_z': {'divisor': 1.0},
+    'serit_kesme_hizi': {'multiplier': 0.0754},
+    'serit_inme_hizi': {'offset': -65535, 'multiplier': -0.06, 'zero': 0.0},
+}
+
+
+def compile_rule(rule):
+    """
+    Ölçekleme kuralını tek bir değere uygulanan fonksiyona çevirir.
+    :param rule: REGISTER_RULES içindeki kural sözlüğü
+    :return: Ham register değerini ölçeklenmiş değere çeviren fonksiyon
+    """
+    rule_type = rule.get('type')
+    if rule_type == 'int':
+        return int
+    if rule_type == 'hex':
+        return lambda value: f"0x{int(value):04x}"
+
+    divisor = rule.get('divisor')
+    offset = rule.get('offset')
+    multiplier = rule.get('multiplier')
+    wrap = rule.get('wrap')
+    zero = rule.get('zero')
+
+    # Sık kullanılan kurallar için ek kontrol yapmayan fonksiyonlar
+    if offset is None and multiplier is None and wrap is None and zero is None:
+        return lambda value: value / divisor
+    if divisor is None and offset is None and wrap is None and zero is None:
+        return lambda value: value * multiplier
+
+    def scale(value):
+        if zero is not None and value == 0:
+            return zero
+        if divisor is not None:
+            value = value / divisor
+        if offset is not None:
+            value = value + offset
+        if multiplier is not None:
+            value = value * multiplier
+        if wrap is not None:
+            mode, threshold, base = wrap
+            if mode == 'above' and value > threshold:
+                value = base - value
+            elif mode == 'abs_above' and abs(value) > threshold:
+                value = abs(value) - base
+        return value
+
+    return scale
+
+
+def scale_array(values, rule):
+    """
+    Ölçekleme kuralını bir register sütununa vektörel olarak uygular.
+    `hex` kuralında ham değer tamsayı olarak bırakılır (biçimlendirme gösterime aittir).
+    :param values: Ham register değerleri dizisi
+    :param rule: REGISTER_RULES içindeki kural sözlüğü
+    :return: Ölçeklenmiş değerler dizisi
+    """
+    if rule.get('type') in ('int', 'hex'):
+        return values.astype(np.int64)
+
+    raw = values.astype(np.float64)
+    scaled = raw
+    if rule.get('divisor') is not None:
+        scaled = scaled / rule['divisor']
+    if rule.get('offset') is not None:
+        scaled = scaled + rule['offset']
+    if rule.get('multiplier') is not None:
+        scaled = scaled * rule['multiplier']
+    wrap = rule.get('wrap')
+    if wrap is not None:
+        mode, threshold, base = wrap
+        if mode == 'above':
+            scaled = np.where(scaled > threshold, base - scaled, scaled)
+        elif mode == 'abs_above':
+            scaled = np.where(np.abs(scaled) > threshold, np.abs(scaled) - base, scaled)
+    if rule.get('zero') is not None:
+        scaled = np.where(raw == 0, rule['zero'], scaled)
+    return scaled
+
+
+COMPILED_RULES = {col: compile_rule(rule) for col, rule in REGISTER_RULES.items()}
+
+
+class TimestampFormatter:
+    """
+    Unix zaman damgasını milisaniye hassasiyetinde metne çevirir. Saniyeye
+    kadar olan kısım aynı saniye içindeki örnekler için tekrar hesaplanmaz.
+    """
+    def __init__(self):
+        self.cached_second = None
+        self.cached_prefix = None
+
+    def format(self, sample_time):
+        # datetime.fromtimestamp gibi mikrosaniyeye yuvarlanıp milisaniyeye kesilir
+        second = int(sample_time)
+        microsecond = round((sample_time - second) * 1e6)
+        if microsecond >= 1000000:
+            second += 1
+            microsecond -= 1000000
+        millisecond = microsecond // 1000
+        if second != self.cached_second:
+            self.cached_second = second
+            self.cached_prefix = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second))
+        return f"{self.cached_prefix}.{millisecond:03d}"
+
+
+class SampleRecord:
+    """
+    Bir örneğin sütun değerlerini `__slots__` ile tutan kayıt tabanı.
+    Alt sınıflar RegisterDecoder tarafından sütun listesinden oluşturulur.
+    Sözlük gibi okunup yazılabildiği için process_row çıktısı yerine kullanılabilir.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def values(self):
+        return [getattr(self, col) for col in self.__slots__]
+
+    def items(self):
+        return [(col, getattr(self, col)) for col in self.__slots__]
+
+    def to_dict(self):
+        return {col: getattr(self, col) for col in self.__slots__}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()})"
+
+
+class RegisterDecoder:
+    """
+    config.yaml'daki sütun sözlüğünden bir kez oluşturulan register çözücü.
+    Register bloğunun i. değeri i. sütuna karşılık gelir. Her register için
+    ölçekleme fonksiyonu önceden seçilir; örnekler ara sözlük oluşturulmadan
+    doğrudan SampleRecord kaydına, toplu okumalar ise tek vektörel çağrıyla
+    NumPy structured dizisine çözülür.
+    """
+    def __init__(self, columns, number_of_registers=None):
+        """
+        :param columns: Sütun adı -> veri tipi sözlüğü
+        :param number_of_registers: Bloktaki register sayısı, None ise timestamp'e kadar olan sütunlar
+        """
+        self.columns = dict(columns)
+        fields = list(self.columns.keys())
+        if number_of_registers is None:
+            number_of_registers = fields.index('timestamp') if 'timestamp' in fields else len(fields)
+        self.register_columns = fields[:number_of_registers]
+
+        self.record_type = type('SawSample', (SampleRecord,), {'__slots__': tuple(fields)})
+        self.unset_columns = [col for col in fields if col not in self.register_columns]
+        # Her register için slot yazıcısı ve ölçekleme fonksiyonu önceden seçilir,
+        # kuralı olmayan register'lar değiştirilmeden kopyalanır
+        self.plan = [(getattr(self.record_type, col).__set__, COMPILED_RULES.get(col))
+                     for col in self.register_columns]
+        self.timestamp_formatter = TimestampFormatter()
+
+        self.dtype = np.dtype([('timestamp', np.float64)] + [
+            (col, np.int64 if REGISTER_RULES.get(col, {}).get('type') in ('int', 'hex')
+             or 'INTEGER' in self.columns[col].upper() else np.float64)
+            for col in self.register_columns if col != 'timestamp'
+        ])
+
+    def decode(self, registers, sample_time=None):
+        """
+        Tek bir register bloğunu ölçeklenmiş kayda çevirir (process_row ile aynı sonuç).
+        :param registers: Modbus'tan okunan register değerleri
+        :param sample_time: Örneğin alındığı an (time.time()), None ise şu an
+        :return: SampleRecord
+        """
+        record = self.record_type()
+        for col in self.unset_columns:
+            setattr(record, col, None)
+        for (set_value, func), value in zip(self.plan, registers):
+            set_value(record, value if func is None else func(value))
+        record.timestamp = self.timestamp_formatter.format(sample_time if sample_time is not None else time.time())
+        return record
+
+    def decode_batch(self, register_blocks, sample_times=None):
+        """
+        Birden fazla register bloğunu tek vektörel çağrıda çözer.
+        :param register_blocks: (örnek sayısı x register sayısı) liste veya dizi
+        :param sample_times: Örneklerin Unix zaman damgaları, None ise şu an
+        :return: Sütun adlarıyla erişilebilen NumPy structured dizisi
+        """
+        registers = np.asarray(register_blocks)
+        if registers.ndim != 2 or registers.shape[1] < len(self.register_columns):
+            raise ValueError(f"Beklenen register sayısı {len(self.register_columns)}, gelen şekil {registers.shape}")
+
+        result = np.empty(len(registers), dtype=self.dtype)
+        result['timestamp'] = time.time() if sample_times is None else np.asarray(sample_times, dtype=np.float64)
+        for i, col in enumerate(self.register_columns):
+            if col == 'timestamp':
+                continue
+            rule = REGISTER_RULES.get(col)
+            result[col] = scale_array(registers[:, i], rule) if rule is not None else registers[:, i]
+        return result
+
+
+def process_row(row_data, fuzzy_output_value=None):
+    # Milisaniye hassasiyetinde zaman damgası ekle (örnek okunduğu anda zaman damgalandıysa o kullanılır)
+    sample_time = row_data.get('timestamp')
+    sample_datetime = datetime.fromtimestamp(sample_time) if isinstance(sample_time, float) else datetime.now()
+    row_data['timestamp'] = sample_datetime.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    for col, func in COMPILED_RULES.items():
+        row_data[col] = func(row_data[col])
     return row_data
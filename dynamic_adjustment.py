@@ -1,5 +1,5 @@
 import time
-from speed_utility import reverse_calculate_value
+from speed_utility import write_speeds
 
 
 class DynamicAdjustment:
@@ -56,8 +56,7 @@ class DynamicAdjustment:
         new_kesme_hizi = max(20, min(new_kesme_hizi, 100))  # Kesme hızı 20-100 arasında olmalı
 
         # Modbus'a yaz
-        reverse_calculate_value(modbus_client, new_inme_hizi, 'serit_inme_hizi')
-        reverse_calculate_value(modbus_client, new_kesme_hizi, 'serit_kesme_hizi')
+        write_speeds(modbus_client, new_kesme_hizi, new_inme_hizi)
 
         print(f"Dinamik ayarlama yapıldı: Kesme Hızı={new_kesme_hizi}, İnme Hızı={new_inme_hizi}, Katsayı={self.coefficient}")
 
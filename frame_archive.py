@@ -0,0 +1,300 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+INDEX_MAGIC = b"FIDX"
+INDEX_VERSION = 1
+INDEX_HEADER_SIZE = 16
+SEGMENT_SUFFIX = ".mjpeg"
+INDEX_SUFFIX = ".idx"
+
+# Sidecar indeksindeki her kare için sabit boyutlu kayıt
+INDEX_DTYPE = np.dtype([
+    ("frame_number", "<i8"),
+    ("capture_time", "<f8"),   # Karenin yakalandığı an (time.time())
+    ("offset", "<i8"),         # Segment dosyasındaki bayt konumu
+    ("length", "<u4"),         # JPEG bayt uzunluğu
+    ("sample_time", "<f8"),    # Yakalama anındaki son sensör örneğinin zamanı, yoksa NaN
+])
+
+
+def index_header():
+    return (INDEX_MAGIC + np.array([INDEX_VERSION, INDEX_DTYPE.itemsize], dtype="<u2").tobytes()
+            + bytes(INDEX_HEADER_SIZE - 8))
+
+
+def read_index(path):
+    """
+    Sidecar indeksini okur. Yazım sırasında kesilmiş son kayıt yok sayılır.
+    :return: INDEX_DTYPE dizisi
+    """
+    with open(path, "rb") as index_file:
+        data = index_file.read()
+    if data[:4] != INDEX_MAGIC:
+        raise ValueError(f"Geçersiz kare indeksi: {path}")
+    version, record_size = np.frombuffer(data[4:8], dtype="<u2")
+    if version != INDEX_VERSION or record_size != INDEX_DTYPE.itemsize:
+        raise ValueError(f"Desteklenmeyen kare indeksi sürümü: {path} (v{version})")
+    body = data[INDEX_HEADER_SIZE:]
+    usable = len(body) - len(body) % record_size
+    return np.frombuffer(body[:usable], dtype=INDEX_DTYPE)
+
+
+def index_time_range(path):
+    """
+    İndeksin ilk ve son karesinin yakalama zamanı; yalnızca bu iki kayıt okunur.
+    :return: (ilk zaman, son zaman), indeks boşsa None
+    """
+    with open(path, "rb") as index_file:
+        index_file.seek(0, os.SEEK_END)
+        records = (index_file.tell() - INDEX_HEADER_SIZE) // INDEX_DTYPE.itemsize
+        if records <= 0:
+            return None
+        index_file.seek(INDEX_HEADER_SIZE)
+        first = np.frombuffer(index_file.read(INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)[0]
+        index_file.seek(INDEX_HEADER_SIZE + (records - 1) * INDEX_DTYPE.itemsize)
+        last = np.frombuffer(index_file.read(INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)[0]
+    return float(first["capture_time"]), float(last["capture_time"])
+
+
+def find_segments(folder):
+    """
+    Klasördeki ve bir alt düzeydeki (kayıt oturumu klasörleri) segmentleri bulur.
+    :return: Uzantısız segment yolları
+    """
+    bases = []
+    for root in [folder] + sorted(os.path.join(folder, entry) for entry in os.listdir(folder)
+                                  if os.path.isdir(os.path.join(folder, entry))):
+        for name in sorted(os.listdir(root)):
+            base = os.path.join(root, name[:-len(INDEX_SUFFIX)])
+            if name.endswith(INDEX_SUFFIX) and os.path.exists(base + SEGMENT_SUFFIX):
+                bases.append(base)
+    return bases
+
+
+class SegmentedFrameWriter:
+    """
+    JPEG kareleri zaman bölümlü segment dosyalarına art arda yazar. Her segment
+    (segment_YYYYmmdd-HHMMSS.mjpeg) ardışık JPEG'lerden oluşur ve MJPEG olarak
+    oynatılabilir; yanındaki .idx dosyası her kare için numara, yakalama zamanı,
+    bayt konumu, uzunluk ve sensör örneği zamanını sabit boyutlu kayıtlarla tutar.
+    Kare başına ayrı dosya açılmadığından dosya sistemi yükü segment sayısıyla sınırlıdır.
+    Tek thread'den kullanılmalıdır.
+    """
+    def __init__(self, folder, segment_s=60, max_segment_bytes=512 * 1024 * 1024, index_flush_frames=50):
+        """
+        :param folder: Segmentlerin yazılacağı klasör
+        :param segment_s: Yeni segmente geçilecek süre (saniye)
+        :param max_segment_bytes: Segment bu boyutu aşınca yeni segmente geçilir
+        :param index_flush_frames: İndeks kayıtlarının diske yazılma aralığı (kare)
+        """
+        self.folder = folder
+        self.segment_s = segment_s
+        self.max_segment_bytes = max_segment_bytes
+        self.index_flush_frames = index_flush_frames
+        self.segment_file = None
+        self.index_file = None
+        self.segment_start = None
+        self.offset = 0
+        self.pending = []
+        self.frames_written = 0
+        self.segments_written = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def _open_segment(self, capture_time):
+        self._close_segment()
+        name = datetime.fromtimestamp(capture_time).strftime("segment_%Y%m%d-%H%M%S")
+        base = os.path.join(self.folder, name)
+        suffix = 1
+        while os.path.exists(base + SEGMENT_SUFFIX):
+            base = os.path.join(self.folder, f"{name}-{suffix}")
+            suffix += 1
+        self.segment_file = open(base + SEGMENT_SUFFIX, "wb")
+        self.index_file = open(base + INDEX_SUFFIX, "wb")
+        self.index_file.write(index_header())
+        self.segment_start = capture_time
+        self.offset = 0
+        self.segments_written += 1
+
+    def _flush_index(self):
+        if self.pending:
+            self.index_file.write(np.array(self.pending, dtype=INDEX_DTYPE).tobytes())
+            self.pending = []
+        self.segment_file.flush()
+        self.index_file.flush()
+
+    def _close_segment(self):
+        if self.segment_file is None:
+            return
+        self._flush_index()
+        self.segment_file.close()
+        self.index_file.close()
+        self.segment_file = None
+        self.index_file = None
+
+    def write(self, jpeg, frame_number, capture_time, sample_time=None):
+        """
+        Kareyi geçerli segmente ekler; süre veya boyut sınırı aşıldıysa önce yeni segment açar.
+        :param jpeg: JPEG baytları
+        :param frame_number: Oturumdaki kare numarası
+        :param capture_time: Yakalama anı (time.time())
+        :param sample_time: Yakalama anındaki son sensör örneğinin zamanı
+        """
+        if self.segment_file is None or capture_time - self.segment_start >= self.segment_s or \
+                self.offset + len(jpeg) > self.max_segment_bytes:
+            self._open_segment(capture_time)
+        self.segment_file.write(jpeg)
+        self.pending.append((frame_number, capture_time, self.offset, len(jpeg),
+                             np.nan if sample_time is None else sample_time))
+        self.offset += len(jpeg)
+        self.frames_written += 1
+        # Segment verisi indeksten önce diske gider; indeks hiçbir zaman yazılmamış baytı göstermez
+        if len(self.pending) >= self.index_flush_frames:
+            self._flush_index()
+
+    def close(self):
+        self._close_segment()
+
+
+class FrameArchive:
+    """
+    Segment klasörü için zamana göre rastgele erişimli okuyucu. İndeksler
+    tek seferde okunur ve yakalama zamanına göre sıralı dizilerde tutulur;
+    bir anın karesi searchsorted ile bulunur, yalnızca istenen JPEG okunur.
+    Zaman aralığı verilirse yalnızca aralıkla kesişen segmentlerin indeksleri
+    yüklenir (diğerlerinin yalnızca ilk ve son kaydı okunur).
+    """
+    def __init__(self, folder, start_time=None, end_time=None):
+        """
+        :param folder: Kayıt oturumu klasörü veya oturum klasörlerini içeren kök klasör
+        :param start_time: Yüklenecek aralığın başı (yakalama zamanı, dahil), None ise sınırsız
+        :param end_time: Yüklenecek aralığın sonu (hariç), None ise sınırsız
+        """
+        self.folder = folder
+        self.start_time = start_time
+        self.end_time = end_time
+        self.segments = []
+        self.refresh()
+
+    def refresh(self):
+        """
+        Klasördeki indeksleri yeniden okur (kayıt devam ederken yeni kareler için).
+        """
+        segments = []
+        indexes = []
+        for base in find_segments(self.folder):
+            if self.start_time is not None or self.end_time is not None:
+                time_range = index_time_range(base + INDEX_SUFFIX)
+                if time_range is None or \
+                        (self.start_time is not None and time_range[1] < self.start_time) or \
+                        (self.end_time is not None and time_range[0] > self.end_time):
+                    continue
+            index = read_index(base + INDEX_SUFFIX)
+            segments.append(base + SEGMENT_SUFFIX)
+            indexes.append(index)
+        self.segments = segments
+        if indexes:
+            self.index = np.concatenate(indexes)
+            self.segment_ids = np.concatenate([np.full(len(index), i, dtype=np.int32)
+                                               for i, index in enumerate(indexes)])
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+            self.segment_ids = np.zeros(0, dtype=np.int32)
+        order = np.argsort(self.index["capture_time"], kind="stable")
+        times = self.index["capture_time"][order]
+        # Aralıkla kesişen segmentlerdeki aralık dışı kareler atılır
+        first, last = np.searchsorted(times, [-np.inf if self.start_time is None else self.start_time,
+                                              np.inf if self.end_time is None else self.end_time], side="left")
+        order = order[first:last]
+        self.index = self.index[order]
+        self.segment_ids = self.segment_ids[order]
+        self.times = self.index["capture_time"]
+
+    def __len__(self):
+        return len(self.index)
+
+    def nearest(self, capture_time):
+        """
+        Verilen ana en yakın karenin sırası, arşiv boşsa None.
+        """
+        if not len(self.times):
+            return None
+        i = int(np.searchsorted(self.times, capture_time))
+        if i == len(self.times) or (i > 0 and capture_time - self.times[i - 1] <= self.times[i] - capture_time):
+            i -= 1
+        return i
+
+    def between(self, start_time, end_time):
+        """
+        [start_time, end_time) aralığındaki karelerin sıraları.
+        """
+        return np.arange(*np.searchsorted(self.times, [start_time, end_time]))
+
+    def read(self, i):
+        """
+        Sıradaki karenin JPEG baytlarını okur.
+        """
+        record = self.index[i]
+        with open(self.segments[self.segment_ids[i]], "rb") as segment_file:
+            segment_file.seek(int(record["offset"]))
+            return segment_file.read(int(record["length"]))
+
+    def frame_at(self, capture_time):
+        """
+        Verilen ana en yakın kare.
+        :return: (indeks kaydı, JPEG baytları), arşiv boşsa None
+        """
+        i = self.nearest(capture_time)
+        return None if i is None else (self.index[i], self.read(i))
+
+    def iter_frames(self, start_time, end_time):
+        """
+        Aralıktaki kareleri sırayla döndürür; aynı segmentten ardışık kareler tek dosya açılışıyla okunur.
+        :return: (indeks kaydı, JPEG baytları) üreteci
+        """
+        segment_id = None
+        segment_file = None
+        try:
+            for i in self.between(start_time, end_time):
+                if self.segment_ids[i] != segment_id:
+                    if segment_file is not None:
+                        segment_file.close()
+                    segment_id = self.segment_ids[i]
+                    segment_file = open(self.segments[segment_id], "rb")
+                record = self.index[i]
+                segment_file.seek(int(record["offset"]))
+                yield record, segment_file.read(int(record["length"]))
+        finally:
+            if segment_file is not None:
+                segment_file.close()
+
+
+if __name__ == "__main__":
+    # Yazma ve rastgele erişim süreleri: python frame_archive.py
+    import tempfile
+
+    jpeg = b"\xff\xd8" + os.urandom(300 * 1024) + b"\xff\xd9"
+    frames = 3000
+    with tempfile.TemporaryDirectory() as folder:
+        writer = SegmentedFrameWriter(folder, segment_s=10)
+        start = time.time()
+        write_start = time.perf_counter()
+        for number in range(frames):
+            writer.write(jpeg, number + 1, start + number * 0.02, start + number * 0.02 - 0.01)
+        writer.close()
+        write_elapsed = time.perf_counter() - write_start
+
+        archive = FrameArchive(folder)
+        rng = np.random.default_rng(0)
+        queries = start + rng.uniform(0, frames * 0.02, 1000)
+        read_start = time.perf_counter()
+        for query_time in queries:
+            record, data = archive.frame_at(query_time)
+            assert len(data) == len(jpeg)
+        read_elapsed = time.perf_counter() - read_start
+
+        print(f"{frames} kare, {writer.segments_written} segment ({len(os.listdir(folder))} dosya)")
+        print(f"yazma          : {write_elapsed / frames * 1000:.3f} ms/kare")
+        print(f"zamana göre oku: {read_elapsed / len(queries) * 1000:.3f} ms/kare")
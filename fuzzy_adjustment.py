@@ -1,16 +1,84 @@
+import math
 import time
 from datetime import datetime
 from time import strftime
 
 from fuzzy_control import fuzzy_output
-from speed_utility import reverse_calculate_value, write_to_modbus
+from speed_utility import write_speeds, CuttingState
 
-cutting_start_timestamp = None
+# cutting_state verilmediğinde kullanılan ortak durum (tek testere)
+default_cutting_state = CuttingState()
+
+RATIO_TOLERANCE = 1.0  # Oran bandı: kesme_orani ± 1 (yüzde puan)
+RATIO_STEP = 0.1  # İnme hızı düzeltme adımı
+
+
+def _ratio_steps(inme_hizi, kesme_hizi, step, limit, rising):
+    """
+    Oranın sınıra ulaşması için gereken adım sayısı: tavan((sınır hızı - hız) / adım).
+    Kayan nokta hatasıyla sınırın bir adım yanına düşülmesine karşı komşu adımlar kontrol edilir.
+    """
+    target = limit * kesme_hizi / 100
+    distance = (target - inme_hizi) if rising else (inme_hizi - target)
+    n = max(math.ceil(distance / step), 1)
+    direction = step if rising else -step
+
+    def reached(count):
+        ratio = (inme_hizi + count * direction) / kesme_hizi * 100
+        return ratio >= limit if rising else ratio <= limit
+
+    while n > 1 and reached(n - 1):
+        n -= 1
+    while not reached(n):
+        n += 1
+    return n
+
+
+def correct_inme_hizi(inme_hizi, kesme_hizi, kesme_orani, tolerance=RATIO_TOLERANCE, step=RATIO_STEP):
+    """
+    İnme hızını, inme/kesme oranı kesme_orani ± tolerance bandına girecek şekilde
+    RATIO_STEP adımlarıyla düzeltir. Önceki 0.1'lik while döngüleriyle aynı sonucu
+    verir, ancak adım sayısı doğrudan hesaplandığından süre farkın büyüklüğüne bağlı değildir.
+
+    Adım bandın genişliğinden büyükse (çok düşük kesme hızı) önceki davranışta olduğu
+    gibi önce alt sınırın üstüne çıkılır, gerekirse üst sınırın altına inilir.
+    Kesme hızı sıfır veya negatifse oran tanımsızdır ve inme hızı değiştirilmez.
+    """
+    if not kesme_hizi > 0 or not math.isfinite(inme_hizi):
+        return inme_hizi
+    low = kesme_orani - tolerance
+    high = kesme_orani + tolerance
+    if inme_hizi / kesme_hizi * 100 < low:
+        inme_hizi += _ratio_steps(inme_hizi, kesme_hizi, step, low, rising=True) * step
+    if inme_hizi / kesme_hizi * 100 > high:
+        inme_hizi -= _ratio_steps(inme_hizi, kesme_hizi, step, high, rising=False) * step
+    return inme_hizi
+
+
+def correct_inme_hizi_iterative(inme_hizi, kesme_hizi, kesme_orani, tolerance=RATIO_TOLERANCE, step=RATIO_STEP,
+                                max_iterations=100000):
+    """
+    Önceki adım adım düzeltmenin sınırlı kopyası; correct_inme_hizi'nin doğrulanması için referans.
+    """
+    if not kesme_hizi > 0:
+        return inme_hizi
+    ratio = (inme_hizi / kesme_hizi) * 100
+    iterations = 0
+    while ratio < (kesme_orani - tolerance) and iterations < max_iterations:
+        inme_hizi += step
+        ratio = (inme_hizi / kesme_hizi) * 100
+        iterations += 1
+    while ratio > (kesme_orani + tolerance) and iterations < max_iterations:
+        inme_hizi -= step
+        ratio = (inme_hizi / kesme_hizi) * 100
+        iterations += 1
+    return inme_hizi
 
 
 def adjust_speeds_based_on_current(processed_speed_data, prev_current, cikis_sim, modbus_client,
                                    adaptive_speed_control_enabled, speed_buffer, last_modbus_write_time,
-                                   speed_adjustment_interval, kesme_hizi_tracker):
+                                   speed_adjustment_interval, kesme_hizi_tracker, speed_writer=None,
+                                   cutting_state=None):
     """
     Fuzzy kontrol algoritması ile hız ayarlamaları yapan fonksiyon.
 
@@ -23,24 +91,27 @@ def adjust_speeds_based_on_current(processed_speed_data, prev_current, cikis_sim
     :param last_modbus_write_time: Son modbus yazma zamanı
     :param speed_adjustment_interval: Modbus yazma aralığı
     :param kesme_hizi_tracker: Kesme hızı oranını takip eden yardımcı sınıf
+    :param speed_writer: Hız yazmalarını birleştiren SpeedCommandWriter (opsiyonel)
+    :param cutting_state: Testereye ait kesim durumu (opsiyonel)
     :return: Mevcut motor akımı, fuzzy faktörü, akım değişimi, son yazma zamanı
     """
     testere_durumu = processed_speed_data.get('testere_durumu')
-    global cutting_start_timestamp
+    if cutting_state is None:
+        cutting_state = default_cutting_state
 
     # Testere aktif değilse veya adaptif kontrol kapalıysa oranı sıfırla
     if not adaptive_speed_control_enabled or testere_durumu != 3:
-        if cutting_start_timestamp is not None:
-            cutting_start_timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            print(f"\n\nKesim işlemi bitti: {cutting_start_timestamp}\n\n")
-            cutting_start_timestamp = None
+        if cutting_state.cutting_start_timestamp is not None:
+            cutting_end_timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            print(f"\n\nKesim işlemi bitti: {cutting_end_timestamp}\n\n")
+            cutting_state.cutting_start_timestamp = None
             kesme_hizi_tracker.kesme_orani = (55.0 / 78.0) * 100
         return processed_speed_data.get('serit_motor_akim_a'), None, None, last_modbus_write_time
 
     # Kesim işlemi başlamışsa zaman damgasını oluştur
-    if cutting_start_timestamp is None:
-        cutting_start_timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        print(f"\n\nKesim işlemi başladı: {cutting_start_timestamp}\n\n")
+    if cutting_state.cutting_start_timestamp is None:
+        cutting_state.cutting_start_timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        print(f"\n\nKesim işlemi başladı: {cutting_state.cutting_start_timestamp}\n\n")
 
     current_time = time.time()
     if current_time - last_modbus_write_time < speed_adjustment_interval:
@@ -86,20 +157,46 @@ def adjust_speeds_based_on_current(processed_speed_data, prev_current, cikis_sim
         kesme_hizi_tracker.check_and_update_orani(new_serit_kesme_hizi)
 
         # Hız oranlarını düzelt
-        ratio = (new_serit_inme_hizi / new_serit_kesme_hizi) * 100
-        while ratio < (kesme_hizi_tracker.kesme_orani - 1.0):
-            new_serit_inme_hizi += 0.1
-            ratio = (new_serit_inme_hizi / new_serit_kesme_hizi) * 100
-        while ratio > (kesme_hizi_tracker.kesme_orani + 1.0):
-            new_serit_inme_hizi -= 0.1
-            ratio = (new_serit_inme_hizi / new_serit_kesme_hizi) * 100
+        new_serit_inme_hizi = correct_inme_hizi(new_serit_inme_hizi, new_serit_kesme_hizi,
+                                                kesme_hizi_tracker.kesme_orani)
 
         inme_hizi_is_negative = new_serit_inme_hizi < 0
 
         # Hızları Modbus üzerinden yaz
-        reverse_calculate_value(modbus_client, new_serit_kesme_hizi, 'serit_kesme_hizi')
-        reverse_calculate_value(modbus_client, new_serit_inme_hizi, 'serit_inme_hizi', inme_hizi_is_negative)
+        write_speeds(modbus_client, new_serit_kesme_hizi, new_serit_inme_hizi, inme_hizi_is_negative, speed_writer)
 
         last_modbus_write_time = current_time
 
     return serit_motor_akim_a, fuzzy_factor, akim_degisim, last_modbus_write_time
+
+
+if __name__ == "__main__":
+    # Analitik düzeltmenin adım adım düzeltmeyle aynı sonucu verdiğini doğrular ve süreleri karşılaştırır
+    import random
+
+    rng = random.Random(0)
+    cases = [(rng.uniform(-50, 200), rng.choice([rng.uniform(0.5, 5), rng.uniform(5, 150)]), rng.uniform(30, 100))
+             for _ in range(20000)]
+    cases += [(inme, kesme, 55.0 / 78.0 * 100) for inme in (0.0, 20.0, 55.0, 1000.0) for kesme in (0.05, 1.0, 78.0)]
+
+    max_error = 0.0
+    for inme, kesme, orani in cases:
+        expected = correct_inme_hizi_iterative(inme, kesme, orani, max_iterations=10 ** 7)
+        result = correct_inme_hizi(inme, kesme, orani)
+        max_error = max(max_error, abs(result - expected))
+        ratio = result / kesme * 100
+        # Adım bandı geçebiliyorsa sonuç bantta olmalı, geçemiyorsa üst sınırın altında
+        if RATIO_STEP / kesme * 100 <= 2 * RATIO_TOLERANCE:
+            assert orani - RATIO_TOLERANCE - 1e-9 <= ratio <= orani + RATIO_TOLERANCE + 1e-9, (inme, kesme, orani)
+        else:
+            assert ratio <= orani + RATIO_TOLERANCE + 1e-9, (inme, kesme, orani)
+    for kesme in (0.0, -10.0):
+        assert correct_inme_hizi(40.0, kesme, 70.0) == 40.0
+    print(f"{len(cases)} durum, adım adım düzeltmeye göre en büyük fark: {max_error:.2e}")
+
+    for name, function in (("while döngüsü", correct_inme_hizi_iterative), ("analitik", correct_inme_hizi)):
+        start_time = time.perf_counter()
+        for inme, kesme, orani in cases:
+            function(inme, kesme, orani)
+        elapsed = time.perf_counter() - start_time
+        print(f"{name:<14}: {elapsed / len(cases) * 1e6:.2f} us/düzeltme")
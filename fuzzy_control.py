@@ -1,70 +1,152 @@
+import time
 import numpy as np
-import skfuzzy as fuzz
-from skfuzzy import control as ctrl
 
 
-def create_fuzzy_system():
+# Giriş değişkenlerinin tanım aralıkları (lookup tablosu sınırları)
+AKIM_RANGE = (10.0, 25.0)
+AKIM_DEGISIM_RANGE = (-10.0, 10.0)
+
+# Değişken evrenleri: (başlangıç, bitiş, adım) -> np.arange parametreleri
+AKIM_UNIVERSE = (10, 25.5, 0.5)  # Akım aralığı
+AKIM_DEGISIM_UNIVERSE = (-10, 11, 1)  # Akım değişimi aralığı
+CIKIS_DEGISIM_UNIVERSE = (-3, 4, 1)  # Çıkış değişimi aralığı
+
+# Akım için üyelik fonksiyonları: terim -> (tip, parametreler)
+AKIM_TERMS = {
+    'NB': ('trap', [10, 10, 12.5, 14.5]),  # Negatif Büyük
+    'NK': ('tri', [12.5, 14.5, 16.5]),  # Negatif Küçük
+    'ideal': ('tri', [14.5, 16.5, 18.5]),  # İdeal
+    'PK': ('tri', [16.5, 18.5, 20.5]),  # Pozitif Küçük
+    'PB': ('trap', [18.5, 20.5, 25, 25]),  # Pozitif Büyük
+}
+
+# Akım değişimi için üyelik fonksiyonları
+AKIM_DEGISIM_TERMS = {
+    'NB': ('trap', [-10, -10, -4, -2]),  # Negatif Büyük
+    'NK': ('tri', [-3, -2, -1]),  # Negatif Küçük
+    'Z': ('tri', [-2, 0, 2]),  # Sıfır
+    'PK': ('tri', [1, 2, 3]),  # Pozitif Küçük
+    'PB': ('trap', [2, 4, 10, 10]),  # Pozitif Büyük
+}
+
+# Çıkış değişimi için üyelik fonksiyonları
+CIKIS_DEGISIM_TERMS = {
+    'NB': ('tri', [-3, -3, -2]),  # Negatif Büyük
+    'NO': ('tri', [-3, -2, -1]),  # Negatif Orta
+    'NK': ('tri', [-2, -1, 0]),  # Negatif Küçük
+    'Z': ('tri', [-1, 0, 1]),  # Sıfır
+    'PK': ('tri', [0, 1, 2]),  # Pozitif Küçük
+    'PO': ('tri', [1, 2, 3]),  # Pozitif Orta
+    'PB': ('tri', [2, 3, 3]),  # Pozitif Büyük
+}
+
+# Fuzzy kuralları: (akım terimi, akım değişimi terimi, çıkış terimi)
+RULES = [
+    ('NB', 'NB', 'PO'),
+    ('NB', 'NK', 'PO'),
+    ('NB', 'Z', 'PO'),
+    ('NB', 'PK', 'PO'),
+    ('NB', 'PB', 'PO'),
+    ('NK', 'NB', 'PK'),
+    ('NK', 'NK', 'PK'),
+    ('NK', 'Z', 'PK'),
+    ('NK', 'PK', 'PK'),
+    ('NK', 'PB', 'PK'),
+    ('ideal', 'NB', 'Z'),
+    ('ideal', 'NK', 'Z'),
+    ('ideal', 'Z', 'Z'),
+    ('ideal', 'PK', 'Z'),
+    ('ideal', 'PB', 'Z'),
+    ('PK', 'NB', 'NK'),
+    ('PK', 'NK', 'NK'),
+    ('PK', 'Z', 'NK'),
+    ('PK', 'PK', 'NK'),
+    ('PK', 'PB', 'NK'),
+    ('PB', 'NB', 'NO'),
+    ('PB', 'NK', 'NO'),
+    ('PB', 'Z', 'NO'),
+    ('PB', 'PK', 'NO'),
+    ('PB', 'PB', 'NO'),
+]
+
+
+def create_fuzzy_system(lookup_table=False, akim_step=0.25, akim_degisim_step=0.25, cache_path=None,
+                        verify=False, engine="skfuzzy"):
     """
     Fuzzy kontrol sistemini oluşturur.
     Akım ve akım değişimine bağlı olarak çıkış değişimini hesaplar.
+
+    :param lookup_table: True ise çıkış yüzeyi önceden hesaplanır ve bilineer
+        interpolasyon yapan FuzzyLookupTable döner
+    :param akim_step: Lookup tablosunun akım eksenindeki adımı
+    :param akim_degisim_step: Lookup tablosunun akım değişimi eksenindeki adımı
+    :param cache_path: Tablonun saklanacağı .npz dosyası, None ise önbellek kullanılmaz
+    :param verify: True ise tablonun skfuzzy'ye göre en büyük hatası raporlanır; skfuzzy
+        kurulu değilse tablonun hesaplandığı numpy motoruna göre
+    :param engine: 'skfuzzy' veya 'numpy'. 'numpy' seçilirse skfuzzy hiç import
+        edilmez ve fuzzy_engine.MamdaniEngine kullanılır
+    :return: ControlSystemSimulation, MamdaniEngine veya FuzzyLookupTable
+    """
+    if engine == "numpy":
+        from fuzzy_engine import MamdaniEngine
+        cikis_sim = MamdaniEngine()
+    elif engine == "skfuzzy":
+        cikis_sim = create_skfuzzy_system()
+    else:
+        raise ValueError(f"Bilinmeyen fuzzy motoru: {engine}")
+
+    if not lookup_table:
+        return cikis_sim
+
+    table = None
+    if cache_path is not None:
+        table = FuzzyLookupTable.load(cache_path, akim_step, akim_degisim_step)
+        if table is not None and not table.matches(cikis_sim):
+            print(f"Fuzzy lookup tablosu güncel değil, yeniden hesaplanıyor: {cache_path}")
+            table = None
+    if table is None:
+        start_time = time.time()
+        table = FuzzyLookupTable.build(cikis_sim, akim_step, akim_degisim_step)
+        print(f"Fuzzy lookup tablosu hesaplandı: {table.table.shape}, {time.time() - start_time:.1f}s")
+        if cache_path is not None:
+            table.save(cache_path)
+
+    if verify:
+        reference, reference_name = cikis_sim, engine
+        if engine != "skfuzzy":
+            try:
+                reference, reference_name = create_skfuzzy_system(), "skfuzzy"
+            except ImportError:
+                print("skfuzzy kurulu değil, lookup tablosu numpy motoruna göre doğrulanıyor")
+        max_error, worst_akim, worst_akim_degisim = verify_lookup_table(table, reference)
+        print(f"Fuzzy lookup tablosu en büyük hata ({reference_name}): {max_error:.4f} "
+              f"(Akım: {worst_akim:.3f}, Akım Değişim: {worst_akim_degisim:.3f})")
+    return table
+
+
+def create_skfuzzy_system():
     """
-    # Giriş değişkenleri
-    akim = ctrl.Antecedent(np.arange(10, 25.5, 0.5), 'akim')  # Akım aralığı
-    akim_degisim = ctrl.Antecedent(np.arange(-10, 11, 1), 'akim_degisim')  # Akım değişimi aralığı
-
-    # Çıkış değişkeni
-    cikis_degisim = ctrl.Consequent(np.arange(-3, 4, 1), 'cikis_degisim')  # Çıkış değişimi aralığı
-
-    # Akım için üyelik fonksiyonları
-    akim['NB'] = fuzz.trapmf(akim.universe, [10, 10, 12.5, 14.5])  # Negatif Büyük
-    akim['NK'] = fuzz.trimf(akim.universe, [12.5, 14.5, 16.5])  # Negatif Küçük
-    akim['ideal'] = fuzz.trimf(akim.universe, [14.5, 16.5, 18.5])  # İdeal
-    akim['PK'] = fuzz.trimf(akim.universe, [16.5, 18.5, 20.5])  # Pozitif Küçük
-    akim['PB'] = fuzz.trapmf(akim.universe, [18.5, 20.5, 25, 25])  # Pozitif Büyük
-
-    # Akım değişimi için üyelik fonksiyonları
-    akim_degisim['NB'] = fuzz.trapmf(akim_degisim.universe, [-10, -10, -4, -2])  # Negatif Büyük
-    akim_degisim['NK'] = fuzz.trimf(akim_degisim.universe, [-3, -2, -1])  # Negatif Küçük
-    akim_degisim['Z'] = fuzz.trimf(akim_degisim.universe, [-2, 0, 2])  # Sıfır
-    akim_degisim['PK'] = fuzz.trimf(akim_degisim.universe, [1, 2, 3])  # Pozitif Küçük
-    akim_degisim['PB'] = fuzz.trapmf(akim_degisim.universe, [2, 4, 10, 10])  # Pozitif Büyük
-
-    # Çıkış değişimi için üyelik fonksiyonları
-    cikis_degisim['NB'] = fuzz.trimf(cikis_degisim.universe, [-3, -3, -2])  # Negatif Büyük
-    cikis_degisim['NO'] = fuzz.trimf(cikis_degisim.universe, [-3, -2, -1])  # Negatif Orta
-    cikis_degisim['NK'] = fuzz.trimf(cikis_degisim.universe, [-2, -1, 0])  # Negatif Küçük
-    cikis_degisim['Z'] = fuzz.trimf(cikis_degisim.universe, [-1, 0, 1])  # Sıfır
-    cikis_degisim['PK'] = fuzz.trimf(cikis_degisim.universe, [0, 1, 2])  # Pozitif Küçük
-    cikis_degisim['PO'] = fuzz.trimf(cikis_degisim.universe, [1, 2, 3])  # Pozitif Orta
-    cikis_degisim['PB'] = fuzz.trimf(cikis_degisim.universe, [2, 3, 3])  # Pozitif Büyük
-
-    # Fuzzy kuralları
+    Kural tabanından scikit-fuzzy kontrol sistemi simülasyonunu oluşturur.
+    skfuzzy (ve scipy/networkx) yalnızca bu fonksiyon çağrıldığında import edilir.
+    """
+    import skfuzzy as fuzz
+    from skfuzzy import control as ctrl
+
+    membership_functions = {'tri': fuzz.trimf, 'trap': fuzz.trapmf}
+
+    # Giriş ve çıkış değişkenleri
+    akim = ctrl.Antecedent(np.arange(*AKIM_UNIVERSE), 'akim')
+    akim_degisim = ctrl.Antecedent(np.arange(*AKIM_DEGISIM_UNIVERSE), 'akim_degisim')
+    cikis_degisim = ctrl.Consequent(np.arange(*CIKIS_DEGISIM_UNIVERSE), 'cikis_degisim')
+
+    for variable, terms in ((akim, AKIM_TERMS), (akim_degisim, AKIM_DEGISIM_TERMS),
+                            (cikis_degisim, CIKIS_DEGISIM_TERMS)):
+        for label, (mf_type, params) in terms.items():
+            variable[label] = membership_functions[mf_type](variable.universe, params)
+
     rules = [
-        ctrl.Rule(akim['NB'] & akim_degisim['NB'], cikis_degisim['PO']),
-        ctrl.Rule(akim['NB'] & akim_degisim['NK'], cikis_degisim['PO']),
-        ctrl.Rule(akim['NB'] & akim_degisim['Z'], cikis_degisim['PO']),
-        ctrl.Rule(akim['NB'] & akim_degisim['PK'], cikis_degisim['PO']),
-        ctrl.Rule(akim['NB'] & akim_degisim['PB'], cikis_degisim['PO']),
-        ctrl.Rule(akim['NK'] & akim_degisim['NB'], cikis_degisim['PK']),
-        ctrl.Rule(akim['NK'] & akim_degisim['NK'], cikis_degisim['PK']),
-        ctrl.Rule(akim['NK'] & akim_degisim['Z'], cikis_degisim['PK']),
-        ctrl.Rule(akim['NK'] & akim_degisim['PK'], cikis_degisim['PK']),
-        ctrl.Rule(akim['NK'] & akim_degisim['PB'], cikis_degisim['PK']),
-        ctrl.Rule(akim['ideal'] & akim_degisim['NB'], cikis_degisim['Z']),
-        ctrl.Rule(akim['ideal'] & akim_degisim['NK'], cikis_degisim['Z']),
-        ctrl.Rule(akim['ideal'] & akim_degisim['Z'], cikis_degisim['Z']),
-        ctrl.Rule(akim['ideal'] & akim_degisim['PK'], cikis_degisim['Z']),
-        ctrl.Rule(akim['ideal'] & akim_degisim['PB'], cikis_degisim['Z']),
-        ctrl.Rule(akim['PK'] & akim_degisim['NB'], cikis_degisim['NK']),
-        ctrl.Rule(akim['PK'] & akim_degisim['NK'], cikis_degisim['NK']),
-        ctrl.Rule(akim['PK'] & akim_degisim['Z'], cikis_degisim['NK']),
-        ctrl.Rule(akim['PK'] & akim_degisim['PK'], cikis_degisim['NK']),
-        ctrl.Rule(akim['PK'] & akim_degisim['PB'], cikis_degisim['NK']),
-        ctrl.Rule(akim['PB'] & akim_degisim['NB'], cikis_degisim['NO']),
-        ctrl.Rule(akim['PB'] & akim_degisim['NK'], cikis_degisim['NO']),
-        ctrl.Rule(akim['PB'] & akim_degisim['Z'], cikis_degisim['NO']),
-        ctrl.Rule(akim['PB'] & akim_degisim['PK'], cikis_degisim['NO']),
-        ctrl.Rule(akim['PB'] & akim_degisim['PB'], cikis_degisim['NO']),
+        ctrl.Rule(akim[akim_term] & akim_degisim[akim_degisim_term], cikis_degisim[cikis_term])
+        for akim_term, akim_degisim_term, cikis_term in RULES
     ]
 
     # Kontrol sistemi ve simülasyonu oluştur
@@ -85,3 +167,130 @@ def fuzzy_output(cikis_sim, input_akim, input_akim_degisim):
     cikis_sim.input['akim_degisim'] = input_akim_degisim
     cikis_sim.compute()
     return cikis_sim.output['cikis_degisim']
+
+
+class FuzzyLookupTable:
+    """
+    Fuzzy sistemin akım x akım değişimi düzleminde önceden hesaplanmış çıkış yüzeyi.
+    Çıkış, en yakın dört ızgara noktası arasında bilineer interpolasyonla bulunur.
+    ControlSystemSimulation ile aynı `input`/`compute()`/`output` arayüzünü sunar,
+    bu sayede fuzzy_output ve mevcut kontrol algoritmaları değişmeden kullanılır.
+    """
+    def __init__(self, table, akim_step, akim_degisim_step):
+        self.table = np.asarray(table, dtype=np.float64)
+        self.akim_step = akim_step
+        self.akim_degisim_step = akim_degisim_step
+        self.akim_min, self.akim_max = AKIM_RANGE
+        self.akim_degisim_min, self.akim_degisim_max = AKIM_DEGISIM_RANGE
+        self.akim_count, self.akim_degisim_count = self.table.shape
+        # Skaler erişim numpy indekslemesinden hızlı olduğu için liste kopyası tutulur
+        self.rows = self.table.tolist()
+        self.input = {}
+        self.output = {}
+
+    @staticmethod
+    def grid(akim_step, akim_degisim_step):
+        """
+        Tablonun akım ve akım değişimi ızgara noktalarını döner.
+        """
+        akim_count = int(round((AKIM_RANGE[1] - AKIM_RANGE[0]) / akim_step)) + 1
+        akim_degisim_count = int(round((AKIM_DEGISIM_RANGE[1] - AKIM_DEGISIM_RANGE[0]) / akim_degisim_step)) + 1
+        return (np.linspace(AKIM_RANGE[0], AKIM_RANGE[1], akim_count),
+                np.linspace(AKIM_DEGISIM_RANGE[0], AKIM_DEGISIM_RANGE[1], akim_degisim_count))
+
+    @classmethod
+    def build(cls, cikis_sim, akim_step, akim_degisim_step):
+        """
+        Izgaradaki her nokta için fuzzy sistemi çalıştırarak tabloyu oluşturur.
+        """
+        akim_values, akim_degisim_values = cls.grid(akim_step, akim_degisim_step)
+        if hasattr(cikis_sim, 'evaluate'):
+            # Vektörel motor tüm ızgarayı tek çağrıda hesaplar
+            akim_grid, akim_degisim_grid = np.meshgrid(akim_values, akim_degisim_values, indexing='ij')
+            table = cikis_sim.evaluate(akim_grid, akim_degisim_grid)
+        else:
+            table = np.empty((len(akim_values), len(akim_degisim_values)))
+            for i, akim in enumerate(akim_values):
+                for j, akim_degisim in enumerate(akim_degisim_values):
+                    table[i, j] = fuzzy_output(cikis_sim, akim, akim_degisim)
+        return cls(table, akim_step, akim_degisim_step)
+
+    @classmethod
+    def load(cls, cache_path, akim_step, akim_degisim_step):
+        """
+        Önbellekteki tabloyu yükler. Dosya yoksa veya adımlar farklıysa None döner.
+        """
+        try:
+            with np.load(cache_path) as cached:
+                if float(cached["akim_step"]) != akim_step or \
+                        float(cached["akim_degisim_step"]) != akim_degisim_step:
+                    return None
+                return cls(cached["table"], akim_step, akim_degisim_step)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, cache_path):
+        np.savez(cache_path, table=self.table, akim_step=self.akim_step,
+                 akim_degisim_step=self.akim_degisim_step)
+
+    def matches(self, cikis_sim, probe_count=5):
+        """
+        Birkaç ızgara noktasında tabloyu canlı simülasyonla karşılaştırır.
+        Kurallar veya üyelik fonksiyonları değiştiyse False döner.
+        """
+        akim_values, akim_degisim_values = self.grid(self.akim_step, self.akim_degisim_step)
+        for k in range(probe_count):
+            i = (k * 7 + 3) % len(akim_values)
+            j = (k * 11 + 5) % len(akim_degisim_values)
+            live = fuzzy_output(cikis_sim, akim_values[i], akim_degisim_values[j])
+            if abs(live - self.rows[i][j]) > 1e-9:
+                return False
+        return True
+
+    def evaluate(self, input_akim, input_akim_degisim):
+        """
+        Verilen akım ve akım değişimi için çıkışı bilineer interpolasyonla hesaplar.
+        Aralık dışındaki girişler, skfuzzy'de olduğu gibi sınırlara kırpılır.
+        """
+        x = (min(max(input_akim, self.akim_min), self.akim_max) - self.akim_min) / self.akim_step
+        y = (min(max(input_akim_degisim, self.akim_degisim_min), self.akim_degisim_max)
+             - self.akim_degisim_min) / self.akim_degisim_step
+        i = min(int(x), self.akim_count - 2)
+        j = min(int(y), self.akim_degisim_count - 2)
+        tx = x - i
+        ty = y - j
+        row0 = self.rows[i]
+        row1 = self.rows[i + 1]
+        top = row0[j] + (row0[j + 1] - row0[j]) * ty
+        bottom = row1[j] + (row1[j + 1] - row1[j]) * ty
+        return top + (bottom - top) * tx
+
+    def compute(self):
+        self.output['cikis_degisim'] = self.evaluate(self.input['akim'], self.input['akim_degisim'])
+
+
+def verify_lookup_table(table, cikis_sim, samples=500, seed=0):
+    """
+    Lookup tablosunu canlı fuzzy sistem sonucu ile karşılaştırır. Hücre ortaları
+    (interpolasyon hatasının en büyük olduğu noktalar) ve rastgele noktalar kullanılır.
+    :return: En büyük mutlak hata ve bu hatanın oluştuğu akım, akım değişimi değerleri
+    """
+    rng = np.random.default_rng(seed)
+    akim_values, akim_degisim_values = table.grid(table.akim_step, table.akim_degisim_step)
+    points = np.column_stack([
+        rng.uniform(AKIM_RANGE[0], AKIM_RANGE[1], samples),
+        rng.uniform(AKIM_DEGISIM_RANGE[0], AKIM_DEGISIM_RANGE[1], samples),
+    ])
+    i = rng.integers(0, len(akim_values) - 1, samples)
+    j = rng.integers(0, len(akim_degisim_values) - 1, samples)
+    midpoints = np.column_stack([
+        (akim_values[i] + akim_values[i + 1]) / 2,
+        (akim_degisim_values[j] + akim_degisim_values[j + 1]) / 2,
+    ])
+
+    max_error, worst_akim, worst_akim_degisim = 0.0, None, None
+    for akim, akim_degisim in np.vstack([points, midpoints]):
+        error = abs(table.evaluate(akim, akim_degisim) - fuzzy_output(cikis_sim, akim, akim_degisim))
+        if worst_akim is None or error > max_error:
+            max_error, worst_akim, worst_akim_degisim = error, akim, akim_degisim
+    return max_error, worst_akim, worst_akim_degisim
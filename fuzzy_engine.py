@@ -0,0 +1,192 @@
+import time
+import numpy as np
+
+from fuzzy_control import (AKIM_UNIVERSE, AKIM_DEGISIM_UNIVERSE, CIKIS_DEGISIM_UNIVERSE,
+                           AKIM_TERMS, AKIM_DEGISIM_TERMS, CIKIS_DEGISIM_TERMS, RULES)
+
+
+def trimf(x, abc):
+    """
+    Üçgen üyelik fonksiyonu (skfuzzy.trimf ile aynı sonuç).
+    """
+    a, b, c = abc
+    y = np.zeros(len(x))
+    if a != b:
+        idx = (a < x) & (x < b)
+        y[idx] = (x[idx] - a) / float(b - a)
+    if b != c:
+        idx = (b < x) & (x < c)
+        y[idx] = (c - x[idx]) / float(c - b)
+    y[x == b] = 1
+    return y
+
+
+def trapmf(x, abcd):
+    """
+    Yamuk üyelik fonksiyonu (skfuzzy.trapmf ile aynı sonuç).
+    """
+    a, b, c, d = abcd
+    y = np.ones(len(x))
+    idx = x <= b
+    y[idx] = trimf(x[idx], (a, b, b))
+    idx = x >= c
+    y[idx] = trimf(x[idx], (c, c, d))
+    y[x < a] = 0
+    y[x > d] = 0
+    return y
+
+
+MEMBERSHIP_FUNCTIONS = {'tri': trimf, 'trap': trapmf}
+
+
+def sample_terms(universe, terms):
+    """
+    Terimlerin üyelik fonksiyonlarını evren noktalarında örnekler.
+    :return: Terim adları ve (terim sayısı x evren uzunluğu) üyelik matrisi
+    """
+    labels = list(terms.keys())
+    samples = np.array([MEMBERSHIP_FUNCTIONS[terms[label][0]](universe, terms[label][1]) for label in labels])
+    return labels, samples
+
+
+class MamdaniEngine:
+    """
+    fuzzy_control kural tabanının NumPy ile yazılmış Mamdani çıkarım motoru.
+    skfuzzy'nin ControlSystemSimulation hesabını birebir izler: üyelikler evren
+    noktalarında örneklenip doğrusal interpolasyonla bulunur, VE için min,
+    birleştirme için max kullanılır, çıkış kesim noktalarıyla genişletilmiş
+    evren üzerinde ağırlık merkezi (centroid) yöntemiyle durulaştırılır.
+
+    `evaluate` dizi halindeki (akım, akım değişimi) çiftlerini tek çağrıda
+    hesaplar. `input`/`compute()`/`output` arayüzü sayesinde fuzzy_output ile
+    skfuzzy simülasyonunun yerine doğrudan kullanılabilir.
+    """
+    def __init__(self, chunk_size=65536):
+        self.chunk_size = chunk_size
+        self.akim_universe = np.arange(*AKIM_UNIVERSE).astype(np.float64)
+        self.akim_degisim_universe = np.arange(*AKIM_DEGISIM_UNIVERSE).astype(np.float64)
+        self.cikis_universe = np.arange(*CIKIS_DEGISIM_UNIVERSE).astype(np.float64)
+
+        akim_labels, self.akim_mf = sample_terms(self.akim_universe, AKIM_TERMS)
+        akim_degisim_labels, self.akim_degisim_mf = sample_terms(self.akim_degisim_universe, AKIM_DEGISIM_TERMS)
+        cikis_labels, cikis_mf = sample_terms(self.cikis_universe, CIKIS_DEGISIM_TERMS)
+
+        # Sadece kurallarda kullanılan çıkış terimleri durulaştırmaya katılır
+        used_cikis = [label for label in cikis_labels if any(rule[2] == label for rule in RULES)]
+        self.cikis_mf = cikis_mf[[cikis_labels.index(label) for label in used_cikis]]
+
+        self.rule_akim = np.array([akim_labels.index(rule[0]) for rule in RULES])
+        self.rule_akim_degisim = np.array([akim_degisim_labels.index(rule[1]) for rule in RULES])
+        self.rule_cikis = np.array([used_cikis.index(rule[2]) for rule in RULES])
+
+        self.input = {}
+        self.output = {}
+
+    def _memberships(self, values, universe, samples):
+        # Girişler evren sınırlarına kırpılır (skfuzzy clip_to_bounds=True)
+        values = np.clip(values, universe[0], universe[-1])
+        return np.stack([np.interp(values, universe, mf) for mf in samples], axis=1)
+
+    def _cuts(self, akim, akim_degisim):
+        """
+        Her örnek için çıkış terimlerinin aktivasyon (kesim) seviyelerini hesaplar.
+        :return: (örnek sayısı x kullanılan çıkış terimi sayısı) matris
+        """
+        akim_membership = self._memberships(akim, self.akim_universe, self.akim_mf)
+        akim_degisim_membership = self._memberships(akim_degisim, self.akim_degisim_universe, self.akim_degisim_mf)
+
+        # Kural ateşlemeleri: VE = min
+        firing = np.fmin(akim_membership[:, self.rule_akim], akim_degisim_membership[:, self.rule_akim_degisim])
+
+        # Aynı çıkış terimine giden kurallar max ile birleştirilir
+        cuts = np.zeros((len(akim), len(self.cikis_mf)))
+        for term in range(len(self.cikis_mf)):
+            cuts[:, term] = firing[:, self.rule_cikis == term].max(axis=1)
+        return cuts
+
+    def _defuzz(self, cuts):
+        """
+        Kesilmiş çıkış kümelerinin birleşiminin ağırlık merkezini hesaplar.
+        """
+        x = self.cikis_universe
+        mf = self.cikis_mf
+        n = len(cuts)
+        eps = np.finfo(float).eps
+
+        # Kesim seviyesinin üyelik fonksiyonunu kestiği noktaları evrene ekle.
+        # Kesişim olmayan aralıklar için evren noktası kullanılır (tekrar eden
+        # noktalar sıfır genişlikli aralık oluşturur ve sonuca etki etmez).
+        x0, x1 = x[:-1], x[1:]
+        mf0, mf1 = mf[:, :-1], mf[:, 1:]
+        h = cuts[:, :, None]
+        crosses = (mf0[None] >= h) != (mf1[None] >= h)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing = x0 + (h - mf0[None]) * (x1 - x0) / (mf1 - mf0)[None]
+        crossing = np.where(crosses & (h > 0), crossing, x0)
+        points = np.concatenate([np.broadcast_to(x, (n, len(x))), crossing.reshape(n, -1)], axis=1)
+        points.sort(axis=1)
+
+        # Genişletilmiş evrende birleşik üyelik: max_k min(kesim_k, mf_k(x))
+        output_mf = np.zeros_like(points)
+        for term in range(len(mf)):
+            np.maximum(output_mf, np.fmin(cuts[:, term:term + 1], np.interp(points, x, mf[term])), out=output_mf)
+
+        # Noktalar arası doğrusal kabulüyle yamuk alanları ve momentleri
+        dx = np.diff(points, axis=1)
+        y1 = output_mf[:, :-1]
+        y2 = output_mf[:, 1:]
+        area = 0.5 * dx * (y1 + y2)
+        moment_area = dx * dx * (y2 + 0.5 * y1) / 3.0 + points[:, :-1] * area
+        return moment_area.sum(axis=1) / np.fmax(area.sum(axis=1), eps)
+
+    def evaluate(self, akim, akim_degisim):
+        """
+        Akım ve akım değişimi dizileri için çıkış değişimini hesaplar.
+        :param akim: Akım değeri veya dizisi
+        :param akim_degisim: Akım değişimi değeri veya dizisi (akim ile aynı şekil)
+        :return: Girişlerle aynı şekilde çıkış değişimi
+        """
+        akim, akim_degisim = np.broadcast_arrays(np.asarray(akim, dtype=np.float64),
+                                                 np.asarray(akim_degisim, dtype=np.float64))
+        shape = akim.shape
+        akim = akim.ravel()
+        akim_degisim = akim_degisim.ravel()
+
+        result = np.empty(len(akim))
+        for start in range(0, len(akim), self.chunk_size):
+            end = start + self.chunk_size
+            result[start:end] = self._defuzz(self._cuts(akim[start:end], akim_degisim[start:end]))
+        return result.reshape(shape)
+
+    def compute(self):
+        self.output['cikis_degisim'] = float(self.evaluate(self.input['akim'], self.input['akim_degisim']))
+
+
+def verify_engine(engine, cikis_sim, samples=500, seed=0):
+    """
+    NumPy motorunu skfuzzy simülasyonu ile rastgele noktalarda karşılaştırır.
+    :return: En büyük mutlak hata
+    """
+    from fuzzy_control import fuzzy_output
+
+    rng = np.random.default_rng(seed)
+    akim = rng.uniform(AKIM_UNIVERSE[0] - 2, AKIM_UNIVERSE[1] + 2, samples)
+    akim_degisim = rng.uniform(AKIM_DEGISIM_UNIVERSE[0] - 2, AKIM_DEGISIM_UNIVERSE[1] + 2, samples)
+    results = engine.evaluate(akim, akim_degisim)
+    expected = np.array([fuzzy_output(cikis_sim, a, d) for a, d in zip(akim, akim_degisim)])
+    return float(np.max(np.abs(results - expected)))
+
+
+if __name__ == "__main__":
+    from fuzzy_control import create_skfuzzy_system
+
+    engine = MamdaniEngine()
+    print(f"skfuzzy'ye göre en büyük hata: {verify_engine(engine, create_skfuzzy_system()):.2e}")
+
+    rng = np.random.default_rng(1)
+    akim = rng.uniform(10, 25, 1_000_000)
+    akim_degisim = rng.uniform(-10, 10, 1_000_000)
+    start_time = time.perf_counter()
+    engine.evaluate(akim, akim_degisim)
+    elapsed = time.perf_counter() - start_time
+    print(f"{len(akim)} örnek: {elapsed:.2f}s ({elapsed / len(akim) * 1e6:.2f} us/örnek)")
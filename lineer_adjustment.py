@@ -1,74 +1,25 @@
 import time
 from datetime import datetime
 
-from speed_utility import reverse_calculate_value, write_to_modbus
+from speed_utility import write_speeds, CuttingState
 from fuzzy_control import fuzzy_output
+from speed_profile import SpeedProfileLibrary
 
-# Speed matrix tanımı
-speed_matrix = [
-    [300, 78, 55],
-    [290, 76, 52],
-    [280, 74, 45],
-    [270, 72, 42],
-    [260, 70, 36],
-    [250, 69, 33],
-    [240, 68, 30],
-    [230, 68, 28.5],
-    [220, 67, 27],
-    [210, 66, 25.5],
-    [200, 66, 24.8],
-    [190, 66, 24.2],
-    [180, 65, 23.6],
-    [170, 65, 23.6],
-    [160, 65, 23.4],
-    [150, 65, 23.4],
-    [140, 65, 23.4],
-    [130, 65, 23.6],
-    [120, 65, 23.6],
-    [110, 66, 24.2],
-    [100, 66, 24.8],
-    [90, 66, 25.5],
-    [80, 67, 27],
-    [70, 68, 28.5],
-    [60, 68, 30],
-    [50, 69, 33],
-    [40, 70, 36],
-    [30, 72, 42],
-    [20, 74, 45],
-    [10, 76, 52],
-    [0, 78, 55]
-]
-katsayi = 1.10
-
-def interpolate_speeds_by_height(height):
-    """
-    Verilen yükseklik için kesme ve inme hızlarını lineer interpolasyon ile hesaplar.
-
-    :param height: Yükseklik (mm)
-    :return: Kesme hızı ve inme hızı
-    """
+# speed_profiles verilmediğinde kullanılan profiller; ilk lineer ayarlamada yüklenir
+default_speed_profiles = None
 
-    if height >= speed_matrix[0][0]:
-        return speed_matrix[0][1], speed_matrix[0][2]
-    elif height <= speed_matrix[-1][0]:
-        return speed_matrix[-1][1], speed_matrix[-1][2]
 
-    for i in range(len(speed_matrix) - 1):
-        high = speed_matrix[i][0]
-        low = speed_matrix[i + 1][0]
-        if high >= height > low:
-            high_speeds = speed_matrix[i][1], speed_matrix[i][2]
-            low_speeds = speed_matrix[i + 1][1], speed_matrix[i + 1][2]
+def get_default_speed_profiles():
+    global default_speed_profiles
+    if default_speed_profiles is None:
+        default_speed_profiles = SpeedProfileLibrary("speed_profiles.yaml")
+    return default_speed_profiles
 
-            kesme_hizi = ((height - low) / (high - low)) * (high_speeds[0] - low_speeds[0]) + low_speeds[0]
-            inme_hizi = ((height - low) / (high - low)) * (high_speeds[1] - low_speeds[1]) + low_speeds[1]
-            return kesme_hizi, inme_hizi
+# cutting_state verilmediğinde kullanılan ortak durum (tek testere)
+default_cutting_state = CuttingState()
 
-    return (speed_matrix[-1][1]), (speed_matrix[-1][2])
-
-cutting_start_timestamp = None
-
-def adjust_speeds_linear(processed_speed_data, modbus_client, last_modbus_write_time, speed_adjustment_interval, cikis_sim, prev_current):
+def adjust_speeds_linear(processed_speed_data, modbus_client, last_modbus_write_time, speed_adjustment_interval, cikis_sim, prev_current,
+                         speed_writer=None, cutting_state=None, speed_profiles=None):
     """
     Lineer kontrol algoritması ile hız ayarlamaları yapan fonksiyon.
 
@@ -77,23 +28,26 @@ def adjust_speeds_linear(processed_speed_data, modbus_client, last_modbus_write_
     :param last_modbus_write_time: Son modbus yazma zamanı
     :param speed_adjustment_interval: Modbus yazma aralığı
     :param cikis_sim: Fuzzy kontrol sistemi simülasyonu
+    :param speed_writer: Hız yazmalarını birleştiren SpeedCommandWriter (opsiyonel)
+    :param cutting_state: Testereye ait kesim durumu (opsiyonel)
+    :param speed_profiles: Kafa yüksekliği -> hız profilleri, SpeedProfileLibrary (opsiyonel)
     :return: Son yazma zamanı ve fuzzy output değeri
     """
     testere_durumu = processed_speed_data.get('testere_durumu')
-    global katsayi
-    global cutting_start_timestamp
+    if cutting_state is None:
+        cutting_state = default_cutting_state
 
     # Testere durumu aktif değilse çıkış yap
     if testere_durumu != 3:
-        if cutting_start_timestamp is not None:
+        if cutting_state.cutting_start_timestamp is not None:
             cutting_end_timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
             print(f"\n\nKesim işlemi bitti: {cutting_end_timestamp}\n\n")
-            cutting_start_timestamp = None
+            cutting_state.cutting_start_timestamp = None
         return last_modbus_write_time, None
 
-    if cutting_start_timestamp is None:
-        cutting_start_timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        print(f"\n\nKesim işlemi başladı: {cutting_start_timestamp}\n\n")
+    if cutting_state.cutting_start_timestamp is None:
+        cutting_state.cutting_start_timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        print(f"\n\nKesim işlemi başladı: {cutting_state.cutting_start_timestamp}\n\n")
 
     current_time = time.time()
 
@@ -101,18 +55,13 @@ def adjust_speeds_linear(processed_speed_data, modbus_client, last_modbus_write_
     if current_time - last_modbus_write_time < speed_adjustment_interval:
         return last_modbus_write_time, None
 
-    # Kafa yüksekliğine göre hızları lineer olarak hesapla
+    # Kafa yüksekliğine göre hızları malzeme/şerite uygun profilden lineer olarak hesapla
+    if speed_profiles is None:
+        speed_profiles = get_default_speed_profiles()
+    profile = speed_profiles.profile_for(processed_speed_data)
     kafa_yuksekligi_mm = processed_speed_data.get('kafa_yuksekligi_mm', 0)
-    serit_kesme_hizi, serit_inme_hizi = interpolate_speeds_by_height(kafa_yuksekligi_mm)
-    print("inme1: ", serit_inme_hizi)
-    serit_inme_hizi = serit_inme_hizi * katsayi
-    serit_kesme_hizi = serit_kesme_hizi * katsayi
-    print("inmeKatsayili: ", serit_inme_hizi)
-
-    # Sınır kontrolü (20 alt sınır, 100 üst sınır)
-    new_serit_inme_hizi = max(5, min(serit_inme_hizi, 101))
-    new_serit_kesme_hizi = max(5, min(serit_kesme_hizi, 101))
-    print("inmeSinirli: " , new_serit_inme_hizi)
+    # Katsayı ve sınırlar (profilde min_speed/max_speed) uygulanmış hızlar
+    new_serit_kesme_hizi, new_serit_inme_hizi = profile.command(kafa_yuksekligi_mm)
 
     # Hız değerlerini güncelle
     processed_speed_data['serit_kesme_hizi'] = new_serit_kesme_hizi
@@ -128,11 +77,9 @@ def adjust_speeds_linear(processed_speed_data, modbus_client, last_modbus_write_
     inme_hizi_is_negative = new_serit_inme_hizi < 0
 
     # Hızları Modbus üzerinden yaz
-    reverse_calculate_value(modbus_client, new_serit_kesme_hizi, 'serit_kesme_hizi')
-    print("inmeSon: " , new_serit_inme_hizi)
-    reverse_calculate_value(modbus_client, new_serit_inme_hizi, 'serit_inme_hizi', inme_hizi_is_negative)
+    write_speeds(modbus_client, new_serit_kesme_hizi, new_serit_inme_hizi, inme_hizi_is_negative, speed_writer)
 
-    print(f"Lineer hız ayarlandı: Kesme Hızı={new_serit_kesme_hizi}, İnme Hızı={new_serit_inme_hizi}, Fuzzy Output={fuzzy_output_value}")
+    print(f"Lineer hız ayarlandı ({profile.name}): Kesme Hızı={new_serit_kesme_hizi}, İnme Hızı={new_serit_inme_hizi}, Fuzzy Output={fuzzy_output_value}")
     last_modbus_write_time = current_time
 
     return last_modbus_write_time, fuzzy_output_value
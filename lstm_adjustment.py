@@ -1,20 +1,47 @@
 import time
 import numpy as np
-from tensorflow.keras.models import load_model
-from sklearn.preprocessing import MinMaxScaler
-from speed_utility import reverse_calculate_value
+from speed_utility import write_speeds, PredictionScheduler
+from telemetry_buffer import TelemetryRingBuffer
+from lstm_streaming import StreamingLSTM
+from model_bundle import load_bundle
+from cut_session import CUTTING_STATE, MAX_SAMPLE_GAP_S
+
+# Varsayılan model paketi (bkz. model_bundle); ilk kullanımda yüklenir
+MODEL_BUNDLE_PATH = "akim_kesme_inme_filtresiz"
+MODEL_BACKEND = "numpy"
+MODEL_STREAMING = None  # None (her örnekte tüm pencere), "exact" veya "stateful" (bkz. lstm_streaming)
 
 
 class LSTMAdjustment:
-    def __init__(self, model_path):
-        # LSTM modelini yükle ve ölçekleyicileri başlat
-        self.model = load_model(model_path, compile=False)
-        self.scaler_x = MinMaxScaler()
-        self.scaler_y = MinMaxScaler()
-        self.time_steps = 30
-        self.future_offset = 0.5  # 500 ms (5 adım sonrasını tahmin)
-        self.buffer = []  # [(zaman_damgası, tahmin_değerleri), ...]
+    def __init__(self, bundle_path, backend="numpy", streaming=None):
+        """
+        :param bundle_path: Model paketi klasörü (bkz. model_bundle)
+        :param backend: "keras", "tflite", "onnx" veya "numpy" (bkz. lstm_backends)
+        :param streaming: None (her örnekte tüm pencere), "exact" veya "stateful"
+                          (bkz. lstm_streaming); yalnızca numpy arka ucu ile
+        """
+        # Model, eğitimde kullanılan ölçekleyiciler ve giriş sırası paketten okunur
+        bundle = load_bundle(bundle_path)
+        self.model_version = bundle.model_version
+        self.backend = bundle.backend(backend)
+        self.scaler_x = bundle.scaler_x
+        self.scaler_y = bundle.scaler_y
+        self.time_steps = bundle.time_steps
+        self.stream = None
+        if streaming is not None:
+            if backend != "numpy":
+                raise ValueError("Akış modu yalnızca numpy arka ucu ile kullanılabilir")
+            self.stream = StreamingLSTM(self.backend, self.time_steps, streaming)
+        self.future_offset = bundle.future_offset
+        self.input_fields = list(bundle.features)
+        # Ortak telemetri tamponu verilmezse kullanılan giriş penceresi
+        self.input_buffer = TelemetryRingBuffer(self.input_fields, capacity=self.time_steps)
+        # Zamanı gelmemiş tahminler hedef zamana göre sıralı tutulur
+        self.scheduler = PredictionScheduler()
         self.last_modbus_write_time = time.time()
+        # Akış durumunun sıfırlanması için kesim durumu ve son örnek zamanı
+        self.was_cutting = False
+        self.last_sample_time = None
 
     def prepare_data(self, data_window):
         """
@@ -29,51 +56,76 @@ class LSTMAdjustment:
         LSTM modelini kullanarak hızları tahmin eder.
         """
         X = self.prepare_data(data_window)
-        y_pred = self.model.predict(X)
+        y_pred = self.backend.predict(X)
         y_pred_inv = self.scaler_y.inverse_transform(y_pred)
         return y_pred_inv[0]
 
+    def reset_stream_if_needed(self, sample, sample_time):
+        """
+        Akış durumunu kesim başlarken (testere_durumu kesime geçtiğinde) veya örnekler
+        arasında MAX_SAMPLE_GAP_S'den uzun kesinti olduğunda sıfırlar; önceki kesimin
+        veya kesintiden önceki örneklerin durumu yeni tahminlere taşınmaz.
+        """
+        cutting = sample.get('testere_durumu') == CUTTING_STATE
+        gap = self.last_sample_time is not None and sample_time - self.last_sample_time > MAX_SAMPLE_GAP_S
+        if (cutting and not self.was_cutting) or gap:
+            self.stream.reset()
+        self.was_cutting = cutting
+        self.last_sample_time = sample_time
+
+    def step_speeds(self, sample):
+        """
+        Akış modunda modeli yeni örnekle bir adım ilerletir.
+        :return: Tahmin edilen hızlar, ilk pencere dolmadan None
+        """
+        normalized = self.scaler_x.transform([sample[field] for field in self.input_fields])
+        y_pred = self.stream.step(normalized)
+        if y_pred is None:
+            return None
+        return self.scaler_y.inverse_transform(y_pred)
+
     def store_predictions(self, predicted_speeds):
         """
-        Tahmini hedef zaman damgası ile birlikte tamponda saklar.
+        Tahmini hedef zaman damgası ile birlikte zamanlayıcıya ekler.
         """
-        current_time = time.time()
-        target_time = current_time + self.future_offset
-        self.buffer.append((target_time, predicted_speeds))
+        self.scheduler.schedule(time.time() + self.future_offset, predicted_speeds)
 
     def send_to_modbus(self, modbus_client):
         """
-        Tampondaki tahminleri kontrol eder ve zamanı gelen tahminleri Modbus'a gönderir.
+        Zamanı gelen tahminlerden yalnızca en yenisini Modbus'a gönderir;
+        aynı anda zamanı gelen eski tahminler atlanır.
         """
-        current_time = time.time()
-        new_buffer = []
-        for target_time, predicted_speeds in self.buffer:
-            if current_time >= target_time:
-                serit_kesme_hizi, serit_inme_hizi = predicted_speeds
-                # Modbus'a yaz
-                reverse_calculate_value(modbus_client, serit_kesme_hizi, 'serit_kesme_hizi')
-                reverse_calculate_value(modbus_client, serit_inme_hizi, 'serit_inme_hizi')
-                print(f"Modbus'a yazıldı: Kesme Hızı={serit_kesme_hizi}, İnme Hızı={serit_inme_hizi}, Zaman={target_time}")
-            else:
-                new_buffer.append((target_time, predicted_speeds))  # Zamanı gelmeyenleri koru
-        self.buffer = new_buffer
+        due = self.scheduler.pop_due()
+        if due is None:
+            return
+        target_time, (serit_kesme_hizi, serit_inme_hizi) = due
+        # Modbus'a yaz
+        write_speeds(modbus_client, serit_kesme_hizi, serit_inme_hizi)
+        self.last_modbus_write_time = time.time()
+        print(f"Modbus'a yazıldı: Kesme Hızı={serit_kesme_hizi}, İnme Hızı={serit_inme_hizi}, Zaman={target_time}")
 
-    def adjust_speeds(self, processed_speed_data, modbus_client, speed_adjustment_interval):
+    def adjust_speeds(self, processed_speed_data, modbus_client, speed_adjustment_interval, telemetry=None):
         """
         LSTM tahminine göre hız ayarlarını yapar ve zamanı geldiğinde Modbus'a gönderir.
+        :param telemetry: Testerenin TelemetryRingBuffer'ı; verilirse örnek zaten eklenmiş
+                          kabul edilir ve pencere doğrudan bu tampondan okunur
         """
-        # Zaman serisi tamponunu güncelle
-        self.buffer.append([
-            processed_speed_data['serit_motor_akim_a'],
-            processed_speed_data['serit_kesme_hizi'],
-            processed_speed_data['serit_inme_hizi']
-        ])
-        if len(self.buffer) > self.time_steps:
-            self.buffer.pop(0)
-
-        # Tampon yeterli veri içeriyorsa tahmin yap
-        if len(self.buffer) >= self.time_steps:
-            predicted_speeds = self.predict_speeds(self.buffer)
+        if self.stream is not None:
+            # Durum her örnekte bir adım ilerletilir, pencere yeniden çalıştırılmaz
+            self.reset_stream_if_needed(processed_speed_data, time.monotonic())
+            predicted_speeds = self.step_speeds(processed_speed_data)
+            if predicted_speeds is not None:
+                self.store_predictions(predicted_speeds)
+            self.send_to_modbus(modbus_client)
+            return self.last_modbus_write_time, None
+
+        if telemetry is None:
+            telemetry = self.input_buffer
+            telemetry.append(processed_speed_data)
+
+        # Tampon yeterli veri içeriyorsa son time_steps örnek üzerinden tahmin yap
+        if len(telemetry) >= self.time_steps:
+            predicted_speeds = self.predict_speeds(telemetry.window(self.time_steps, self.input_fields))
             self.store_predictions(predicted_speeds)
 
         # Zamanı gelen tahminleri Modbus'a gönder
@@ -82,12 +134,22 @@ class LSTMAdjustment:
         return self.last_modbus_write_time, None
 
 
-# LSTM modeli için global bir örnek
-lstm_adjustment = LSTMAdjustment("akim_kesme_inme_filtresiz.keras")
+# LSTM modeli için global örnek; içe aktarmada değil ilk ayarlamada yüklenir
+lstm_adjustment = None
+
+
+def get_lstm_adjustment():
+    global lstm_adjustment
+    if lstm_adjustment is None:
+        lstm_adjustment = LSTMAdjustment(MODEL_BUNDLE_PATH, MODEL_BACKEND, MODEL_STREAMING)
+        print(f"LSTM model paketi yüklendi: {MODEL_BUNDLE_PATH} (sürüm {lstm_adjustment.model_version}, "
+              f"akış: {MODEL_STREAMING or 'kapalı'})")
+    return lstm_adjustment
 
 
-def adjust_speeds_linear(processed_speed_data, modbus_client, last_modbus_write_time, speed_adjustment_interval, cikis_sim, prev_current):
+def adjust_speeds_linear(processed_speed_data, modbus_client, last_modbus_write_time, speed_adjustment_interval, cikis_sim, prev_current,
+                         telemetry=None):
     """
     Lineer ayarlama yerine LSTM modeli ile hız ayarlarını yapar.
     """
-    return lstm_adjustment.adjust_speeds(processed_speed_data, modbus_client, speed_adjustment_interval)
+    return get_lstm_adjustment().adjust_speeds(processed_speed_data, modbus_client, speed_adjustment_interval, telemetry=telemetry)
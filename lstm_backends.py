@@ -0,0 +1,322 @@
+import time
+import numpy as np
+
+
+def sigmoid(x):
+    # tanh ile yazılmış sigmoid büyük negatif girişlerde taşma uyarısı vermez
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+ACTIVATIONS = {
+    'sigmoid': sigmoid,
+    'tanh': np.tanh,
+    'relu': lambda x: np.maximum(x, 0.0),
+    'linear': lambda x: x,
+    'hard_sigmoid': lambda x: np.clip(x + 3.0, 0.0, 6.0) / 6.0,  # Keras 3 tanımı
+}
+
+
+def activation(name):
+    if name not in ACTIVATIONS:
+        raise ValueError(f"Desteklenmeyen aktivasyon: {name}")
+    return ACTIVATIONS[name]
+
+
+class KerasBackend:
+    """
+    Keras modelini `model.predict` yerine doğrudan `model(x, training=False)`
+    çağrısıyla çalıştırır. `predict` her çağrıda veri hattı kurduğu için tek
+    pencerelik tahminlerde onlarca milisaniye ek yük getirir. Çağrı sabit
+    giriş imzalı bir tf.function içinde derlenir. TensorFlow yalnızca bu
+    arka uç oluşturulduğunda içe aktarılır.
+    """
+    name = "keras"
+
+    def __init__(self, model_path):
+        import tensorflow as tf
+
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+        time_steps, features = self.model.input_shape[1:]
+        self.call = tf.function(lambda x: self.model(x, training=False),
+                                input_signature=[tf.TensorSpec([None, time_steps, features], tf.float32)])
+
+    def predict(self, x):
+        """
+        :param x: (örnek sayısı x zaman adımı x özellik) dizi
+        :return: (örnek sayısı x çıkış) dizi
+        """
+        return self.call(np.asarray(x, dtype=np.float32)).numpy()
+
+
+class TFLiteBackend:
+    """
+    Dışa aktarılmış .tflite modelini CPU üzerinde çalıştırır. tflite_runtime
+    kuruluysa TensorFlow gerekmez, aksi halde tf.lite kullanılır.
+    """
+    name = "tflite"
+
+    def __init__(self, model_path, num_threads=1):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = None
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        if self.batch_size != len(x):
+            self.interpreter.resize_tensor_input(self.input_detail['index'], x.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(x)
+        self.interpreter.set_tensor(self.input_detail['index'], x)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+
+class OnnxBackend:
+    """
+    Dışa aktarılmış .onnx modelini ONNX Runtime CPU sağlayıcısı ile çalıştırır.
+    """
+    name = "onnx"
+
+    def __init__(self, model_path, num_threads=1):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, x):
+        return self.session.run(None, {self.input_name: np.asarray(x, dtype=np.float32)})[0]
+
+
+class NumpyLSTMBackend:
+    """
+    Yığılmış LSTM ve Dense katmanlarından oluşan küçük modeller için saf
+    NumPy ileri geçişi. Keras LSTM ağırlık düzenini (kernel, recurrent_kernel,
+    bias; kapı sırası i, f, c, o) kullanır. Ağırlıklar Keras modelinden bir
+    kez .npz dosyasına aktarılır, çalışma anında TensorFlow gerekmez.
+    """
+    name = "numpy"
+
+    def __init__(self, layers):
+        """
+        :param layers: Katman sözlükleri listesi. LSTM için type='lstm', kernel,
+                       recurrent_kernel, bias, activation, recurrent_activation,
+                       return_sequences; Dense için type='dense', kernel, bias, activation
+        """
+        self.layers = []
+        for layer in layers:
+            layer = dict(layer)
+            for key in ('kernel', 'recurrent_kernel', 'bias'):
+                if key in layer:
+                    layer[key] = np.asarray(layer[key], dtype=np.float64)
+            layer['activation_fn'] = activation(layer.get('activation', 'linear' if layer['type'] == 'dense' else 'tanh'))
+            if layer['type'] == 'lstm':
+                layer['recurrent_activation_fn'] = activation(layer.get('recurrent_activation', 'sigmoid'))
+                layer['units'] = layer['recurrent_kernel'].shape[0]
+            elif layer['type'] != 'dense':
+                raise ValueError(f"Desteklenmeyen katman tipi: {layer['type']}")
+            self.layers.append(layer)
+
+    @classmethod
+    def from_keras(cls, model):
+        """
+        Keras Sequential modelinin ağırlıklarını alır. Dropout ve giriş
+        katmanları çıkarımda etkisiz olduğundan atlanır.
+        """
+        layers = []
+        for keras_layer in model.layers:
+            layer_type = type(keras_layer).__name__
+            config = keras_layer.get_config()
+            if layer_type == 'LSTM':
+                kernel, recurrent_kernel, bias = keras_layer.get_weights()
+                layers.append({
+                    'type': 'lstm', 'kernel': kernel, 'recurrent_kernel': recurrent_kernel, 'bias': bias,
+                    'activation': config['activation'], 'recurrent_activation': config['recurrent_activation'],
+                    'return_sequences': config['return_sequences'],
+                })
+            elif layer_type == 'Dense':
+                kernel, bias = keras_layer.get_weights()
+                layers.append({'type': 'dense', 'kernel': kernel, 'bias': bias, 'activation': config['activation']})
+            elif layer_type not in ('Dropout', 'InputLayer'):
+                raise ValueError(f"NumPy arka ucu {layer_type} katmanını desteklemiyor")
+        return cls(layers)
+
+    def save_npz(self, path):
+        """
+        Ağırlıkları ve katman yapılandırmasını tek .npz dosyasına yazar.
+        """
+        arrays = {}
+        for i, layer in enumerate(self.layers):
+            for key, value in layer.items():
+                if key.endswith('_fn') or key == 'units':
+                    continue
+                arrays[f"layer{i}_{key}"] = np.asarray(value)
+        arrays['layer_count'] = np.array(len(self.layers))
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load_npz(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            layers = []
+            for i in range(int(data['layer_count'])):
+                prefix = f"layer{i}_"
+                layer = {}
+                for key in data.files:
+                    if key.startswith(prefix):
+                        value = data[key]
+                        layer[key[len(prefix):]] = value.item() if value.ndim == 0 else value
+                layers.append(layer)
+        return cls(layers)
+
+    def lstm_step(self, layer, projected, h, c):
+        """
+        LSTM katmanının tek zaman adımı.
+        :param projected: Girişin kernel ile çarpımı (örnek sayısı x 4 * units)
+        :param h: Önceki gizli durum
+        :param c: Önceki hücre durumu
+        :return: Yeni (h, c)
+        """
+        units = layer['units']
+        z = projected + h @ layer['recurrent_kernel'] + layer['bias']
+        recurrent_activation = layer['recurrent_activation_fn']
+        i = recurrent_activation(z[:, :units])
+        f = recurrent_activation(z[:, units:2 * units])
+        g = layer['activation_fn'](z[:, 2 * units:3 * units])
+        o = recurrent_activation(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * layer['activation_fn'](c)
+        return h, c
+
+    def predict(self, x):
+        """
+        :param x: (örnek sayısı x zaman adımı x özellik) dizi
+        :return: (örnek sayısı x çıkış) dizi
+        """
+        output = np.asarray(x, dtype=np.float64)
+        for layer in self.layers:
+            if layer['type'] == 'dense':
+                output = layer['activation_fn'](output @ layer['kernel'] + layer['bias'])
+                continue
+            batch, time_steps = output.shape[:2]
+            h = np.zeros((batch, layer['units']))
+            c = np.zeros((batch, layer['units']))
+            # Giriş çarpımı tüm zaman adımları için tek seferde yapılır
+            projected = output @ layer['kernel']
+            sequence = []
+            for t in range(time_steps):
+                h, c = self.lstm_step(layer, projected[:, t], h, c)
+                if layer.get('return_sequences'):
+                    sequence.append(h)
+            output = np.stack(sequence, axis=1) if layer.get('return_sequences') else h
+        return output
+
+
+BACKENDS = {
+    'keras': KerasBackend,
+    'tflite': TFLiteBackend,
+    'onnx': OnnxBackend,
+    'numpy': NumpyLSTMBackend.load_npz,
+}
+
+
+def create_backend(kind, model_path):
+    """
+    :param kind: "keras", "tflite", "onnx" veya "numpy"
+    :param model_path: Arka uca uygun model dosyası (.keras, .tflite, .onnx, .npz)
+    """
+    if kind not in BACKENDS:
+        raise ValueError(f"Bilinmeyen LSTM arka ucu: {kind}")
+    return BACKENDS[kind](model_path)
+
+
+def export_numpy(keras_model_path, npz_path):
+    """
+    Keras modelinin ağırlıklarını NumPy arka ucu için .npz dosyasına aktarır.
+    """
+    import tensorflow as tf
+
+    NumpyLSTMBackend.from_keras(tf.keras.models.load_model(keras_model_path, compile=False)).save_npz(npz_path)
+
+
+def export_tflite(keras_model_path, tflite_path):
+    """
+    Keras modelini .tflite dosyasına aktarır.
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(keras_model_path, compile=False))
+    # LSTM katmanları için TFLite yerleşik işlemleri ve gerekirse TF işlemleri
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+    with open(tflite_path, "wb") as file:
+        file.write(converter.convert())
+
+
+def export_onnx(keras_model_path, onnx_path):
+    """
+    Keras modelini tf2onnx ile .onnx dosyasına aktarır.
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    model = tf.keras.models.load_model(keras_model_path, compile=False)
+    time_steps, features = model.input_shape[1:]
+    tf2onnx.convert.from_keras(model, input_signature=[tf.TensorSpec([None, time_steps, features], tf.float32)],
+                               output_path=onnx_path)
+
+
+def benchmark(backend, x, repeat=200):
+    """
+    Arka ucun tek tahmin gecikmesini ölçer.
+    :return: (ortalama, en kötü) milisaniye
+    """
+    backend.predict(x)  # İlk çağrı (derleme, bellek ayırma) ölçüme katılmaz
+    latencies = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        backend.predict(x)
+        latencies.append(time.perf_counter() - start_time)
+    return float(np.mean(latencies)) * 1000, float(np.max(latencies)) * 1000
+
+
+if __name__ == "__main__":
+    # python lstm_backends.py [model.keras] — dosyalar yoksa rastgele ağırlıklı örnek modelle NumPy ölçülür
+    import os
+    import sys
+
+    keras_path = sys.argv[1] if len(sys.argv) > 1 else "akim_kesme_inme_filtresiz.keras"
+    stem = os.path.splitext(keras_path)[0]
+    window = np.random.default_rng(0).uniform(0, 1, (1, 30, 3))
+
+    candidates = [("keras", keras_path), ("tflite", stem + ".tflite"), ("onnx", stem + ".onnx"), ("numpy", stem + ".npz")]
+    measured = False
+    for kind, path in candidates:
+        if not os.path.exists(path):
+            continue
+        try:
+            mean_ms, max_ms = benchmark(create_backend(kind, path), window)
+        except ImportError as e:
+            print(f"{kind:<7} atlandı: {e}")
+            continue
+        print(f"{kind:<7} {mean_ms:8.3f} ms ortalama, {max_ms:8.3f} ms en kötü")
+        measured = True
+
+    if not measured:
+        rng = np.random.default_rng(1)
+        units = 64
+        demo = NumpyLSTMBackend([
+            {'type': 'lstm', 'kernel': rng.normal(0, 0.2, (3, 4 * units)),
+             'recurrent_kernel': rng.normal(0, 0.2, (units, 4 * units)), 'bias': np.zeros(4 * units)},
+            {'type': 'dense', 'kernel': rng.normal(0, 0.2, (units, 2)), 'bias': np.zeros(2)},
+        ])
+        mean_ms, max_ms = benchmark(demo, window)
+        print(f"numpy (LSTM({units}) + Dense(2), rastgele ağırlık) {mean_ms:.3f} ms ortalama, {max_ms:.3f} ms en kötü")
+        batch = np.repeat(window, 64, axis=0)
+        mean_ms, _ = benchmark(demo, batch, repeat=50)
+        print(f"numpy 64'lü grup: {mean_ms:.3f} ms ({mean_ms / 64:.3f} ms/pencere)")
@@ -0,0 +1,137 @@
+import time
+import numpy as np
+
+from lstm_backends import NumpyLSTMBackend
+
+
+class StreamingLSTM:
+    """
+    NumpyLSTMBackend modelini her örnekte bir zaman adımı ilerleten akış çalıştırıcısı.
+
+    İki mod vardır:
+    - "stateful": Tek bir gizli/hücre durumu tutulur ve her örnekte bir adım
+      ilerletilir. Pencereli çalıştırmaya göre yaklaşık `time_steps` kat daha
+      az işlem yapar, ancak durum pencere başında sıfırlanmadığı için çıktı
+      pencereli modelden farklıdır (model 30 adımlık pencerelerle eğitildi).
+    - "exact": `time_steps` adet durum, her biri bir örnek kaydırılmış olarak
+      tek bir toplu adımda ilerletilir. Her örnekte tam `time_steps` örnek
+      görmüş durum çıktıyı verir ve sıfırlanır. Çıktı pencereli çalıştırma ile
+      aynıdır; işlem miktarı aynı kalır ama 30 ardışık küçük adım yerine
+      tek toplu adım yapıldığından Python ek yükü ortadan kalkar.
+    """
+    def __init__(self, backend, time_steps=30, mode="exact"):
+        """
+        :param backend: NumpyLSTMBackend
+        :param time_steps: Modelin eğitildiği pencere uzunluğu
+        :param mode: "exact" veya "stateful"
+        """
+        if mode not in ("exact", "stateful"):
+            raise ValueError(f"Bilinmeyen akış modu: {mode}")
+        self.backend = backend
+        self.time_steps = time_steps
+        self.mode = mode
+
+        lstm_layers = [layer for layer in backend.layers if layer['type'] == 'lstm']
+        if not lstm_layers:
+            raise ValueError("Modelde LSTM katmanı yok")
+        last_lstm = backend.layers.index(lstm_layers[-1])
+        if any(layer['type'] != 'lstm' for layer in backend.layers[:last_lstm]) or \
+                any(layer.get('return_sequences') for layer in backend.layers[last_lstm:]):
+            raise ValueError("Akış modu yalnızca LSTM katmanları ve ardından gelen Dense katmanlarını destekler")
+        self.lstm_layers = backend.layers[:last_lstm + 1]
+        self.dense_layers = backend.layers[last_lstm + 1:]
+        self.slots = time_steps if mode == "exact" else 1
+        self.reset()
+
+    def reset(self):
+        """
+        Tüm durumları sıfırlar (ör. kesim başında veya veri kesintisinden sonra).
+        """
+        self.h = [np.zeros((self.slots, layer['units'])) for layer in self.lstm_layers]
+        self.c = [np.zeros((self.slots, layer['units'])) for layer in self.lstm_layers]
+        self.steps = 0
+
+    def step(self, x):
+        """
+        Yeni örnekle tüm durumları bir adım ilerletir.
+        :param x: Ölçeklenmiş tek örnek (özellik sayısı uzunluğunda)
+        :return: Model çıktısı; ilk `time_steps` örnek dolmadan None
+        """
+        x = np.asarray(x, dtype=np.float64).reshape(1, -1)
+        if self.mode == "exact":
+            # Bu adımda yeni pencere başlatan durum sıfırlanır
+            start_slot = self.steps % self.slots
+            for h, c in zip(self.h, self.c):
+                h[start_slot] = 0.0
+                c[start_slot] = 0.0
+
+        layer_input = np.broadcast_to(x, (self.slots, x.shape[1]))
+        for i, layer in enumerate(self.lstm_layers):
+            self.h[i], self.c[i] = self.backend.lstm_step(layer, layer_input @ layer['kernel'], self.h[i], self.c[i])
+            layer_input = self.h[i]
+        self.steps += 1
+
+        if self.steps < self.time_steps:
+            return None
+        # exact modda tam time_steps örnek görmüş durum, bir sonraki adımda sıfırlanacak olandır
+        ready_slot = self.steps % self.slots
+        output = self.h[-1][ready_slot:ready_slot + 1]
+        for layer in self.dense_layers:
+            output = layer['activation_fn'](output @ layer['kernel'] + layer['bias'])
+        return output[0]
+
+
+def windowed_outputs(backend, series, time_steps=30):
+    """
+    Serinin her tam penceresi için pencereli model çıktısı (referans).
+    :param series: (örnek sayısı x özellik) dizi
+    :return: (örnek sayısı - time_steps + 1 x çıkış) dizi
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(series, time_steps, axis=0).transpose(0, 2, 1)
+    return backend.predict(windows)
+
+
+def compare_streaming(backend, series, time_steps=30):
+    """
+    Akış modlarını pencereli çıktıyla karşılaştırır.
+    :return: Mod -> en büyük mutlak fark
+    """
+    expected = windowed_outputs(backend, series, time_steps)
+    errors = {}
+    for mode in ("exact", "stateful"):
+        stream = StreamingLSTM(backend, time_steps, mode)
+        outputs = [stream.step(x) for x in series]
+        errors[mode] = float(np.max(np.abs(np.array(outputs[time_steps - 1:]) - expected)))
+    return errors
+
+
+if __name__ == "__main__":
+    # python lstm_streaming.py [model.npz] — dosya verilmezse rastgele ağırlıklı örnek model kullanılır
+    import sys
+
+    rng = np.random.default_rng(0)
+    if len(sys.argv) > 1:
+        model = NumpyLSTMBackend.load_npz(sys.argv[1])
+    else:
+        units = 64
+        model = NumpyLSTMBackend([
+            {'type': 'lstm', 'kernel': rng.normal(0, 0.3, (3, 4 * units)),
+             'recurrent_kernel': rng.normal(0, 0.3, (units, 4 * units)), 'bias': np.zeros(4 * units)},
+            {'type': 'dense', 'kernel': rng.normal(0, 0.3, (units, 2)), 'bias': np.zeros(2)},
+        ])
+    features = model.layers[0]['kernel'].shape[0]
+    series = rng.uniform(0, 1, (600, features))
+
+    print(f"Pencereli çıktıya göre en büyük fark: {compare_streaming(model, series)}")
+
+    window = series[:30][None]
+    start_time = time.perf_counter()
+    for _ in range(200):
+        model.predict(window)
+    print(f"pencereli: {(time.perf_counter() - start_time) / 200 * 1000:.3f} ms/örnek")
+    for mode in ("exact", "stateful"):
+        stream = StreamingLSTM(model, 30, mode)
+        start_time = time.perf_counter()
+        for x in series:
+            stream.step(x)
+        print(f"{mode:<9}: {(time.perf_counter() - start_time) / len(series) * 1000:.3f} ms/örnek")
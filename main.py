@@ -1,21 +1,20 @@
+import asyncio
 import os
-import time
 import yaml
 from threading import Thread
-from queue import Queue
-from modbus_reader import read_modbus_data
-from fuzzy_adjustment import adjust_speeds_based_on_current
-from lineer_adjustment import adjust_speeds_linear
-# from dynamic_adjustment import adjust_speeds_linear
-from data_handler import process_row, insert_to_database, write_to_text_file
-from mqtt_publisher import mqtt_publisher
+from data_handler import DatabaseWriter, TextFileWriter, record_columns
+from mqtt_publisher import MqttPublisher
+from queue_consumer import MetricQueue, QueueConsumer
+from saw_machine import SawMachine
 from ui_control import UIControl
-from pymodbus.client import ModbusTcpClient
 import tkinter as tk
 from datetime import datetime
 from camera_module import CameraModule
-from speed_utility import SpeedBuffer, KesmeHiziTracker
+from archive import ArchiveCompactor
+from cut_session import CutSummary
 from fuzzy_control import create_fuzzy_system
+from speed_profile import SpeedProfileLibrary
+from blade_vision import BladeVision
 
 # Global variables
 config_path = "config.yaml"
@@ -52,151 +51,163 @@ config = read_config(config_path)
 
 # Set up paths
 daily_folder = get_daily_folder(base_path)
-DATABASE_PATH = os.path.join(daily_folder, config["database"]["database_path"].format(time.strftime("%Y%m%d%H%M%S")))
-TOTAL_DATABASE_PATH = os.path.join(daily_folder, config["database"]["total_database_path"])
-RAW_DATABASE_PATH = os.path.join(daily_folder, config["database"]["raw_database_path"])
-TEXT_FILE_PATH = os.path.join(daily_folder, config["database"]["text_file_path"])
-
-columns = config["database"]["columns"]
-columns["fuzzy_output"] = "REAL"
-columns["akim_degisim"] = "REAL"
-columns["fuzzy_control"] = "INTEGER"
-
-data_queue = Queue()
-processed_data_queue = Queue()
-plot_queue = Queue()
-
-# Initialize fuzzy control system and utilities
-speed_buffer = SpeedBuffer()
-kesme_hizi_tracker = KesmeHiziTracker()
-cikis_sim = create_fuzzy_system()
-
-MODBUS_IP = config["modbus"]["ip"]
-MODBUS_PORT = config["modbus"]["port"]
-modbus_client = ModbusTcpClient(MODBUS_IP, port=MODBUS_PORT)
-
-last_modbus_write_time = time.time()
+
+columns = record_columns(config)
+
+# Kamera karelerinden şerit sapması, talaş yoğunluğu ve bulanıklık (isteğe bağlı, sütunlar record_columns'ta)
+vision_config = config.get("camera", {}).get("vision", {})
+vision = BladeVision.from_config(vision_config) if vision_config.get("enabled", False) else None
+
+processed_data_queue = MetricQueue()  # Tüm testereler için ortak MQTT kuyruğu
+consumers = []  # Kuyruk tüketicileri (derinlik ve gecikme istatistikleri için)
+
+fuzzy_config = config.get("fuzzy", {})
+
+# Lineer kontrolün hız profilleri; dosya değişince çalışırken yeniden yüklenir
+speed_profile_config = config.get("speed_profiles", {})
+speed_profiles = SpeedProfileLibrary(
+    speed_profile_config.get("path", "speed_profiles.yaml"),
+    reload_interval_s=speed_profile_config.get("reload_interval_s", 1.0)
+)
+
+
+def create_cikis_sim():
+    return create_fuzzy_system(
+        lookup_table=fuzzy_config.get("lookup_table", False),
+        akim_step=fuzzy_config.get("akim_step", 0.25),
+        akim_degisim_step=fuzzy_config.get("akim_degisim_step", 0.25),
+        cache_path=fuzzy_config.get("cache_path"),
+        verify=fuzzy_config.get("verify", False),
+        engine=fuzzy_config.get("engine", "skfuzzy")
+    )
+
+
+def load_machines():
+    """
+    config.yaml'daki testere listesinden SawMachine örneklerini oluşturur.
+    'machines' listesi yoksa 'modbus' bölümündeki tek testere kullanılır ve
+    dosyalar günlük klasöre doğrudan yazılır; liste varsa her testere günlük
+    klasör altında kendi adını taşıyan klasöre yazar. Listedeki her kayıt,
+    'modbus' bölümündeki değerleri geçersiz kılabilir.
+    """
+    machine_configs = config.get("machines")
+    partitioned = bool(machine_configs)
+    if not partitioned:
+        machine_configs = [{"name": config["modbus"].get("name", "testere")}]
+
+    machines = []
+    for machine_config in machine_configs:
+        modbus_config = dict(config["modbus"])
+        modbus_config.update(machine_config)
+        name = modbus_config["name"]
+        output_folder = os.path.join(daily_folder, name) if partitioned else daily_folder
+        machines.append(SawMachine(
+            name=name,
+            modbus_config=modbus_config,
+            database_config=config["database"],
+            columns=columns,
+            output_folder=output_folder,
+            cikis_sim=create_cikis_sim(),
+            processed_data_queue=processed_data_queue,
+            speed_adjustment_interval=speed_adjustment_interval,
+            telemetry_capacity=config.get("telemetry", {}).get("capacity", 6000),
+            speed_profiles=speed_profiles,
+            # Kamera ilk testereyi izler
+            vision=vision if not machines else None
+        ))
+    return machines
+
+
 speed_adjustment_interval = 0.2
+machines = load_machines()
 
 # Camera Module Initialization
-raspberry_pi_ip = "192.168.13.97"
-camera_module = CameraModule(raspberry_pi_ip)
-
-conn_status = 0
-
-
-def modbus_thread_func():
-    global fuzzy_control_enabled, linear_control_enabled, last_modbus_write_time, stop_threads, conn_status
-    prev_current = 0
-    while not stop_threads:
-        if not modbus_client.is_socket_open():
-            try:
-                modbus_client.connect()
-                if stop_threads:
-                    print("Modbus thread stopping...")
-                    break
-                print("Modbus connection established")
-                conn_status = 1
-            except Exception as e:
-                if stop_threads:
-                    print("Modbus thread stopping during connection...")
-                    break
-                print(f"Modbus connection failed: {e}")
-                time.sleep(1)
-                continue
+# Kare indeksine her karenin yakalandığı andaki son sensör örneğinin zamanı yazılır
+camera_module = CameraModule.from_config(config.get("camera", {}), sample_clock=machines[0].telemetry.latest_time,
+                                         vision=vision)
 
-        while not stop_threads:
-            try:
-                for raw_data in read_modbus_data(modbus_client, config["modbus"]["start_address"],
-                                                 config["modbus"]["number_of_bits"],
-                                                 stop_threads_flag=lambda: stop_threads, conn_status=conn_status):
-                    if stop_threads:
-                        print("Modbus thread stopping...")
-                        break
-
-                    data_dict = dict(zip(columns.keys(), raw_data))
-                    data_dict["timestamp"] = time.time()
-                    processed_data = process_row(data_dict)
-                    prev_prev_current = prev_current
-                    prev_current = processed_data.get('serit_motor_akim_a', None)
-
-                    fuzzy_output_value = None
-                    akim_degisim = None
-
-                    if fuzzy_control_enabled:
-                        # Fuzzy kontrol ile ayarlama
-                        prev_current, fuzzy_output_value, akim_degisim, last_modbus_write_time = adjust_speeds_based_on_current(
-                            processed_speed_data=processed_data,
-                            prev_current=prev_current,
-                            modbus_client=modbus_client,
-                            adaptive_speed_control_enabled=fuzzy_control_enabled,
-                            speed_buffer=speed_buffer,
-                            last_modbus_write_time=last_modbus_write_time,
-                            speed_adjustment_interval=speed_adjustment_interval,
-                            kesme_hizi_tracker=kesme_hizi_tracker,
-                            cikis_sim=cikis_sim
-                        )
-                        processed_data["fuzzy_control"] = 1
-
-                    elif linear_control_enabled:
-                        # Lineer kontrol ile ayarlama
-                        last_modbus_write_time, fuzzy_output_value = adjust_speeds_linear(
-                            processed_speed_data=processed_data,
-                            modbus_client=modbus_client,
-                            last_modbus_write_time=last_modbus_write_time,
-                            speed_adjustment_interval=speed_adjustment_interval,
-                            cikis_sim=cikis_sim,
-                            prev_current = prev_prev_current
-                        )
-                        processed_data["fuzzy_control"] = 0
-
-                    else:
-                        # Sadece veri kaydı
-                        processed_data["fuzzy_control"] = 0
-
-                    processed_data["fuzzy_output"] = fuzzy_output_value
-                    processed_data["akim_degisim"] = akim_degisim
-
-                    data_queue.put(processed_data)
-                    processed_data_queue.put(processed_data)
-                    prev_current = processed_data.get('serit_motor_akim_a', None)
-
-                conn_status = 1
-            except Exception as e:
-                if stop_threads:
-                    print("Modbus thread stopping...")
-                    break
-                print(f"Error reading Modbus data: {e}")
-                time.sleep(1)
-                continue
-        if stop_threads:
-            break
-        time.sleep(0.1)
 
+def modbus_async_thread_func():
+    """
+    Tüm testerelerin asenkron okuma döngülerini tek bir event loop içinde
+    eş zamanlı çalıştırır.
+    """
+    async def acquire_all():
+        await asyncio.gather(*[machine.run_async(lambda: stop_threads) for machine in machines if machine.is_async])
+
+    asyncio.run(acquire_all())
 
-def db_thread_func():
+
+def db_thread_func(machine):
     global stop_threads
-    while not stop_threads:
-        if not data_queue.empty():
-            processed_data = data_queue.get()
-            insert_to_database(TOTAL_DATABASE_PATH, list(processed_data.values()), columns)
-            write_to_text_file(processed_data, TEXT_FILE_PATH)
-        time.sleep(0.1)
-    print("DB thread stopping...")
+    database_config = config["database"]
+    # SQLite bağlantısı ve metin dosyası bu thread içinde açılır ve uygulama boyunca açık kalır
+    db_writer = DatabaseWriter(
+        machine.total_database_path, columns,
+        batch_size=database_config.get("batch_size", 50),
+        flush_interval_ms=database_config.get("flush_interval_ms", 1000)
+    )
+    text_writer = TextFileWriter(
+        machine.text_file_path, columns,
+        flush_bytes=database_config.get("text_flush_bytes", 65536),
+        flush_interval_ms=database_config.get("text_flush_interval_ms", 5000),
+        max_bytes=database_config.get("text_max_bytes"),
+        rotate_daily=database_config.get("text_rotate_daily", True),
+        compression=database_config.get("text_compression")
+    )
+
+    def write_batch(batch):
+        for processed_data in batch:
+            if isinstance(processed_data, CutSummary):
+                db_writer.add_cut(processed_data)
+                continue
+            db_writer.add(processed_data)
+            text_writer.add(processed_data)
+
+    def flush_if_due():
+        db_writer.flush_if_due()
+        text_writer.flush_if_due()
+
+    db_consumer = QueueConsumer(f"DB {machine.name}", machine.data_queue, write_batch, flush=flush_if_due)
+    consumers.append(db_consumer)
+    try:
+        # Okuma döngüsü kapanışta son kesimin özetini kuyruğa ekler; DB thread'i o bitene kadar durmaz
+        db_consumer.run(lambda: stop_threads and not machine.reading)
+    finally:
+        db_writer.close()
+        text_writer.close()
+    print(f"{machine.name}: DB thread stopping...")
 
 
 def mqtt_thread_func():
     global stop_threads
-    while not stop_threads:
-        if not processed_data_queue.empty():
-            mqtt_publisher(processed_data_queue)
-        time.sleep(0.1)
-    print("MQTT thread stopping...")
+    # Bağlantı arka planda kurulur; broker'a ulaşılamazken veriler diske yazılır
+    publisher = MqttPublisher.from_config(config["mqtt"], columns)
+    publisher.start()
+    mqtt_consumer = QueueConsumer("MQTT", processed_data_queue, publisher.publish_batch,
+                                  flush=publisher.flush_if_due)
+    consumers.append(mqtt_consumer)
+    try:
+        mqtt_consumer.run(lambda: stop_threads)
+    finally:
+        publisher.close()
+    print(f"MQTT thread stopping... {publisher.stats()}")
+
+
+def archive_thread_func():
+    global stop_threads
+    # Biten günlerin veritabanları düşük öncelikle Parquet arşivine taşınır
+    compactor = ArchiveCompactor.from_config(base_path, config.get("archive", {}), config["database"], columns,
+                                             default_saw_name=config["modbus"].get("name", "testere"))
+    compactor.run(lambda: stop_threads)
+    print("Archive thread stopping...")
 
 
 def toggle_fuzzy_control():
     global fuzzy_control_enabled
     fuzzy_control_enabled = not fuzzy_control_enabled
+    for machine in machines:
+        machine.fuzzy_control_enabled = fuzzy_control_enabled
     print(f"Fuzzy Control Enabled: {fuzzy_control_enabled}")
     return fuzzy_control_enabled
 
@@ -204,17 +215,29 @@ def toggle_fuzzy_control():
 def toggle_linear_control():
     global linear_control_enabled
     linear_control_enabled = not linear_control_enabled
+    for machine in machines:
+        machine.linear_control_enabled = linear_control_enabled
     print(f"Linear Control Enabled: {linear_control_enabled}")
     return linear_control_enabled
 
 
 if __name__ == "__main__":
-    modbus_thread = Thread(target=modbus_thread_func)
-    db_thread = Thread(target=db_thread_func)
+    if vision is not None:
+        # Analiz işlemleri diğer thread'ler başlamadan açılır; havuz kamera durdurulunca kapanmaz
+        vision.start()
+
+    # Senkron testerelerin her biri kendi thread'inde, asenkron olanlar tek bir event loop'ta okunur
+    modbus_threads = [Thread(target=machine.run_sync, args=(lambda: stop_threads,))
+                      for machine in machines if not machine.is_async]
+    if any(machine.is_async for machine in machines):
+        modbus_threads.append(Thread(target=modbus_async_thread_func))
+    db_threads = [Thread(target=db_thread_func, args=(machine,)) for machine in machines]
     mqtt_thread = Thread(target=mqtt_thread_func)
+    if config.get("archive", {}).get("enabled", False):
+        db_threads.append(Thread(target=archive_thread_func))
 
-    modbus_thread.start()
-    db_thread.start()
+    for thread in modbus_threads + db_threads:
+        thread.start()
     mqtt_thread.start()
 
     root = tk.Tk()
@@ -226,15 +249,20 @@ if __name__ == "__main__":
         toggle_linear_control_callback=toggle_linear_control,
         start_camera_callback=camera_module.start_camera,
         stop_camera_callback=camera_module.stop_camera,
-        plot_queue=plot_queue,
+        plot_queue=None,
         close_app_callback=on_closing,
-        conn_status=conn_status
+        conn_status=int(any(machine.conn_status for machine in machines)),
+        telemetry=machines[0].telemetry
     )
 
     root.mainloop()
 
     print("Main thread waiting for other threads to stop...")
-    modbus_thread.join()
-    db_thread.join()
+    for thread in modbus_threads + db_threads:
+        thread.join()
     mqtt_thread.join()
+    if camera_module.camera_running:
+        camera_module.stop_camera()
+    if vision is not None:
+        vision.close()
     print("All threads stopped.")
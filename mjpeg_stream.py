@@ -0,0 +1,147 @@
+import re
+import time
+import urllib.request
+
+import cv2
+import numpy as np
+
+from time_alignment import capture_time
+
+BOUNDARY_PATTERN = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+
+
+def decode_jpeg(data, flags=cv2.IMREAD_COLOR):
+    """
+    JPEG baytlarını BGR kareye çözer. Ham kayıtta yalnızca arayüz veya
+    analiz için gerçekten istenen kareler çözülür.
+    """
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+
+
+def iter_multipart(fp, boundary):
+    """
+    multipart/x-mixed-replace gövdesindeki parçaları sırayla döndürür.
+    Parça başlığında Content-Length varsa gövde tek read ile okunur, yoksa
+    bir sonraki sınır satırına kadar satır satır toplanır.
+    :param fp: readline ve read destekleyen akış (HTTP yanıtı)
+    :param boundary: Content-Type başlığındaki sınır ("--" öneki olmadan)
+    :return: (parça başlıkları, gövde baytları) üreteci
+    """
+    marker = b"--" + boundary.encode("latin-1").lstrip(b"-")
+    line = fp.readline()
+    while line:
+        if not line.startswith(marker):
+            line = fp.readline()
+            continue
+        if line.rstrip().endswith(marker + b"--"):
+            return
+
+        headers = {}
+        while True:
+            line = fp.readline()
+            if not line or line in (b"\r\n", b"\n"):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if not line:
+            return
+
+        length = headers.get("content-length")
+        if length is not None:
+            body = fp.read(int(length))
+            if len(body) < int(length):
+                return
+            line = fp.readline()
+        else:
+            parts = []
+            line = fp.readline()
+            while line and not line.startswith(marker):
+                parts.append(line)
+                line = fp.readline()
+            body = b"".join(parts)
+            # Sınırdan önceki satır sonu gövdeye ait değildir
+            if body.endswith(b"\r\n"):
+                body = body[:-2]
+            elif body.endswith(b"\n"):
+                body = body[:-1]
+        yield headers, body
+
+
+class MjpegStreamReader:
+    """
+    MJPEG HTTP yayınını cv2.VideoCapture kullanmadan okur ve her karenin
+    orijinal JPEG baytlarını döndürür. Kare çözülmediği için kayıt yalnızca
+    dosya yazma maliyeti taşır.
+    """
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+        self.response = None
+        self.boundary = None
+
+    def open(self):
+        """
+        Yayına bağlanır.
+        :return: Bağlantı kurulduysa True
+        """
+        try:
+            self.response = urllib.request.urlopen(self.url, timeout=self.timeout)
+        except Exception as e:
+            print(f"MJPEG yayını açılamadı ({self.url}): {e}")
+            return False
+        match = BOUNDARY_PATTERN.search(self.response.headers.get("Content-Type", ""))
+        if match is None:
+            print(f"MJPEG yayınında multipart sınırı bulunamadı: {self.response.headers.get('Content-Type')}")
+            self.close()
+            return False
+        self.boundary = match.group(1)
+        return True
+
+    def isOpened(self):
+        return self.response is not None
+
+    def frames(self):
+        """
+        :return: (JPEG baytları, yakalama zamanı capture_time()) üreteci; yayın bitince durur
+        """
+        for headers, body in iter_multipart(self.response, self.boundary):
+            if body[:2] != b"\xff\xd8":
+                continue  # JPEG olmayan parça
+            yield body, capture_time()
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+            self.response = None
+
+
+if __name__ == "__main__":
+    # Kare başına CPU süresi: çöz + yeniden kodla (eski kayıt) ile ham JPEG yazma karşılaştırması
+    import io
+    import os
+    import tempfile
+
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 255, (1200, 1920, 3), dtype=np.uint8), (15, 15), 0)
+    jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+    frames = 50
+    stream = io.BytesIO(b"".join(
+        b"--FRAME\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n%s\r\n" % (len(jpeg), jpeg)
+        for _ in range(frames)
+    ))
+    with tempfile.TemporaryDirectory() as folder:
+        start_time = time.process_time()
+        for number in range(frames):
+            cv2.imwrite(os.path.join(folder, f"decoded_{number}.jpg"), decode_jpeg(jpeg))
+        decoded_cpu = (time.process_time() - start_time) / frames
+
+        start_time = time.process_time()
+        for number, (headers, body) in enumerate(iter_multipart(stream, "FRAME")):
+            with open(os.path.join(folder, f"raw_{number}.jpg"), "wb") as frame_file:
+                frame_file.write(body)
+        raw_cpu = (time.process_time() - start_time) / frames
+
+    print(f"JPEG boyutu: {len(jpeg) / 1024:.0f} KB")
+    print(f"çöz + yeniden kodla: {decoded_cpu * 1000:.2f} ms CPU/kare")
+    print(f"ham JPEG yazma     : {raw_cpu * 1000:.2f} ms CPU/kare ({decoded_cpu / raw_cpu:.0f}x)")
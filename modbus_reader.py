@@ -1,5 +1,7 @@
+import asyncio
 import time
-from pymodbus.client import ModbusTcpClient
+from pymodbus.client import ModbusTcpClient, AsyncModbusTcpClient
+from pymodbus.exceptions import ModbusException
 from datetime import datetime
 
 
@@ -25,3 +27,134 @@ def read_modbus_data(client, start_address, number_of_bits, interval=0.1, stop_t
             print(f"{current_time}: Connection lost, waiting...")
             conn_status = 0
             time.sleep(1)
+
+
+class AsyncModbusAcquisition:
+    """
+    pymodbus'un asenkron istemcisi ile sabit frekansta okuma yapan sınıf.
+    Okumalar monotonik saate göre planlanır: her okuma bir önceki okumanın
+    bitişine değil, sabit bir zaman çizelgesine (t0 + n * periyot) göre başlar,
+    bu sayede okuma gecikmesi periyoda eklenmez ve kayma (drift) oluşmaz.
+    Periyot kaçırılırsa kaçırılan adımlar atlanır ve sayılır.
+    """
+    def __init__(self, host, port, start_address, number_of_bits, rate_hz=10.0, timeout=1.0, log_interval=10, name=None):
+        self.name = name or f"{host}:{port}"
+        self.host = host
+        self.port = port
+        self.start_address = start_address
+        self.number_of_bits = number_of_bits
+        self.period = 1.0 / rate_hz
+        self.timeout = timeout
+        self.log_interval = log_interval
+        self.client = None
+        self.connected = False
+        self.connection_count = 0  # Her başarılı bağlantıda artar (yeniden bağlanma tespiti için)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.samples = 0
+        self.missed_deadlines = 0
+        self.read_errors = 0
+        self.jitter_sum = 0.0
+        self.jitter_sq_sum = 0.0
+        self.jitter_max = 0.0
+        self.latency_max = 0.0
+        self.last_log_time = time.monotonic()
+
+    def _record_jitter(self, jitter, latency):
+        self.jitter_sum += jitter
+        self.jitter_sq_sum += jitter * jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+        self.latency_max = max(self.latency_max, latency)
+
+    def stats(self):
+        """
+        Zamanlama istatistiklerini döner (süreler milisaniye cinsindendir).
+        """
+        count = max(self.samples, 1)
+        mean = self.jitter_sum / count
+        variance = max(self.jitter_sq_sum / count - mean * mean, 0.0)
+        return {
+            "samples": self.samples,
+            "missed_deadlines": self.missed_deadlines,
+            "read_errors": self.read_errors,
+            "jitter_mean_ms": mean * 1000,
+            "jitter_std_ms": variance ** 0.5 * 1000,
+            "jitter_max_ms": self.jitter_max * 1000,
+            "latency_max_ms": self.latency_max * 1000,
+        }
+
+    def log_stats(self):
+        if self.log_interval is None:
+            return
+        now = time.monotonic()
+        if now - self.last_log_time < self.log_interval:
+            return
+        self.last_log_time = now
+        s = self.stats()
+        print(f"{datetime.now()}: {self.name} Modbus okuma {s['samples']} örnek, kaçırılan={s['missed_deadlines']}, "
+              f"jitter ort={s['jitter_mean_ms']:.2f}ms std={s['jitter_std_ms']:.2f}ms maks={s['jitter_max_ms']:.2f}ms, "
+              f"gecikme maks={s['latency_max_ms']:.2f}ms")
+
+    async def samples_from(self, client, stop_threads_flag=None):
+        """
+        Bağlı istemciden sabit frekansta register bloğu okur.
+        :return: (registers, okuma zamanı time.time(), okuma zamanı time.monotonic()) üreten async generator
+        """
+        next_deadline = time.monotonic()
+        while not (stop_threads_flag and stop_threads_flag()):
+            delay = next_deadline - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            request_time = time.monotonic()
+            response = await client.read_holding_registers(self.start_address, self.number_of_bits)
+            # Örnek, yanıtın alındığı anda zaman damgalanır
+            receive_monotonic = time.monotonic()
+            receive_time = time.time()
+
+            if response.isError():
+                self.read_errors += 1
+            else:
+                self.samples += 1
+                self._record_jitter(request_time - next_deadline, receive_monotonic - request_time)
+                yield response.registers, receive_time, receive_monotonic
+
+            # Bir sonraki okuma zamanı, sabit çizelgedeki bir sonraki adımdır
+            next_deadline += self.period
+            lateness = time.monotonic() - next_deadline
+            if lateness >= self.period:
+                skipped = int(lateness // self.period)
+                self.missed_deadlines += skipped
+                next_deadline += skipped * self.period
+            self.log_stats()
+
+    async def read_modbus_data(self, stop_threads_flag=None):
+        """
+        Bağlantıyı yöneterek sabit frekansta okuma yapar; bağlantı koparsa yeniden bağlanır.
+        :return: (registers, okuma zamanı time.time(), okuma zamanı time.monotonic()) üreten async generator
+        """
+        client = AsyncModbusTcpClient(self.host, port=self.port, timeout=self.timeout)
+        self.client = client
+        try:
+            while not (stop_threads_flag and stop_threads_flag()):
+                if not client.connected:
+                    self.connected = False
+                    await client.connect()
+                    if not client.connected:
+                        print(f"{datetime.now()}: {self.name} connection lost, waiting...")
+                        await asyncio.sleep(1)
+                        continue
+                    print(f"{datetime.now()}: {self.name} async Modbus connection established")
+                    self.connection_count += 1
+                self.connected = True
+                try:
+                    async for sample in self.samples_from(client, stop_threads_flag):
+                        yield sample
+                except ModbusException as e:
+                    print(f"{datetime.now()}: {self.name} error reading modbus data: {e}")
+                    client.close()
+                    await asyncio.sleep(self.period)
+        finally:
+            self.connected = False
+            client.close()
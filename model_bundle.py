@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import numpy as np
+
+from lstm_backends import NumpyLSTMBackend, create_backend
+
+BUNDLE_FORMAT = "testere-lstm-bundle"
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+SCALERS_NAME = "scalers.npz"
+
+# Arka uç -> paket içindeki model dosyası
+BACKEND_FILES = {
+    "numpy": "weights.npz",
+    "keras": "model.keras",
+    "tflite": "model.tflite",
+    "onnx": "model.onnx",
+}
+
+
+class AffineScaler:
+    """
+    MinMaxScaler'ın önceden hesaplanmış afin dönüşüm karşılığı:
+    ölçekli = x * scale + offset. Çalışma anında sklearn gerekmez.
+    """
+    def __init__(self, scale, offset):
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+
+    @classmethod
+    def from_range(cls, data_min, data_max, feature_range=(0.0, 1.0)):
+        """
+        Eğitim verisinin sütun bazında en küçük/en büyük değerlerinden ölçekleyici oluşturur.
+        """
+        data_min = np.asarray(data_min, dtype=np.float64)
+        data_range = np.asarray(data_max, dtype=np.float64) - data_min
+        data_range[data_range == 0.0] = 1.0  # Sabit sütunlar sklearn'deki gibi ölçeklenmez
+        scale = (feature_range[1] - feature_range[0]) / data_range
+        return cls(scale, feature_range[0] - data_min * scale)
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        """
+        Eğitilmiş sklearn MinMaxScaler'ın min_ ve scale_ değerlerini alır.
+        """
+        return cls(scaler.scale_, scaler.min_)
+
+    def transform(self, x):
+        return np.asarray(x, dtype=np.float64) * self.scale + self.offset
+
+    def inverse_transform(self, y):
+        return (np.asarray(y, dtype=np.float64) - self.offset) / self.scale
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelBundle:
+    """
+    LSTM kontrol modelinin sürümlü paketi. Paket bir klasördür:
+      manifest.json  format sürümü, model sürümü, giriş/çıkış sırası, pencere
+                     uzunluğu, tahmin ufku ve dosyaların sha256 özetleri
+      scalers.npz    x_scale, x_offset, y_scale, y_offset
+      weights.npz / model.keras / model.tflite / model.onnx  arka uç dosyaları
+    NumPy ağırlıkları pakette yoksa Keras modelinden bir kez dönüştürülür ve
+    paketin cache klasöründe saklanır; sonraki açılışlarda TensorFlow yüklenmez.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME), "r") as manifest_file:
+            self.manifest = json.load(manifest_file)
+        if self.manifest.get("format") != BUNDLE_FORMAT or \
+                self.manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"Desteklenmeyen model paketi: {self.manifest.get('format')} "
+                             f"v{self.manifest.get('format_version')}")
+        self.verify()
+
+        with np.load(os.path.join(path, SCALERS_NAME), allow_pickle=False) as scalers:
+            self.scaler_x = AffineScaler(scalers["x_scale"], scalers["x_offset"])
+            self.scaler_y = AffineScaler(scalers["y_scale"], scalers["y_offset"])
+
+        self.model_version = self.manifest["model_version"]
+        self.features = self.manifest["features"]
+        self.targets = self.manifest["targets"]
+        self.time_steps = self.manifest["time_steps"]
+        self.future_offset = self.manifest["future_offset_s"]
+
+    def verify(self):
+        """
+        Paketteki dosyaların manifest'teki özetlerle eşleştiğini doğrular.
+        """
+        for name, digest in self.manifest["files"].items():
+            if file_digest(os.path.join(self.path, name)) != digest:
+                raise ValueError(f"Model paketi bozuk: {name} özeti eşleşmiyor")
+
+    def backend(self, kind="numpy"):
+        """
+        Paketten istenen arka ucu oluşturur.
+        :param kind: "numpy", "keras", "tflite" veya "onnx"
+        """
+        file_name = BACKEND_FILES[kind]
+        if file_name in self.manifest["files"]:
+            return create_backend(kind, os.path.join(self.path, file_name))
+        if kind == "numpy" and BACKEND_FILES["keras"] in self.manifest["files"]:
+            return NumpyLSTMBackend.load_npz(self.cached_numpy_weights())
+        raise ValueError(f"Model paketinde {kind} arka ucu için dosya yok")
+
+    def cached_numpy_weights(self):
+        """
+        Keras modelinden dönüştürülmüş NumPy ağırlıklarının yolunu döndürür,
+        yoksa dönüştürüp cache klasörüne yazar. Dosya adı Keras modelinin
+        özetini içerdiğinden model değişince eski cache kullanılmaz.
+        """
+        from lstm_backends import export_numpy
+
+        digest = self.manifest["files"][BACKEND_FILES["keras"]][:16]
+        cache_path = os.path.join(self.path, "cache", f"weights-{digest}.npz")
+        if not os.path.exists(cache_path):
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            temp_path = cache_path + ".tmp.npz"
+            export_numpy(os.path.join(self.path, BACKEND_FILES["keras"]), temp_path)
+            os.replace(temp_path, cache_path)
+        return cache_path
+
+
+def build_bundle(path, model_files, scaler_x, scaler_y, features, targets, time_steps=30, future_offset_s=0.5,
+                 model_version=None):
+    """
+    Eğitim çıktılarından model paketi oluşturur.
+    :param path: Paket klasörü
+    :param model_files: Arka uç -> kaynak dosya yolu (ör. {"keras": "model.keras", "numpy": "weights.npz"})
+    :param scaler_x: Giriş ölçekleyicisi (AffineScaler veya eğitilmiş sklearn MinMaxScaler)
+    :param scaler_y: Çıkış ölçekleyicisi
+    :param features: Model giriş sütunları (sırasıyla)
+    :param targets: Model çıkış sütunları (sırasıyla)
+    :param model_version: Model sürümü, None ise oluşturma zamanı
+    """
+    scaler_x = scaler_x if isinstance(scaler_x, AffineScaler) else AffineScaler.from_sklearn(scaler_x)
+    scaler_y = scaler_y if isinstance(scaler_y, AffineScaler) else AffineScaler.from_sklearn(scaler_y)
+    if len(scaler_x.scale) != len(features) or len(scaler_y.scale) != len(targets):
+        raise ValueError("Ölçekleyici boyutları giriş/çıkış sütun sayısıyla uyuşmuyor")
+
+    os.makedirs(path, exist_ok=True)
+    np.savez(os.path.join(path, SCALERS_NAME), x_scale=scaler_x.scale, x_offset=scaler_x.offset,
+             y_scale=scaler_y.scale, y_offset=scaler_y.offset)
+    files = [SCALERS_NAME]
+    for kind, source in model_files.items():
+        shutil.copyfile(source, os.path.join(path, BACKEND_FILES[kind]))
+        files.append(BACKEND_FILES[kind])
+
+    manifest = {
+        "format": BUNDLE_FORMAT,
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "model_version": model_version or datetime.now().strftime("%Y%m%d%H%M%S"),
+        "features": list(features),
+        "targets": list(targets),
+        "time_steps": time_steps,
+        "future_offset_s": future_offset_s,
+        "files": {name: file_digest(os.path.join(path, name)) for name in files},
+    }
+    with open(os.path.join(path, MANIFEST_NAME), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return ModelBundle(path)
+
+
+_bundle_cache = {}
+
+
+def load_bundle(path):
+    """
+    Model paketini yükler; aynı süreçte aynı paket bir kez okunur.
+    """
+    path = os.path.abspath(path)
+    if path not in _bundle_cache:
+        _bundle_cache[path] = ModelBundle(path)
+    return _bundle_cache[path]
+
+
+if __name__ == "__main__":
+    # Eğitim çıktılarından paket oluşturma:
+    # python model_bundle.py <paket klasörü> <model.keras> <scaler_x.pkl> <scaler_y.pkl> [model sürümü]
+    # Ölçekleyiciler eğitimde kullanılan sklearn MinMaxScaler nesneleridir (pickle/joblib);
+    # sklearn yalnızca bu adımda gerekir.
+    import pickle
+    import sys
+
+    bundle_path, keras_path, scaler_x_path, scaler_y_path = sys.argv[1:5]
+    with open(scaler_x_path, "rb") as scaler_file:
+        fitted_scaler_x = pickle.load(scaler_file)
+    with open(scaler_y_path, "rb") as scaler_file:
+        fitted_scaler_y = pickle.load(scaler_file)
+    bundle = build_bundle(
+        bundle_path, {"keras": keras_path}, fitted_scaler_x, fitted_scaler_y,
+        features=["serit_motor_akim_a", "serit_kesme_hizi", "serit_inme_hizi"],
+        targets=["serit_kesme_hizi", "serit_inme_hizi"],
+        model_version=sys.argv[5] if len(sys.argv) > 5 else None
+    )
+    bundle.cached_numpy_weights()
+    print(f"Model paketi oluşturuldu: {bundle_path} (sürüm {bundle.model_version})")
@@ -1,27 +1,10 @@
 import json
+import sqlite3
+import threading
 import time
 import paho.mqtt.client as mqtt
-import yaml
-from queue import Empty
 from datetime import datetime
-
-
-def read_config(file_path):
-    with open(file_path, 'r') as config_file:
-        config_data = yaml.safe_load(config_file)
-    return config_data
-
-
-config = read_config("config.yaml")
-
-broker_address = config["mqtt"]["broker_address"]
-port = config["mqtt"]["port"]
-topic = config["mqtt"]["topic"]
-username = config["mqtt"]["username"]
-
-client = mqtt.Client()
-client.username_pw_set(username, password=None)
-client.connect(broker_address, port=port)
+from telemetry_codec import TelemetryEncoder
 
 
 # Tüm timestamp formatlarını işleyebilmek için bir yardımcı fonksiyon
@@ -59,35 +42,331 @@ def parse_timestamp(timestamp):
         raise ValueError(f"Unsupported timestamp format: {timestamp}")
 
 
-def publish_message(data):
-    json_data = json.dumps(data)
-    client.publish(topic, json_data)
+def build_telemetry(data):
+    """
+    İşlenmiş veriyi ThingsBoard telemetri formatına ({'ts', 'values'}) çevirir.
+    :param data: İşlenmiş veri sözlüğü veya SampleRecord
+    :return: Telemetri sözlüğü, zaman damgası çözümlenemezse None
+    """
+    # Kayıt diğer kuyruklarla paylaşıldığı için kopyası üzerinde çalışılır
+    data = data.to_dict() if hasattr(data, 'to_dict') else dict(data)
+    # Eğer data'da timestamp varsa onu işle, yoksa anlık timestamp ekle.
+    # Toplu gönderimde örnekler ayrı zaman damgası taşımalı, aksi halde
+    # ThingsBoard aynı ts'li değerlerin üzerine yazar.
+    sample_time = data.get('ts', data.get('timestamp'))
+    if sample_time is not None:
+        try:
+            timestamp = parse_timestamp(sample_time)
+        except ValueError as e:
+            # print(f"Error parsing timestamp: {e}")
+            return None
+    else:
+        # Milisaniye hassasiyetinde timestamp ekle
+        timestamp = int(datetime.now().timestamp() * 1000)
 
+    data['ts'] = timestamp  # Timestamp'i milisaniye cinsinden ekle
+    return {
+        'ts': timestamp,
+        'values': data
+    }
 
-def mqtt_publisher(data_queue):
-    while True:
-        try:
-            data = data_queue.get(timeout=1)  # Kuyruktan veri al, 1 saniye içinde veri gelmezse exception fırlat
-
-            # Eğer data'da timestamp varsa onu işle, yoksa anlık timestamp ekle
-            if 'ts' in data:
-                try:
-                    timestamp = parse_timestamp(data['ts'])
-                except ValueError as e:
-                    # print(f"Error parsing timestamp: {e}")
-                    continue
-            else:
-                # Milisaniye hassasiyetinde timestamp ekle
-                timestamp = int(datetime.now().timestamp() * 1000)
-
-            data['ts'] = timestamp  # Timestamp'i milisaniye cinsinden ekle
-            telemetry_data = {
-                'ts': timestamp,
-                'values': data
-            }
-
-            publish_message(telemetry_data)
-            data_queue.task_done()  # Kuyruktan alınan verinin işlendiğini belirt
-        except Empty:
-            pass
-        time.sleep(0.1)  # Saniyede 10 veri göndermek için 0.1 saniye bekle
+
+class MqttSpool:
+    """
+    Broker'a ulaşılamadığında gönderilemeyen mesajları sırasıyla saklayan
+    SQLite tabanlı disk kuyruğu. Bağlantı geri geldiğinde mesajlar eklendikleri
+    sırayla tekrar gönderilir. Sadece oluşturulduğu thread içinde kullanılmalıdır.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS spool ("
+                          "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, payload BLOB NOT NULL)")
+        self.conn.commit()
+        self.depth = self.conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def __len__(self):
+        return self.depth
+
+    def push(self, topic, payload):
+        with self.conn:
+            self.conn.execute("INSERT INTO spool (topic, payload) VALUES (?, ?)", (topic, payload))
+        self.depth += 1
+
+    def peek(self, limit):
+        """
+        En eski mesajları silmeden döndürür.
+        :return: (id, topic, payload) listesi
+        """
+        return self.conn.execute("SELECT id, topic, payload FROM spool ORDER BY id LIMIT ?", (limit,)).fetchall()
+
+    def remove_through(self, message_id):
+        """
+        Verilen id'ye kadar (dahil) olan mesajları siler.
+        """
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM spool WHERE id <= ?", (message_id,)).rowcount
+        self.depth -= removed
+
+    def close(self):
+        self.conn.close()
+
+
+class MqttPublisher:
+    """
+    Telemetriyi ThingsBoard'a toplu halde gönderen yayıncı.
+
+    paho'nun ağ döngüsü `loop_start` ile arka planda çalışır; bağlantı
+    kopunca paho yeniden bağlanır. Örnekler tamponda biriktirilir ve
+    `batch_size` örneğe veya `max_latency_ms` süresine ulaşıldığında tek
+    mesajda ({ts, values} dizisi veya gateway formatında) gönderilir.
+    Bağlantı yokken mesajlar disk kuyruğuna yazılır ve bağlantı geri
+    geldiğinde yeni mesajlardan önce sırayla gönderilir.
+
+    `add`/`flush` çağrıları tek bir thread'den (MQTT tüketicisi) yapılmalıdır.
+    """
+    def __init__(self, broker_address, port, topic, username, gateway_topic=None, qos=1,
+                 batch_size=50, max_latency_ms=1000, spool_path="mqtt_spool.db", replay_batch=20,
+                 keepalive=60, encoding="json", columns=None, binary_topic=None, client=None):
+        """
+        :param broker_address: Broker adresi
+        :param port: Broker portu
+        :param topic: Tek cihaz telemetri topic'i
+        :param username: ThingsBoard cihaz/gateway erişim anahtarı
+        :param gateway_topic: Tanımlıysa tüm testereler gateway API'si ile tek mesajda gönderilir
+        :param qos: Yayın QoS seviyesi
+        :param batch_size: Bir mesajda gönderilecek en fazla örnek sayısı
+        :param max_latency_ms: Bir örneğin tamponda bekleyebileceği en uzun süre
+        :param spool_path: Disk kuyruğu dosyası
+        :param replay_batch: flush başına disk kuyruğundan gönderilecek en fazla mesaj
+        :param keepalive: MQTT keepalive süresi (s)
+        :param encoding: "json", "binary" (anahtar çerçeve) veya "binary_delta" (değişen alanlar)
+        :param columns: İkili kodlama şeması için sütun adı -> veri tipi sözlüğü
+        :param binary_topic: İkili mesajların gönderileceği topic, None ise `topic`
+        :param client: Hazır paho istemcisi (test için), None ise oluşturulur
+        """
+        self.topic = topic
+        self.gateway_topic = gateway_topic
+        self.qos = qos
+        self.batch_size = batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.replay_batch = replay_batch
+        self.spool_path = spool_path
+        self.spool = None
+
+        # İkili mesajlar ingest tarafında telemetry_codec.TelemetryDecoder ile çözülür
+        self.encoder = None
+        if encoding != "json":
+            if columns is None:
+                raise ValueError("İkili MQTT kodlaması için sütun şeması gerekli")
+            self.encoder = TelemetryEncoder(columns, delta=encoding == "binary_delta")
+        self.binary_topic = binary_topic or topic
+
+        self.pending = []  # [(testere adı, telemetri), ...]
+        self.first_pending_time = None
+        self.connected = threading.Event()
+
+        self.messages_published = 0
+        self.samples_published = 0
+        self.messages_spooled = 0
+        self.messages_replayed = 0
+        self.publish_errors = 0
+
+        if client is None:
+            client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+            client.username_pw_set(username, password=None)
+        self.client = client
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.broker_address = broker_address
+        self.port = port
+        self.keepalive = keepalive
+
+    @classmethod
+    def from_config(cls, mqtt_config, columns=None):
+        """
+        config.yaml'daki mqtt bölümünden yayıncı oluşturur.
+        :param columns: İkili kodlama kullanılıyorsa sütun adı -> veri tipi sözlüğü
+        """
+        return cls(
+            mqtt_config["broker_address"], mqtt_config["port"], mqtt_config["topic"], mqtt_config["username"],
+            gateway_topic=mqtt_config.get("gateway_topic"),
+            qos=mqtt_config.get("qos", 1),
+            batch_size=mqtt_config.get("batch_size", 50),
+            max_latency_ms=mqtt_config.get("max_latency_ms", 1000),
+            spool_path=mqtt_config.get("spool_path", "mqtt_spool.db"),
+            encoding=mqtt_config.get("encoding", "json"),
+            columns=columns,
+            binary_topic=mqtt_config.get("binary_topic"),
+        )
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code.is_failure:
+            print(f"MQTT connection refused: {reason_code}")
+            return
+        print("MQTT connection established")
+        self.connected.set()
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        if self.connected.is_set():
+            print(f"MQTT connection lost: {reason_code}")
+        self.connected.clear()
+
+    def start(self):
+        """
+        Ağ döngüsünü başlatır. Bağlantı arka planda kurulur, broker o an
+        ulaşılamaz durumda olsa bile çağrı bloklamaz. Disk kuyruğu bu
+        metodu çağıran thread'de açılır.
+        """
+        self.spool = MqttSpool(self.spool_path)
+        if len(self.spool):
+            print(f"MQTT: {len(self.spool)} spooled messages waiting for replay")
+        self.client.connect_async(self.broker_address, port=self.port, keepalive=self.keepalive)
+        self.client.loop_start()
+
+    def add(self, device_name, data):
+        """
+        Örneği gönderim tamponuna ekler, tampon doluysa gönderir.
+        :param device_name: Testere adı (gateway modunda cihaz adı)
+        :param data: İşlenmiş veri sözlüğü veya SampleRecord
+        """
+        telemetry_data = build_telemetry(data)
+        if telemetry_data is None:
+            return
+        if not self.pending:
+            self.first_pending_time = time.monotonic()
+        self.pending.append((device_name, telemetry_data))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def publish_batch(self, batch):
+        """
+        QueueConsumer için sink: (testere adı, veri) çiftlerini tampona ekler.
+        """
+        for device_name, data in batch:
+            self.add(device_name, data)
+
+    def flush_if_due(self):
+        """
+        En eski örnek `max_latency_ms` süresini aştıysa tamponu gönderir ve
+        bağlantı varsa disk kuyruğundan bir grup mesajı tekrar gönderir.
+        """
+        if self.pending and time.monotonic() - self.first_pending_time >= self.max_latency:
+            self.flush()
+        else:
+            self.replay()
+
+    def flush(self):
+        """
+        Tampondaki örnekleri mesaj(lar)a paketleyip gönderir.
+        """
+        if not self.pending:
+            return
+        if self.encoder is not None:
+            # Her testerenin örnekleri kendi mesajında, cihaz adı mesaj başlığında gider
+            devices = {}
+            for device_name, telemetry_data in self.pending:
+                devices.setdefault(device_name, []).append(telemetry_data)
+            for device_name, samples in devices.items():
+                self._send(self.binary_topic, self.encoder.encode_message(device_name, samples), len(samples))
+        elif self.gateway_topic:
+            devices = {}
+            for device_name, telemetry_data in self.pending:
+                devices.setdefault(device_name, []).append(telemetry_data)
+            self._send(self.gateway_topic, json.dumps(devices), len(self.pending))
+        else:
+            # ThingsBoard cihaz API'si [{ts, values}, ...] dizisini tek mesajda kabul eder
+            self._send(self.topic, json.dumps([telemetry_data for _, telemetry_data in self.pending]),
+                       len(self.pending))
+        self.pending = []
+        self.first_pending_time = None
+
+    def _publish(self, topic, payload):
+        # Bağlantı yoksa veya paho mesajı kabul etmezse False döner
+        if not self.connected.is_set():
+            return False
+        info = self.client.publish(topic, payload, qos=self.qos)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.publish_errors += 1
+            return False
+        return True
+
+    def _send(self, topic, payload, sample_count):
+        # Sıra korunur: disk kuyruğu boşalmadan yeni mesajlar da kuyruğa yazılır
+        if self.replay() and self._publish(topic, payload):
+            self.messages_published += 1
+            self.samples_published += sample_count
+            return
+        self.spool.push(topic, payload)
+        self.messages_spooled += 1
+
+    def replay(self):
+        """
+        Bağlantı varsa disk kuyruğundaki en eski mesajları gönderir.
+        :return: Disk kuyruğu tamamen boşaldıysa True
+        """
+        if self.spool is None or not len(self.spool):
+            return True
+        if not self.connected.is_set():
+            return False
+        last_sent = None
+        for message_id, topic, payload in self.spool.peek(self.replay_batch):
+            if not self._publish(topic, payload):
+                break
+            last_sent = message_id
+            self.messages_replayed += 1
+        if last_sent is not None:
+            # QoS>0 mesajlar paho'nun oturum kuyruğunda tutulur ve bağlantı koparsa yeniden gönderilir
+            self.spool.remove_through(last_sent)
+        return not len(self.spool)
+
+    def stats(self):
+        return {
+            "connected": self.connected.is_set(),
+            "pending_samples": len(self.pending),
+            "messages_published": self.messages_published,
+            "samples_published": self.samples_published,
+            "messages_spooled": self.messages_spooled,
+            "messages_replayed": self.messages_replayed,
+            "spool_depth": len(self.spool) if self.spool is not None else 0,
+            "publish_errors": self.publish_errors,
+        }
+
+    def close(self, timeout=5.0):
+        """
+        Bekleyen örnekleri gönderir (bağlantı yoksa diske yazar), ağ döngüsünü
+        durdurur ve bağlantıyı kapatır.
+        :param timeout: Disk kuyruğunun boşaltılması için beklenecek en uzun süre
+        """
+        self.flush()
+        deadline = time.monotonic() + timeout
+        while not self.replay() and self.connected.is_set() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.client.disconnect()
+        self.client.loop_stop()
+        if self.spool is not None:
+            self.spool.close()
+
+
+if __name__ == "__main__":
+    # Yerel bir broker (ör. mosquitto -p 1883) ile deneme:
+    # python mqtt_publisher.py [broker] [port] [örnek sayısı]
+    import sys
+
+    broker = sys.argv[1] if len(sys.argv) > 1 else "localhost"
+    broker_port = int(sys.argv[2]) if len(sys.argv) > 2 else 1883
+    sample_count = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    publisher = MqttPublisher(broker, broker_port, "v1/devices/me/telemetry", "test",
+                              batch_size=50, max_latency_ms=200, spool_path="mqtt_spool_test.db")
+    publisher.start()
+    publisher.connected.wait(5)
+    start_time = time.perf_counter()
+    for i in range(sample_count):
+        publisher.add("testere", {"ts": int(time.time() * 1000), "serit_motor_akim_a": 20.0 + i % 10})
+        publisher.flush_if_due()
+    publisher.close()
+    print(f"{sample_count} örnek {time.perf_counter() - start_time:.2f}s: {publisher.stats()}")
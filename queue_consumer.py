@@ -0,0 +1,144 @@
+import time
+from queue import Queue, Empty
+
+
+class MetricQueue(Queue):
+    """
+    Her elemanın kuyruğa girdiği anı saklayan Queue sınıfı.
+    Üretici tarafında bir değişiklik gerektirmez; tüketici, aldığı elemanın
+    ne kadar süre kuyrukta beklediğini (lag) `last_enqueue_time` ile öğrenir.
+    """
+    def _init(self, maxsize):
+        super()._init(maxsize)
+        self.last_enqueue_time = None
+        self.max_depth = 0
+
+    def _put(self, item):
+        # _put ve _get Queue'nun kilidi altında çağrılır
+        self.queue.append((time.monotonic(), item))
+        if len(self.queue) > self.max_depth:
+            self.max_depth = len(self.queue)
+
+    def _get(self):
+        enqueue_time, item = self.queue.popleft()
+        self.last_enqueue_time = enqueue_time
+        return item
+
+
+class QueueConsumer:
+    """
+    Kuyruktan bloklayarak veri alan ve mevcut tüm elemanları tek bir grup
+    halinde sink fonksiyonuna veren tüketici sınıfı.
+    Kuyruk derinliği ve gecikme (lag) istatistiklerini tutar.
+    """
+    def __init__(self, name, source_queue, sink, flush=None, max_batch=500, timeout=0.5, log_interval=10):
+        """
+        :param name: Log mesajlarında kullanılacak tüketici adı
+        :param source_queue: Verinin okunacağı kuyruk (MetricQueue ise lag ölçülür)
+        :param sink: Veri grubunu (liste) işleyen fonksiyon
+        :param flush: Kuyruk boşken ve durdurulurken çağrılacak fonksiyon
+        :param max_batch: Tek seferde işlenecek en fazla eleman sayısı
+        :param timeout: Kuyrukta veri beklenecek en uzun süre (saniye)
+        :param log_interval: İstatistiklerin yazdırılma aralığı (saniye), None ise yazdırılmaz
+        """
+        self.name = name
+        self.source_queue = source_queue
+        self.sink = sink
+        self.flush = flush
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.log_interval = log_interval
+
+        self.items_processed = 0
+        self.batches_processed = 0
+        self.largest_batch = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.last_log_time = time.monotonic()
+
+    def drain(self, block=True):
+        """
+        Kuyruktaki mevcut elemanları bir liste olarak alır.
+        :param block: True ise ilk eleman için `timeout` kadar beklenir
+        :return: Alınan elemanlar (boş olabilir)
+        """
+        batch = []
+        try:
+            batch.append(self.source_queue.get(block=block, timeout=self.timeout if block else None))
+            lag = self._item_lag()
+            while len(batch) < self.max_batch:
+                batch.append(self.source_queue.get_nowait())
+        except Empty:
+            pass
+
+        if batch:
+            # Grubun en eski elemanının bekleme süresi grubun gecikmesidir
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+        return batch
+
+    def _item_lag(self):
+        enqueue_time = getattr(self.source_queue, "last_enqueue_time", None)
+        if enqueue_time is None:
+            return 0.0
+        return time.monotonic() - enqueue_time
+
+    def process(self, batch):
+        """
+        Veri grubunu sink'e verir ve sayaçları günceller.
+        """
+        if not batch:
+            return
+        self.sink(batch)
+        self.items_processed += len(batch)
+        self.batches_processed += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+    def run(self, stop_flag):
+        """
+        `stop_flag()` True dönene kadar kuyruğu tüketir. Durdurulduğunda
+        kuyrukta kalan veriler işlenir ve `flush` çağrılır.
+        :param stop_flag: Thread'in durması gerektiğinde True dönen fonksiyon
+        """
+        while not stop_flag():
+            batch = self.drain()
+            self.process(batch)
+            if self.flush is not None:
+                self.flush()
+            self.log_stats()
+
+        # Kapanışta kuyrukta kalanları bekletmeden işle
+        while True:
+            batch = self.drain(block=False)
+            if not batch:
+                break
+            self.process(batch)
+        if self.flush is not None:
+            self.flush()
+
+    def stats(self):
+        """
+        Tüketici istatistiklerini döner.
+        :return: Kuyruk derinliği, gecikme ve işlenen eleman sayılarını içeren sözlük
+        """
+        return {
+            "queue_depth": self.source_queue.qsize(),
+            "max_queue_depth": getattr(self.source_queue, "max_depth", None),
+            "last_lag_s": self.last_lag,
+            "max_lag_s": self.max_lag,
+            "items_processed": self.items_processed,
+            "batches_processed": self.batches_processed,
+            "largest_batch": self.largest_batch,
+        }
+
+    def log_stats(self):
+        if self.log_interval is None:
+            return
+        now = time.monotonic()
+        if now - self.last_log_time < self.log_interval:
+            return
+        self.last_log_time = now
+        s = self.stats()
+        print(f"{self.name}: Kuyruk={s['queue_depth']} (maks {s['max_queue_depth']}), "
+              f"Gecikme={s['last_lag_s'] * 1000:.1f}ms (maks {s['max_lag_s'] * 1000:.1f}ms), "
+              f"İşlenen={s['items_processed']}, En büyük grup={s['largest_batch']}")
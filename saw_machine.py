@@ -0,0 +1,263 @@
+import os
+import time
+from pymodbus.client import ModbusTcpClient
+
+from modbus_reader import read_modbus_data, AsyncModbusAcquisition
+from fuzzy_adjustment import adjust_speeds_based_on_current
+from lineer_adjustment import adjust_speeds_linear
+from data_handler import RegisterDecoder
+from queue_consumer import MetricQueue
+from telemetry_buffer import TelemetryRingBuffer
+from cut_session import CutSessionDetector
+from time_alignment import capture_clock
+from speed_utility import SpeedBuffer, KesmeHiziTracker, SpeedCommandWriter, CuttingState
+
+
+class SawMachine:
+    """
+    Tek bir testereye ait Modbus bağlantısını, kontrol durumunu ve çıktı
+    bölümünü (veritabanı ve metin dosyası klasörü) bir arada tutan sınıf.
+    Aynı süreçte birden fazla testere izlenirken her testere kendi örneğini kullanır.
+    """
+    def __init__(self, name, modbus_config, database_config, columns, output_folder, cikis_sim,
+                 processed_data_queue, speed_adjustment_interval=0.2, telemetry_capacity=6000, speed_profiles=None,
+                 vision=None):
+        """
+        :param name: Testere adı (log, klasör ve MQTT cihaz adı olarak kullanılır)
+        :param modbus_config: ip, port, start_address, number_of_bits, acquisition, rate_hz
+        :param database_config: config.yaml'daki database bölümü
+        :param columns: Sütun adı -> veri tipi sözlüğü
+        :param output_folder: Testerenin veritabanı ve metin dosyasının yazılacağı klasör
+        :param cikis_sim: Testereye ait fuzzy sistem örneği
+        :param processed_data_queue: MQTT için ortak kuyruk, (testere adı, veri) eklenir
+        :param speed_adjustment_interval: Modbus yazma aralığı
+        :param telemetry_capacity: Halka tamponda tutulacak son örnek sayısı
+        :param speed_profiles: Lineer kontrolün hız profilleri (SpeedProfileLibrary), None ise varsayılan dosya
+        :param vision: Testerenin kamerasını analiz eden BladeVision; son kare özellikleri örneğe eklenir
+        """
+        self.name = name
+        self.modbus_config = modbus_config
+        self.columns = columns
+        self.cikis_sim = cikis_sim
+        self.processed_data_queue = processed_data_queue
+        self.speed_adjustment_interval = speed_adjustment_interval
+        self.speed_profiles = speed_profiles
+        self.vision = vision
+
+        os.makedirs(output_folder, exist_ok=True)
+        self.output_folder = output_folder
+        self.total_database_path = os.path.join(output_folder, database_config["total_database_path"])
+        self.text_file_path = os.path.join(output_folder, database_config["text_file_path"])
+
+        # Testereye ait kontrol durumu
+        self.speed_buffer = SpeedBuffer()
+        self.kesme_hizi_tracker = KesmeHiziTracker()
+        self.cutting_state = CuttingState()
+        self.last_modbus_write_time = time.time()
+        self.prev_current = 0
+        self.fuzzy_control_enabled = False
+        self.linear_control_enabled = False
+
+        # Register bloklarını ara sözlük oluşturmadan kayda çözen derlenmiş çözücü
+        self.decoder = RegisterDecoder(columns, modbus_config["number_of_bits"])
+
+        # Son örneklerin sayısal alanları; kontrol, arayüz ve pencere hesapları buradan okur
+        self.telemetry = TelemetryRingBuffer(
+            [col for col, dtype in columns.items() if dtype.upper() in ("REAL", "INTEGER")],
+            capacity=telemetry_capacity
+        )
+
+        # Kesimleri ayırıp her örneğe cut_id atar, biten kesimlerin özetini üretir
+        self.cut_detector = CutSessionDetector()
+        # Okuma döngüsü çalışırken True; DB thread'i bu döngü bitene kadar kuyruğu tüketir
+        self.reading = False
+
+        self.data_queue = MetricQueue()
+        self.conn_status = 0
+
+        self.is_async = modbus_config.get("acquisition", "sync") == "async"
+        if self.is_async:
+            # Asenkron modda okuma ve yazma aynı asenkron bağlantıyı kullanır
+            self.modbus_client = None
+            self.speed_writer = SpeedCommandWriter(None, auto_flush=False)
+        else:
+            self.modbus_client = ModbusTcpClient(modbus_config["ip"], port=modbus_config["port"])
+            self.speed_writer = SpeedCommandWriter(self.modbus_client)
+
+    def handle_sample(self, raw_data, sample_time=None):
+        """
+        Okunan register bloğunu işler, seçili kontrol algoritmasını çalıştırır
+        ve sonucu kayıt/MQTT kuyruklarına ekler.
+        :param raw_data: Modbus'tan okunan register değerleri
+        :param sample_time: Örneğin alındığı an (capture_clock ölçeğinde), None ise şu an
+        """
+        if sample_time is None:
+            # Kareler ile aynı monotonik yakalama saati; NTP düzeltmelerinde sıçramaz
+            sample_time = capture_clock.now()
+        processed_data = self.decoder.decode(raw_data, sample_time)
+        cut_id, finished_cut = self.cut_detector.update(processed_data, sample_time)
+        if "cut_id" in self.columns:
+            processed_data["cut_id"] = cut_id
+        if finished_cut is not None:
+            # Özet, kesimden sonraki ilk örnekten önce DB kuyruğuna eklenir
+            self.queue_cut(finished_cut)
+        if self.vision is not None:
+            # Örnek anına yakın (max_age_s içinde) analiz edilmiş kare varsa özellikleri serit_sapmasi'nın yanına eklenir
+            features = self.vision.latest_features(sample_time)
+            if features is not None:
+                for col, value in features.items():
+                    processed_data[col] = value
+        self.telemetry.append(processed_data, sample_time)
+        prev_prev_current = self.prev_current
+        self.prev_current = processed_data.get('serit_motor_akim_a', None)
+
+        fuzzy_output_value = None
+        akim_degisim = None
+
+        if self.fuzzy_control_enabled:
+            # Fuzzy kontrol ile ayarlama
+            self.prev_current, fuzzy_output_value, akim_degisim, self.last_modbus_write_time = adjust_speeds_based_on_current(
+                processed_speed_data=processed_data,
+                prev_current=self.prev_current,
+                modbus_client=self.modbus_client,
+                adaptive_speed_control_enabled=self.fuzzy_control_enabled,
+                speed_buffer=self.speed_buffer,
+                last_modbus_write_time=self.last_modbus_write_time,
+                speed_adjustment_interval=self.speed_adjustment_interval,
+                kesme_hizi_tracker=self.kesme_hizi_tracker,
+                cikis_sim=self.cikis_sim,
+                speed_writer=self.speed_writer,
+                cutting_state=self.cutting_state
+            )
+            processed_data["fuzzy_control"] = 1
+
+        elif self.linear_control_enabled:
+            # Lineer kontrol ile ayarlama
+            self.last_modbus_write_time, fuzzy_output_value = adjust_speeds_linear(
+                processed_speed_data=processed_data,
+                modbus_client=self.modbus_client,
+                last_modbus_write_time=self.last_modbus_write_time,
+                speed_adjustment_interval=self.speed_adjustment_interval,
+                cikis_sim=self.cikis_sim,
+                prev_current=prev_prev_current,
+                speed_writer=self.speed_writer,
+                cutting_state=self.cutting_state,
+                speed_profiles=self.speed_profiles
+            )
+            processed_data["fuzzy_control"] = 0
+
+        else:
+            # Sadece veri kaydı
+            processed_data["fuzzy_control"] = 0
+
+        processed_data["fuzzy_output"] = fuzzy_output_value
+        processed_data["akim_degisim"] = akim_degisim
+        self.telemetry.update_latest({
+            "fuzzy_output": fuzzy_output_value,
+            "akim_degisim": akim_degisim,
+            "fuzzy_control": processed_data["fuzzy_control"]
+        })
+
+        self.data_queue.put(processed_data)
+        self.processed_data_queue.put((self.name, processed_data))
+        self.prev_current = processed_data.get('serit_motor_akim_a', None)
+
+    def queue_cut(self, summary):
+        self.data_queue.put(summary)
+        print(f"{self.name}: Kesim {summary.cut_id} bitti, {summary.duration_s:.1f}s, "
+              f"{summary.energy_as:.0f} A·s")
+
+    def finish_reading(self):
+        """
+        Okuma döngüsü bitince (kapanış) devam eden kesimi bitirir; özeti DB thread'i
+        durmadan kuyruğa eklenir, böylece kesimin satırları cuts kaydı olmadan kalmaz.
+        """
+        summary = self.cut_detector.finish()
+        if summary is not None:
+            self.queue_cut(summary)
+        self.reading = False
+
+    def run_sync(self, stop_flag):
+        """
+        Senkron istemci ile okuma döngüsü. Testere başına bir thread'de çalışır.
+        :param stop_flag: Thread'in durması gerektiğinde True dönen fonksiyon
+        """
+        self.reading = True
+        try:
+            while not stop_flag():
+                if not self.modbus_client.is_socket_open():
+                    try:
+                        self.modbus_client.connect()
+                        if stop_flag():
+                            print(f"{self.name}: Modbus thread stopping...")
+                            break
+                        print(f"{self.name}: Modbus connection established")
+                        self.speed_writer.invalidate()
+                        self.conn_status = 1
+                    except Exception as e:
+                        if stop_flag():
+                            print(f"{self.name}: Modbus thread stopping during connection...")
+                            break
+                        print(f"{self.name}: Modbus connection failed: {e}")
+                        time.sleep(1)
+                        continue
+
+                while not stop_flag():
+                    try:
+                        for raw_data in read_modbus_data(self.modbus_client, self.modbus_config["start_address"],
+                                                         self.modbus_config["number_of_bits"],
+                                                         stop_threads_flag=stop_flag, conn_status=self.conn_status):
+                            if stop_flag():
+                                print(f"{self.name}: Modbus thread stopping...")
+                                break
+
+                            self.handle_sample(raw_data)
+
+                        self.conn_status = 1
+                    except Exception as e:
+                        if stop_flag():
+                            print(f"{self.name}: Modbus thread stopping...")
+                            break
+                        print(f"{self.name}: Error reading Modbus data: {e}")
+                        time.sleep(1)
+                        continue
+                if stop_flag():
+                    break
+                time.sleep(0.1)
+        finally:
+            self.finish_reading()
+
+    async def run_async(self, stop_flag):
+        """
+        Sabit frekanslı asenkron okuma döngüsü. Tüm testerelerin döngüleri
+        aynı event loop içinde eş zamanlı çalışır; hız yazmaları okuma ile
+        aynı asenkron bağlantı üzerinden sırayla gönderilir.
+        :param stop_flag: Döngünün durması gerektiğinde True dönen fonksiyon
+        """
+        acquisition = AsyncModbusAcquisition(
+            self.modbus_config["ip"], self.modbus_config["port"],
+            self.modbus_config["start_address"],
+            self.modbus_config["number_of_bits"],
+            rate_hz=self.modbus_config.get("rate_hz", 10),
+            name=self.name
+        )
+        self.reading = True
+        try:
+            connection_count = 0
+            async for raw_data, _, receive_monotonic in acquisition.read_modbus_data(stop_threads_flag=stop_flag):
+                sample_time = capture_clock.from_monotonic(receive_monotonic)
+                self.conn_status = 1
+                if acquisition.connection_count != connection_count:
+                    # Yeniden bağlanıldı, PLC'deki değerler değişmiş olabilir
+                    connection_count = acquisition.connection_count
+                    self.speed_writer.modbus_client = acquisition.client
+                    self.speed_writer.invalidate()
+                try:
+                    self.handle_sample(raw_data, sample_time)
+                    await self.speed_writer.flush_async()
+                except Exception as e:
+                    print(f"{self.name}: Error processing Modbus data: {e}")
+        finally:
+            self.finish_reading()
+        self.conn_status = 0
+        print(f"{self.name}: Modbus thread stopping... {acquisition.stats()}")
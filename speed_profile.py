@@ -0,0 +1,201 @@
+import os
+import time
+from bisect import bisect_right
+
+import numpy as np
+import yaml
+
+
+class SpeedProfile:
+    """
+    Kafa yüksekliğine göre kesme ve inme hızı tablosu. Tablo yüklenirken
+    yüksekliğe göre artan sıralanır; tek değer için bisect ile O(log n),
+    yükseklik dizileri için np.interp ile vektörel hesap yapılır.
+    Tablo dışındaki yüksekliklerde en yakın uçtaki hızlar kullanılır.
+    """
+    def __init__(self, name, table, katsayi=1.0, min_speed=5.0, max_speed=101.0, match=None):
+        """
+        :param name: Profil adı
+        :param table: [[kafa_yuksekligi_mm, kesme_hizi, inme_hizi], ...] (sırası önemsiz)
+        :param katsayi: Tablodaki hızların çarpanı
+        :param min_speed: Yazılacak hızların alt sınırı
+        :param max_speed: Yazılacak hızların üst sınırı
+        :param match: Profilin seçileceği örnek alanları (ör. {"malzeme_cinsi": "ST37"})
+        """
+        rows = sorted((float(height), float(kesme), float(inme)) for height, kesme, inme in table)
+        if len(rows) < 2:
+            raise ValueError(f"{name}: hız tablosunda en az iki satır olmalı")
+        heights = [row[0] for row in rows]
+        if len(set(heights)) != len(heights):
+            raise ValueError(f"{name}: hız tablosunda aynı yükseklik birden fazla kez var")
+
+        self.name = name
+        self.katsayi = float(katsayi)
+        self.min_speed = float(min_speed)
+        self.max_speed = float(max_speed)
+        self.match = dict(match or {})
+        self.heights = np.array(heights)
+        self.kesme = np.array([row[1] for row in rows])
+        self.inme = np.array([row[2] for row in rows])
+        # bisect için liste ve aralık eğimleri önceden hesaplanır
+        self._heights = heights
+        self._rows = rows
+        self._slopes = [((next_row[1] - row[1]) / (next_row[0] - row[0]), (next_row[2] - row[2]) / (next_row[0] - row[0]))
+                        for row, next_row in zip(rows, rows[1:])]
+
+    def speeds(self, height):
+        """
+        Verilen yükseklik için tablodan interpolasyonla kesme ve inme hızını döndürür.
+        :param height: Kafa yüksekliği (mm)
+        :return: (kesme hızı, inme hızı)
+        """
+        i = bisect_right(self._heights, height)
+        if i == 0:
+            return self._rows[0][1], self._rows[0][2]
+        if i == len(self._rows):
+            return self._rows[-1][1], self._rows[-1][2]
+        low = self._rows[i - 1]
+        kesme_slope, inme_slope = self._slopes[i - 1]
+        offset = height - low[0]
+        return low[1] + offset * kesme_slope, low[2] + offset * inme_slope
+
+    def speeds_array(self, heights):
+        """
+        Yükseklik dizisi için tablo hızlarını vektörel hesaplar.
+        :return: (kesme hızları, inme hızları) dizileri
+        """
+        heights = np.asarray(heights, dtype=np.float64)
+        return np.interp(heights, self.heights, self.kesme), np.interp(heights, self.heights, self.inme)
+
+    def command(self, height):
+        """
+        Lineer kontrolün yazacağı hızlar: tablo hızı x katsayı, sınırlar içinde.
+        """
+        kesme, inme = self.speeds(height)
+        return (max(self.min_speed, min(kesme * self.katsayi, self.max_speed)),
+                max(self.min_speed, min(inme * self.katsayi, self.max_speed)))
+
+    def command_array(self, heights):
+        """
+        Kafa yüksekliği kaydı için lineer kontrolün yazacağı hızları vektörel hesaplar
+        (çevrim dışı simülasyon).
+        """
+        kesme, inme = self.speeds_array(heights)
+        return (np.clip(kesme * self.katsayi, self.min_speed, self.max_speed),
+                np.clip(inme * self.katsayi, self.min_speed, self.max_speed))
+
+    def matches(self, sample):
+        return all(sample.get(field) == value for field, value in self.match.items())
+
+
+def load_profiles(path):
+    """
+    Profil dosyasını okur.
+    :return: (profil adı -> SpeedProfile, varsayılan profil adı)
+    """
+    with open(path, "r") as profile_file:
+        data = yaml.safe_load(profile_file)
+    defaults = data.get("defaults", {})
+    profiles = {}
+    for name, profile_config in data["profiles"].items():
+        options = dict(defaults)
+        options.update(profile_config)
+        profiles[name] = SpeedProfile(name, **options)
+    default_name = data.get("default", next(iter(profiles)))
+    if default_name not in profiles:
+        raise ValueError(f"Varsayılan profil bulunamadı: {default_name}")
+    return profiles, default_name
+
+
+class SpeedProfileLibrary:
+    """
+    speed_profiles.yaml'daki profilleri tutar ve örneğin malzeme/şerit alanlarına
+    göre uygun profili seçer. Dosya değiştirildiğinde (mtime) en fazla
+    `reload_interval_s` saniye içinde yeniden okunur; hatalı dosyada eski
+    profiller kullanılmaya devam eder. Testere süreci yeniden başlatılmaz.
+    """
+    def __init__(self, path="speed_profiles.yaml", reload_interval_s=1.0):
+        self.path = path
+        self.reload_interval_s = reload_interval_s
+        self.profiles = {}
+        self.default_name = None
+        self.match_fields = ()
+        self.mtime = None
+        self.next_check = 0.0
+        self._selection = {}
+        self.reload()
+
+    def reload(self):
+        """
+        Profil dosyasını okur. Yeni profiller tek atamada devreye girer.
+        :return: Dosya okunduysa True
+        """
+        mtime = os.stat(self.path).st_mtime
+        try:
+            profiles, default_name = load_profiles(self.path)
+        except Exception as e:
+            if not self.profiles:
+                raise
+            # Aynı hatalı dosya her kontrolde yeniden okunmaz
+            self.mtime = mtime
+            print(f"Hız profilleri yeniden yüklenemedi, önceki profiller kullanılıyor: {e}")
+            return False
+        match_fields = tuple(sorted({field for profile in profiles.values() for field in profile.match}))
+        self.profiles, self.default_name, self.match_fields, self._selection = \
+            profiles, default_name, match_fields, {}
+        self.mtime = mtime
+        print(f"Hız profilleri yüklendi: {', '.join(profiles)} (varsayılan: {default_name})")
+        return True
+
+    def check_reload(self):
+        """
+        Dosya değiştiyse yeniden yükler. Dosya durumu en fazla `reload_interval_s` aralıkla sorgulanır.
+        """
+        now = time.monotonic()
+        if now < self.next_check:
+            return False
+        self.next_check = now + self.reload_interval_s
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        return mtime != self.mtime and self.reload()
+
+    def profile_for(self, sample):
+        """
+        Örneğe uyan ilk profili, yoksa varsayılan profili döndürür.
+        Seçim malzeme/şerit alanları değişmedikçe önbellekten gelir.
+        """
+        self.check_reload()
+        key = tuple(sample.get(field) for field in self.match_fields)
+        profile = self._selection.get(key)
+        if profile is None:
+            profile = next((profile for profile in self.profiles.values() if profile.match and profile.matches(sample)),
+                           self.profiles[self.default_name])
+            self._selection[key] = profile
+        return profile
+
+    def __getitem__(self, name):
+        self.check_reload()
+        return self.profiles[name]
+
+
+if __name__ == "__main__":
+    # Tekil bisect ve vektörel hesabın süresi: python speed_profile.py [speed_profiles.yaml]
+    import sys
+
+    library = SpeedProfileLibrary(sys.argv[1] if len(sys.argv) > 1 else "speed_profiles.yaml")
+    profile = library.profiles[library.default_name]
+    trace = np.random.default_rng(0).uniform(-10, 320, 100000)
+
+    start_time = time.perf_counter()
+    scalar = [profile.command(height) for height in trace]
+    scalar_elapsed = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    kesme, inme = profile.command_array(trace)
+    vector_elapsed = time.perf_counter() - start_time
+
+    error = max(np.max(np.abs(np.array(scalar)[:, 0] - kesme)), np.max(np.abs(np.array(scalar)[:, 1] - inme)))
+    print(f"Tekil ile vektörel hesap arasındaki en büyük fark: {error:.2e}")
+    print(f"tekil   : {scalar_elapsed / len(trace) * 1e6:.2f} us/örnek")
+    print(f"vektörel: {vector_elapsed / len(trace) * 1e6:.3f} us/örnek")
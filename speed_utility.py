@@ -1,3 +1,5 @@
+import heapq
+import itertools
 import math
 import time
 
@@ -74,6 +76,99 @@ class KesmeHiziTracker:
                 self.last_time_checked = current_time
 
 
+class CuttingState:
+    """
+    Kontrol algoritmalarının kesim başlangıcını takip ettiği durum sınıfı.
+    Birden fazla testere aynı süreçte kontrol edildiğinde her testere kendi
+    örneğini kullanır.
+    """
+    def __init__(self):
+        self.cutting_start_timestamp = None
+
+
+class PredictionScheduler:
+    """
+    Gelecekteki bir ana zamanlanmış hız komutlarını hedef zamana göre sıralı
+    tutan heap tabanlı zamanlayıcı. Ekleme ve çıkarma O(log n)'dir; her
+    çağrıda yalnızca zamanı gelen komutlar çıkarılır. Aynı anda birden fazla
+    komutun zamanı gelmişse eskiler atlanır ve yalnızca en yenisi döner.
+    """
+    def __init__(self):
+        self.heap = []  # [(hedef_zaman, sıra_no, hızlar), ...]
+        self.sequence = itertools.count()  # Aynı hedef zamanlı komutlarda ekleme sırası korunur
+        self.scheduled = 0
+        self.dispatched = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, target_time, speeds):
+        """
+        :param target_time: Komutun gönderileceği an (time.time())
+        :param speeds: (kesme hızı, inme hızı)
+        """
+        heapq.heappush(self.heap, (target_time, next(self.sequence), speeds))
+        self.scheduled += 1
+
+    def next_due_time(self):
+        """
+        En yakın komutun hedef zamanı, bekleyen komut yoksa None.
+        """
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now=None):
+        """
+        Zamanı gelen tüm komutları çıkarır ve en yenisini döndürür.
+        :param now: Şu anki zaman, None ise time.time()
+        :return: (hedef_zaman, hızlar) veya zamanı gelen komut yoksa None
+        """
+        now = time.time() if now is None else now
+        latest = None
+        popped = 0
+        while self.heap and self.heap[0][0] <= now:
+            target_time, _, speeds = heapq.heappop(self.heap)
+            latest = (target_time, speeds)
+            popped += 1
+        if latest is not None:
+            self.dispatched += 1
+            self.coalesced += popped - 1
+        return latest
+
+    def clear(self):
+        self.heap.clear()
+
+
+def apply_sign_bit(value, is_negative=False):
+    """
+    İnme hızı register değerine yön (işaret) bitini uygular.
+    :param value: Register değeri
+    :param is_negative: Değer negatif mi?
+    :return: 15. biti yöne göre ayarlanmış register değeri
+    """
+    if not is_negative:
+        sign_bit = 1 << 15
+    else:
+        sign_bit = 0
+    return sign_bit | value & 0x7FFF
+
+
+def encode_speed(value, value_type, inme_hizi_is_negative=False):
+    """
+    Hız değerini makinenin beklediği register adresi ve değerine çevirir.
+    :param value: Girdi hız değeri
+    :param value_type: Değer tipi ('serit_inme_hizi' veya 'serit_kesme_hizi')
+    :param inme_hizi_is_negative: İnme hızı negatif mi?
+    :return: (register adresi, register değeri)
+    """
+    if value_type == 'serit_inme_hizi':
+        inme_hizi_modbus_value = math.ceil((value / -0.06) + 65535)
+        return INME_HIZI_REGISTER_ADDRESS, apply_sign_bit(inme_hizi_modbus_value, inme_hizi_is_negative)
+    elif value_type == 'serit_kesme_hizi':
+        return KESME_HIZI_REGISTER_ADDRESS, math.ceil(value / 0.0754)
+    raise ValueError(f"Bilinmeyen hız tipi: {value_type}")
+
+
 def reverse_calculate_value(modbus_client, value, value_type, inme_hizi_is_negative=False):
     """
     Hız değerlerini makine tarafından beklenen değerlere dönüştürür.
@@ -102,13 +197,123 @@ def write_to_modbus(modbus_client, address, value, is_negative=False):
     :param is_negative: Değer negatif mi?
     """
     if address == 2041:  # İnme hızı adresi
-        if not is_negative:
-            sign_bit = 1 << 15
-        else:
-            sign_bit = 0
-
-        modbus_value = sign_bit | value & 0x7FFF
+        modbus_value = apply_sign_bit(value, is_negative)
         modbus_client.write_register(2041, modbus_value)
 
     elif address == 2066:  # Kesme hızı adresi
         modbus_client.write_register(2066, value)
+
+
+def write_speeds(modbus_client, serit_kesme_hizi, serit_inme_hizi, inme_hizi_is_negative=False, speed_writer=None):
+    """
+    Kesme ve inme hızlarını birlikte yazar. speed_writer verilmişse yazmalar
+    SpeedCommandWriter üzerinden birleştirilir, aksi halde ayrı ayrı yazılır.
+    """
+    if speed_writer is None:
+        reverse_calculate_value(modbus_client, serit_kesme_hizi, 'serit_kesme_hizi')
+        reverse_calculate_value(modbus_client, serit_inme_hizi, 'serit_inme_hizi', inme_hizi_is_negative)
+        return
+
+    speed_writer.set_speeds(serit_kesme_hizi, serit_inme_hizi, inme_hizi_is_negative)
+    if speed_writer.auto_flush:
+        speed_writer.flush()
+
+
+class SpeedCommandWriter:
+    """
+    Bekleyen hız register yazmalarını toplayıp mümkün olan en az Modbus
+    işlemiyle gönderen sınıf.
+
+    - Aynı adrese yapılan ardışık yazmalarda yalnızca son değer gönderilir.
+    - Son yazılan değerle aynı olan register'lar hiç gönderilmez.
+    - Bitişik adresler tek bir write_registers (FC16) isteğinde birleştirilir.
+    - Bitişik olmayan gruplar (ör. 2041 ve 2066) ayrı isteklerdir ve sırayla
+      gönderilir. pymodbus istemcisi bir isteğin yanıtını almadan sonrakini
+      göndermediğinden (istemci kilidi) asenkron istemcide de sıra aynıdır.
+
+    auto_flush False ise write_speeds yalnızca değerleri biriktirir; gönderim
+    çağıranın flush/flush_async çağrısıyla yapılır (asenkron okuma döngüsü).
+    """
+    def __init__(self, modbus_client, auto_flush=True):
+        self.modbus_client = modbus_client
+        self.auto_flush = auto_flush
+        self.pending = {}  # adres -> register değeri
+        self.last_written = {}  # adres -> en son başarıyla yazılan değer
+        self.requests_sent = 0
+        self.writes_skipped = 0
+
+    def set_speed(self, value, value_type, inme_hizi_is_negative=False):
+        """
+        Hız değerini kodlayıp bekleyen yazmalara ekler.
+        """
+        address, register_value = encode_speed(value, value_type, inme_hizi_is_negative)
+        self.pending[address] = register_value
+
+    def set_speeds(self, serit_kesme_hizi, serit_inme_hizi, inme_hizi_is_negative=False):
+        self.set_speed(serit_kesme_hizi, 'serit_kesme_hizi')
+        self.set_speed(serit_inme_hizi, 'serit_inme_hizi', inme_hizi_is_negative)
+
+    def invalidate(self):
+        """
+        Son yazılan değerleri unutur. Bağlantı yenilendiğinde çağrılmalıdır,
+        çünkü PLC tarafındaki değerler bu arada değişmiş olabilir.
+        """
+        self.last_written = {}
+
+    def _take_runs(self):
+        """
+        Değişen bekleyen yazmaları bitişik adres gruplarına ayırır.
+        :return: [(başlangıç adresi, [değerler]), ...]
+        """
+        runs = []
+        for address in sorted(self.pending):
+            value = self.pending[address]
+            if self.last_written.get(address) == value:
+                self.writes_skipped += 1
+                continue
+            if runs and runs[-1][0] + len(runs[-1][1]) == address:
+                runs[-1][1].append(value)
+            else:
+                runs.append((address, [value]))
+        self.pending = {}
+        return runs
+
+    def _request(self, address, values):
+        self.requests_sent += 1
+        if len(values) == 1:
+            return self.modbus_client.write_register(address, values[0])
+        return self.modbus_client.write_registers(address, values)
+
+    def _record(self, address, values, response):
+        if response is not None and hasattr(response, 'isError') and response.isError():
+            print(f"Modbus yazma hatası: adres={address}, yanıt={response}")
+            return
+        for offset, value in enumerate(values):
+            self.last_written[address + offset] = value
+
+    def flush(self):
+        """
+        Bekleyen yazmaları senkron istemci ile gönderir.
+        :return: Gönderilen istek sayısı
+        """
+        runs = self._take_runs()
+        for address, values in runs:
+            self._record(address, values, self._request(address, values))
+        return len(runs)
+
+    async def flush_async(self):
+        """
+        Bekleyen yazmaları asenkron istemci ile sırayla gönderir; her istek
+        yanıtı geldikten sonra bir sonrakine geçilir. Bir isteğin hatası
+        diğerlerinin gönderilmesini engellemez.
+        :return: Gönderilen istek sayısı
+        """
+        runs = self._take_runs()
+        for address, values in runs:
+            try:
+                response = await self._request(address, values)
+            except Exception as e:
+                print(f"Modbus yazma hatası: adres={address}, hata={e}")
+                continue
+            self._record(address, values, response)
+        return len(runs)
@@ -0,0 +1,178 @@
+import time
+import numpy as np
+
+
+class TelemetryRingBuffer:
+    """
+    Son örnekleri önceden ayrılmış bir NumPy dizisinde tutan sabit boyutlu halka tampon.
+    Her satır iki kez yazılır (i ve i + capacity konumlarına); böylece son n
+    örnek her zaman bellekte bitişik durur ve pencere okumaları kopyasız bir
+    dilimdir. Tek yazıcı (Modbus thread'i) ve çok sayıda okuyucu için tasarlanmıştır.
+
+    Dönen görünümler tampon ile aynı belleği paylaşır; yazıcı `capacity`
+    örnek ilerlediğinde üzerine yazılırlar. Daha uzun süre tutulacak
+    pencereler için `copy=True` kullanılmalıdır.
+    """
+    def __init__(self, fields, capacity=6000):
+        """
+        :param fields: Tamponda tutulacak sayısal alanların adları
+        :param capacity: Tutulacak en fazla örnek sayısı
+        """
+        self.fields = list(fields)
+        self.field_index = {field: i for i, field in enumerate(self.fields)}
+        self.capacity = capacity
+        self.data = np.full((2 * capacity, len(self.fields)), np.nan)
+        self.times = np.zeros(2 * capacity)
+        self.count = 0  # Şimdiye kadar eklenen toplam örnek sayısı (sıra numarası)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, sample, sample_time=None):
+        """
+        Örneği tampona ekler. Tanımsız veya sayısal olmayan alanlar NaN olarak yazılır.
+        :param sample: Alan adıyla erişilebilen örnek (dict veya SampleRecord)
+        :param sample_time: Örneğin alındığı an (time.time()), None ise şu an
+        """
+        row = self.count % self.capacity
+        values = self.data[row]
+        for i, field in enumerate(self.fields):
+            value = sample.get(field)
+            try:
+                values[i] = np.nan if value is None else value
+            except (TypeError, ValueError):
+                values[i] = np.nan
+        self.data[row + self.capacity] = values
+        timestamp = time.time() if sample_time is None else sample_time
+        self.times[row] = timestamp
+        self.times[row + self.capacity] = timestamp
+        # Sıra numarası satır tamamen yazıldıktan sonra ilerletilir, okuyucular yarım satır görmez
+        self.count += 1
+
+    def update_latest(self, values):
+        """
+        Son eklenen örneğin alanlarını günceller (ör. kontrol çıktıları örnek eklendikten sonra hesaplanır).
+        :param values: Alan adı -> değer sözlüğü, tamponda olmayan alanlar yok sayılır
+        """
+        if self.count == 0:
+            return
+        row = (self.count - 1) % self.capacity
+        for field, value in values.items():
+            i = self.field_index.get(field)
+            if i is None:
+                continue
+            value = np.nan if value is None else value
+            self.data[row, i] = value
+            self.data[row + self.capacity, i] = value
+
+    def _bounds(self, end, n):
+        # end sıra numarasına kadar olan son n örneğin bitişik satır aralığı
+        n = min(n, end, self.capacity)
+        stop = (end - 1) % self.capacity + self.capacity + 1
+        return stop - n, stop
+
+    def _columns(self, rows, fields):
+        if fields is None:
+            return rows
+        if isinstance(fields, str):
+            return rows[:, self.field_index[fields]]
+        indices = [self.field_index[field] for field in fields]
+        if indices == list(range(indices[0], indices[0] + len(indices))):
+            # Ardışık alanlar kopyasız dilim olarak döner
+            return rows[:, indices[0]:indices[0] + len(indices)]
+        return rows[:, indices]
+
+    def window(self, n, fields=None, copy=False):
+        """
+        Son n örneği döndürür (en eskiden en yeniye).
+        :param n: Örnek sayısı, tamponda daha azı varsa mevcut olanlar döner
+        :param fields: Alan adı, alan adları listesi veya None (tüm alanlar)
+        :param copy: True ise tampondan bağımsız bir kopya döner
+        :return: (örnek sayısı x alan sayısı) dizi, tek alan için 1 boyutlu dizi
+        """
+        start, stop = self._bounds(self.count, n)
+        result = self._columns(self.data[start:stop], fields)
+        return result.copy() if copy else result
+
+    def window_times(self, n):
+        """
+        Son n örneğin zaman damgalarını döndürür.
+        """
+        start, stop = self._bounds(self.count, n)
+        return self.times[start:stop]
+
+    def since(self, start_time, fields=None):
+        """
+        Verilen andan sonra alınan örnekleri zaman damgalarıyla birlikte döndürür.
+        :param start_time: Unix zaman damgası
+        :param fields: Alan adı, alan adları listesi veya None
+        :return: (zaman damgaları, değerler)
+        """
+        start, stop = self._bounds(self.count, self.capacity)
+        times = self.times[start:stop]
+        first = int(np.searchsorted(times, start_time, side='right'))
+        return times[first:], self._columns(self.data[start + first:stop], fields)
+
+    def latest(self, field):
+        """
+        Son örnekteki alan değerini döndürür, tampon boşsa None.
+        """
+        if self.count == 0:
+            return None
+        return float(self.data[(self.count - 1) % self.capacity, self.field_index[field]])
+
+    def latest_time(self):
+        """
+        Son örneğin zaman damgası, tampon boşsa None.
+        """
+        if self.count == 0:
+            return None
+        return float(self.times[(self.count - 1) % self.capacity])
+
+    def cursor(self, from_start=False):
+        """
+        Tampon için yeni bir okuma imleci oluşturur.
+        :param from_start: True ise tamponda kalan en eski örnekten, False ise bundan sonraki örneklerden başlar
+        """
+        return TelemetryCursor(self, max(0, self.count - self.capacity) if from_start else self.count)
+
+
+class TelemetryCursor:
+    """
+    Halka tamponu kendi hızında okuyan imleç. Her `read` çağrısı bir önceki
+    çağrıdan bu yana eklenen örnekleri kopyasız görünüm olarak döndürür.
+    Okuyucu yazıcının bir tur gerisinde kalırsa kaçırılan örnekler `overruns`
+    sayacına eklenir ve okuma tamponda kalan en eski örnekten devam eder.
+    """
+    def __init__(self, buffer, position):
+        self.buffer = buffer
+        self.position = position
+        self.overruns = 0
+
+    def pending(self):
+        """
+        Henüz okunmamış örnek sayısı.
+        """
+        return self.buffer.count - self.position
+
+    def read(self, fields=None, max_items=None):
+        """
+        Yeni örnekleri döndürür.
+        :param fields: Alan adı, alan adları listesi veya None
+        :param max_items: Bir çağrıda dönecek en fazla örnek sayısı
+        :return: (zaman damgaları, değerler), yeni örnek yoksa boş diziler
+        """
+        buffer = self.buffer
+        end = buffer.count
+        oldest = end - buffer.capacity
+        if self.position < oldest:
+            self.overruns += oldest - self.position
+            self.position = oldest
+
+        n = end - self.position
+        if max_items is not None:
+            n = min(n, max_items)
+            end = self.position + n
+        start, stop = buffer._bounds(end, n)
+        self.position = end
+        return buffer.times[start:stop], buffer._columns(buffer.data[start:stop], fields)
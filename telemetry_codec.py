@@ -0,0 +1,244 @@
+import math
+import struct
+import zlib
+
+MAGIC = b'ST'
+VERSION = 1
+FLAG_KEYFRAME = 0x01
+
+MESSAGE_HEADER = struct.Struct('<2sBBIH')  # magic, sürüm, cihaz adı uzunluğu, şema crc32, çerçeve sayısı
+FRAME_HEADER = struct.Struct('<BQ')  # bayraklar, zaman damgası (ms)
+
+INT_NULL = -2 ** 31  # Tamsayı alanlarında None karşılığı, ondalık alanlarda NaN kullanılır
+
+# Sütun veri tipi -> (struct kodu, tür)
+COLUMN_CODECS = {
+    'INTEGER': ('i', 'int'),
+    'REAL': ('f', 'real'),
+    'BYTE': ('i', 'byte'),
+    'TEXT': ('i', 'text'),
+}
+
+
+def build_schema(columns, exclude=('timestamp', 'ts')):
+    """
+    config.yaml sütunlarından sabit düzenli ikili şema oluşturur.
+    TEXT sütunları bu projede register değeri taşıdığı için tamsayı olarak
+    kodlanır; BYTE sütunları ("0x0000") onaltılık metinden tamsayıya çevrilir.
+    Zaman damgası her çerçevenin başlığında taşındığından şemaya girmez.
+    :param columns: Sütun adı -> veri tipi sözlüğü
+    :param exclude: Şemaya alınmayacak sütunlar
+    :return: [(sütun adı, struct kodu, tür), ...]
+    """
+    schema = []
+    for col, dtype in columns.items():
+        if col in exclude:
+            continue
+        code, kind = COLUMN_CODECS.get(dtype.upper(), COLUMN_CODECS['TEXT'])
+        schema.append((col, code, kind))
+    return schema
+
+
+def schema_fingerprint(schema):
+    """
+    Şemanın crc32 özeti; kodlayıcı ve çözücünün aynı sütun düzenini kullandığını doğrular.
+    """
+    return zlib.crc32(",".join(f"{col}:{code}" for col, code, _ in schema).encode())
+
+
+def encode_value(value, kind):
+    if value is None:
+        return math.nan if kind == 'real' else INT_NULL
+    if kind == 'real':
+        return float(value)
+    if kind == 'byte' and isinstance(value, str):
+        return int(value, 16)
+    return int(value)
+
+
+def decode_value(value, kind):
+    if kind == 'real':
+        # float32 gürültüsünü temizlemek için 7 anlamlı basamağa yuvarlanır
+        return None if math.isnan(value) else float(f"{value:.7g}")
+    if value == INT_NULL:
+        return None
+    if kind == 'byte':
+        return f"0x{value:04x}"
+    if kind == 'text':
+        return str(value)
+    return value
+
+
+class TelemetryEncoder:
+    """
+    Telemetri örneklerini sütun şemasına göre sıkıştırılmış ikili mesaja çevirir.
+
+    Mesaj başlığında cihaz adı ve şema özeti bulunur; ardından her örnek bir
+    çerçeve olarak eklenir. Anahtar çerçeveler tüm alanları, ara çerçeveler
+    ise yalnızca bir önceki örneğe göre değişen alanları (bit maskesi ile)
+    taşır. Her mesaj bir anahtar çerçeveyle başlar, böylece mesajlar birbirinden
+    bağımsız çözülebilir; kaybolan bir mesaj sonrakileri etkilemez.
+    """
+    def __init__(self, columns, delta=True, keyframe_interval=50):
+        """
+        :param columns: Sütun adı -> veri tipi sözlüğü
+        :param delta: False ise tüm çerçeveler anahtar çerçeve olarak kodlanır
+        :param keyframe_interval: Mesaj içinde kaç çerçevede bir anahtar çerçeve gönderileceği
+        """
+        self.schema = build_schema(columns)
+        self.fingerprint = schema_fingerprint(self.schema)
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.mask_length = (len(self.schema) + 7) // 8
+        self.keyframe_struct = struct.Struct('<' + ''.join(code for _, code, _ in self.schema))
+
+    def encode_frame(self, ts, values, previous):
+        """
+        Tek bir örneği çerçeveye çevirir.
+        :param ts: Milisaniye cinsinden zaman damgası
+        :param values: Alan adıyla erişilebilen örnek değerleri
+        :param previous: Bir önceki örneğin ham değerleri, None ise anahtar çerçeve üretilir
+        :return: (çerçeve baytları, bu örneğin ham değerleri)
+        """
+        raw = [values.get(col) for col, _, _ in self.schema]
+        if previous is None:
+            packed = self.keyframe_struct.pack(*[encode_value(value, kind)
+                                                 for value, (_, _, kind) in zip(raw, self.schema)])
+            return (FRAME_HEADER.pack(FLAG_KEYFRAME, ts) + b'\xff' * self.mask_length + packed), raw
+
+        mask = 0
+        codes = []
+        changed = []
+        for i, (value, old, (_, code, kind)) in enumerate(zip(raw, previous, self.schema)):
+            if value != old:
+                mask |= 1 << i
+                codes.append(code)
+                changed.append(encode_value(value, kind))
+        return (FRAME_HEADER.pack(0, ts) + mask.to_bytes(self.mask_length, 'little')
+                + struct.pack('<' + ''.join(codes), *changed)), raw
+
+    def encode_message(self, device_name, samples):
+        """
+        Bir cihazın örneklerini tek mesajda kodlar.
+        :param device_name: Testere adı
+        :param samples: [(ts_ms, değerler), ...] veya build_telemetry çıktısı [{'ts', 'values'}, ...]
+        :return: Mesaj baytları
+        """
+        name = device_name.encode()
+        parts = [MESSAGE_HEADER.pack(MAGIC, VERSION, len(name), self.fingerprint, len(samples)), name]
+        previous = None
+        for i, sample in enumerate(samples):
+            ts, values = (sample['ts'], sample['values']) if isinstance(sample, dict) else sample
+            if not self.delta or i % self.keyframe_interval == 0:
+                previous = None
+            frame, previous = self.encode_frame(int(ts), values, previous)
+            parts.append(frame)
+        return b''.join(parts)
+
+
+class TelemetryDecoder:
+    """
+    TelemetryEncoder mesajlarını ingest tarafında ThingsBoard telemetri
+    formatına ({'ts', 'values'} listesi) geri çevirir.
+    """
+    def __init__(self, columns):
+        self.schema = build_schema(columns)
+        self.fingerprint = schema_fingerprint(self.schema)
+        self.mask_length = (len(self.schema) + 7) // 8
+        self.struct_cache = {}
+
+    def _frame_struct(self, mask):
+        frame_struct = self.struct_cache.get(mask)
+        if frame_struct is None:
+            frame_struct = struct.Struct('<' + ''.join(code for i, (_, code, _) in enumerate(self.schema)
+                                                       if mask >> i & 1))
+            self.struct_cache[mask] = frame_struct
+        return frame_struct
+
+    def decode_message(self, payload):
+        """
+        :param payload: TelemetryEncoder.encode_message çıktısı
+        :return: (cihaz adı, [{'ts': ms, 'values': {...}}, ...])
+        """
+        magic, version, name_length, fingerprint, frame_count = MESSAGE_HEADER.unpack_from(payload, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Tanınmayan telemetri mesajı: {magic!r} v{version}")
+        if fingerprint != self.fingerprint:
+            raise ValueError("Telemetri şeması uyuşmuyor, kodlayıcı ve çözücü farklı sütunlar kullanıyor")
+        offset = MESSAGE_HEADER.size
+        device_name = payload[offset:offset + name_length].decode()
+        offset += name_length
+
+        samples = []
+        current = [None] * len(self.schema)
+        have_keyframe = False
+        for _ in range(frame_count):
+            flags, ts = FRAME_HEADER.unpack_from(payload, offset)
+            offset += FRAME_HEADER.size
+            mask = int.from_bytes(payload[offset:offset + self.mask_length], 'little')
+            offset += self.mask_length
+            if flags & FLAG_KEYFRAME:
+                mask = (1 << len(self.schema)) - 1
+                have_keyframe = True
+            elif not have_keyframe:
+                raise ValueError("Mesaj anahtar çerçeve ile başlamıyor")
+
+            frame_struct = self._frame_struct(mask)
+            values = iter(frame_struct.unpack_from(payload, offset))
+            offset += frame_struct.size
+            for i, (_, _, kind) in enumerate(self.schema):
+                if mask >> i & 1:
+                    current[i] = decode_value(next(values), kind)
+            samples.append({'ts': ts, 'values': {col: value for (col, _, _), value in zip(self.schema, current)}})
+        return device_name, samples
+
+
+if __name__ == "__main__":
+    # JSON ve ikili kodlamanın örnek başına bayt ve CPU karşılaştırması
+    import json
+    import random
+    import time
+    import yaml
+    from data_handler import RegisterDecoder, record_columns
+    from mqtt_publisher import build_telemetry
+
+    columns = record_columns(yaml.safe_load(open("config.yaml")))
+    register_decoder = RegisterDecoder(columns, 38)
+
+    # Sabit kimlik alanları ve her örnekte değişen ölçümlerle sentetik kesim verisi
+    random.seed(0)
+    registers = [random.randint(0, 500) for _ in range(38)]
+    dynamic = [13, 15, 16, 17, 18, 21, 22, 23, 24, 33, 34]
+    samples = []
+    start_time = time.time()
+    for i in range(3000):
+        for index in dynamic:
+            registers[index] = max(0, registers[index] + random.randint(-3, 3))
+        record = register_decoder.decode(registers, start_time + i * 0.1)
+        record["fuzzy_output"] = random.uniform(-1, 1)
+        record["akim_degisim"] = random.uniform(-2, 2)
+        record["fuzzy_control"] = 1
+        samples.append(build_telemetry(record))
+
+    batch_size = 50
+    batches = [samples[i:i + batch_size] for i in range(0, len(samples), batch_size)]
+    decoder = TelemetryDecoder(columns)
+
+    def measure(name, encode):
+        begin = time.perf_counter()
+        payloads = [encode(batch) for batch in batches]
+        elapsed = time.perf_counter() - begin
+        size = sum(len(payload) for payload in payloads)
+        print(f"{name:<28} {size / len(samples):8.1f} B/örnek {elapsed / len(samples) * 1e6:8.1f} us/örnek")
+        return size, payloads
+
+    json_size, _ = measure("JSON (örnek başına mesaj)", lambda batch: b''.join(json.dumps(s).encode() for s in batch))
+    measure("JSON (toplu dizi)", lambda batch: json.dumps(batch).encode())
+    for label, delta in (("ikili (anahtar çerçeve)", False), ("ikili (delta)", True)):
+        encoder = TelemetryEncoder(columns, delta=delta)
+        size, payloads = measure(label, lambda batch: encoder.encode_message("testere", batch))
+        begin = time.perf_counter()
+        decoded = [sample for payload in payloads for sample in decoder.decode_message(payload)[1]]
+        elapsed = time.perf_counter() - begin
+        print(f"{'':<28} {json_size / size:8.1f}x küçük, çözme {elapsed / len(samples) * 1e6:.1f} us/örnek")
+        assert decoded[-1]['values']['serit_motor_akim_a'] == samples[-1]['values']['serit_motor_akim_a']
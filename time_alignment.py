@@ -0,0 +1,196 @@
+import time
+
+import numpy as np
+
+from cut_session import load_cut, load_cut_samples
+from frame_archive import FrameArchive
+
+# Karelerle yan yana getirilen sensör alanları: akım, hızlar ve titreşim
+DEFAULT_SAMPLE_FIELDS = (
+    "serit_motor_akim_a", "serit_kesme_hizi", "serit_inme_hizi",
+    "ivme_olcer_x", "ivme_olcer_y", "ivme_olcer_z", "serit_sapmasi",
+)
+
+
+class CaptureClock:
+    """
+    Kareler ve Modbus örnekleri için ortak yakalama saati. time.monotonic()'e
+    dayandığından NTP düzeltmelerinde geri gitmez ya da sıçramaz; süreç
+    başlangıcında duvar saatine sabitlendiğinden değerler time.time() ile
+    aynı ölçekte kalır ve veritabanındaki timestamp sütunuyla karşılaştırılabilir.
+    """
+    def __init__(self):
+        self.anchor_wall = time.time()
+        self.anchor_monotonic = time.monotonic()
+
+    def now(self):
+        return self.anchor_wall + (time.monotonic() - self.anchor_monotonic)
+
+    def from_monotonic(self, monotonic_time):
+        """
+        Daha önce alınmış bir time.monotonic() değerini bu saatin ölçeğine çevirir.
+        """
+        return self.anchor_wall + (monotonic_time - self.anchor_monotonic)
+
+
+# Süreçteki tüm yakalama thread'lerinin paylaştığı saat
+capture_clock = CaptureClock()
+
+
+def capture_time():
+    return capture_clock.now()
+
+
+class TimestampParser:
+    """
+    data_handler.TimestampFormatter çıktısını ('%Y-%m-%d %H:%M:%S.mmm', yerel saat)
+    Unix zamanına çevirir. Saniye kısmı aynı saniyedeki örnekler için tekrar çözülmez.
+    """
+    def __init__(self):
+        self.cached_prefix = None
+        self.cached_second = None
+
+    def parse(self, timestamp):
+        prefix, _, millisecond = timestamp.partition(".")
+        if prefix != self.cached_prefix:
+            self.cached_prefix = prefix
+            self.cached_second = time.mktime(time.strptime(prefix, "%Y-%m-%d %H:%M:%S"))
+        return self.cached_second + (int(millisecond) / 1000 if millisecond else 0.0)
+
+    def parse_many(self, timestamps):
+        return np.array([self.parse(timestamp) for timestamp in timestamps], dtype=np.float64)
+
+
+def nearest(reference_times, query_times, tolerance=None):
+    """
+    Her sorgu zamanı için sıralı referans dizisindeki en yakın elemanın sırası.
+    İki sıralı dizinin birleştirmesi searchsorted ile tek geçişte vektörel yapılır.
+    :param reference_times: Artan sıralı zamanlar
+    :param query_times: Sorgu zamanları
+    :param tolerance: En fazla zaman farkı (saniye); aşılırsa sıra -1 olur
+    :return: (sıralar, zaman farkları sorgu - referans)
+    """
+    reference_times = np.asarray(reference_times, dtype=np.float64)
+    query_times = np.asarray(query_times, dtype=np.float64)
+    if not len(reference_times):
+        return np.full(len(query_times), -1, dtype=np.int64), np.full(len(query_times), np.nan)
+    if len(reference_times) == 1:
+        indices = np.zeros(len(query_times), dtype=np.int64)
+    else:
+        right = np.clip(np.searchsorted(reference_times, query_times), 1, len(reference_times) - 1)
+        left = right - 1
+        use_left = query_times - reference_times[left] <= reference_times[right] - query_times
+        indices = np.where(use_left, left, right).astype(np.int64)
+    differences = query_times - reference_times[indices]
+    if tolerance is not None:
+        outside = np.abs(differences) > tolerance
+        indices[outside] = -1
+        differences[outside] = np.nan
+    return indices, differences
+
+
+class CutAlignment:
+    """
+    Bir kesimin kareleri ile sensör örneklerini zamana göre eşleştiren indeks.
+    Kareler ve örnekler yakalama zamanına göre sıralıdır; her kare en yakın
+    örneğe, her örnek en yakın kareye bağlanır. İndeks bir kez kurulur,
+    sonraki sorgular yalnızca searchsorted ve dizi dilimleridir.
+    """
+    def __init__(self, cut_id, frames, sample_times, samples, tolerance=0.5):
+        """
+        :param cut_id: Kesim numarası
+        :param frames: FrameArchive (kesim aralığı yüklenmiş)
+        :param sample_times: Örneklerin zamanları (artan)
+        :param samples: Alan adı -> değer dizisi
+        :param tolerance: Eşleştirmede izin verilen en büyük zaman farkı (saniye)
+        """
+        self.cut_id = cut_id
+        self.frames = frames
+        self.sample_times = np.asarray(sample_times, dtype=np.float64)
+        self.samples = samples
+        self.tolerance = tolerance
+        self.frame_sample, self.frame_offset = nearest(self.sample_times, frames.times, tolerance)
+        self.sample_frame, self.sample_offset = nearest(frames.times, self.sample_times, tolerance)
+
+    def at(self, query_time):
+        """
+        Verilen andaki kare ve örnek.
+        :return: (kare sırası veya None, örnek sırası veya None)
+        """
+        frame = self.frames.nearest(query_time)
+        sample, _ = nearest(self.sample_times, [query_time], self.tolerance)
+        return frame, (None if sample[0] < 0 else int(sample[0]))
+
+    def sample_for_frame(self, frame):
+        """
+        Karenin eşleştiği örneğin alan değerleri, eşleşme yoksa None.
+        """
+        sample = self.frame_sample[frame]
+        if sample < 0:
+            return None
+        return {field: values[sample] for field, values in self.samples.items()}
+
+    def frames_between(self, start_time, end_time):
+        """
+        Aralıktaki kareler ve her birinin eşleştiği örnek sırası.
+        :return: (kare sıraları, örnek sıraları)
+        """
+        frames = self.frames.between(start_time, end_time)
+        return frames, self.frame_sample[frames]
+
+    def join(self):
+        """
+        Kareleri eşleşen örneklerin değerleriyle yan yana döndürür (kare başına bir satır).
+        :return: pandas DataFrame
+        """
+        import pandas as pd
+
+        matched = self.frame_sample >= 0
+        table = {
+            "frame_number": self.frames.index["frame_number"],
+            "capture_time": self.frames.times,
+            "sample_offset_s": self.frame_offset,
+        }
+        for field, values in self.samples.items():
+            column = np.full(len(self.frame_sample), np.nan)
+            column[matched] = values[self.frame_sample[matched]]
+            table[field] = column
+        return pd.DataFrame(table)
+
+
+def align_cut(db_path, frames_root, cut_id, fields=DEFAULT_SAMPLE_FIELDS, tolerance=0.5):
+    """
+    Kesimin örneklerini (cut_id indeksi ile) ve kesim süresince yakalanan kareleri
+    (yalnızca kesişen segmentlerin indeksleri) okuyup eşleştirir.
+    :param db_path: Kesimin yazıldığı total.db
+    :param frames_root: Kare kayıt klasörü (oturum klasörü veya kökü)
+    :param fields: Karelerle eşleştirilecek örnek alanları
+    :return: CutAlignment, kesim yoksa None
+    """
+    cut = load_cut(db_path, cut_id)
+    if cut is None:
+        return None
+    rows = load_cut_samples(db_path, cut_id, ("timestamp",) + tuple(fields))
+    sample_times = TimestampParser().parse_many([row[0] for row in rows])
+    samples = {field: np.array([np.nan if row[i + 1] is None else row[i + 1] for row in rows], dtype=np.float64)
+               for i, field in enumerate(fields)}
+
+    parser = TimestampParser()
+    start_time = parser.parse(cut["start_time"]) - tolerance
+    end_time = parser.parse(cut["end_time"]) + tolerance
+    frames = FrameArchive(frames_root, start_time, end_time)
+    return CutAlignment(cut_id, frames, sample_times, samples, tolerance)
+
+
+if __name__ == "__main__":
+    # Kesimi karelerle gözden geçirme: python time_alignment.py <total.db> <kare klasörü> <cut_id>
+    import sys
+
+    alignment = align_cut(sys.argv[1], sys.argv[2], int(sys.argv[3]))
+    if alignment is None:
+        print("Kesim bulunamadı")
+    else:
+        table = alignment.join()
+        print(f"Kesim {alignment.cut_id}: {len(alignment.frames)} kare, {len(alignment.sample_times)} örnek, "
+              f"eşleşmeyen kare {int((alignment.frame_sample < 0).sum())}")
+        print(table.head(20).to_string())
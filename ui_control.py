@@ -8,12 +8,14 @@ import threading
 
 class UIControl:
     def __init__(self, root, toggle_fuzzy_control_callback, toggle_linear_control_callback,
-                 start_camera_callback, stop_camera_callback, plot_queue, close_app_callback, conn_status=0):
+                 start_camera_callback, stop_camera_callback, plot_queue, close_app_callback, conn_status=0,
+                 telemetry=None):
         self.toggle_fuzzy_control_callback = toggle_fuzzy_control_callback
         self.toggle_linear_control_callback = toggle_linear_control_callback
         self.start_camera_callback = start_camera_callback
         self.stop_camera_callback = stop_camera_callback
         self.plot_queue = plot_queue
+        self.telemetry = telemetry  # Verilirse grafik halka tampondan çizilir
         self.root = root
         self.close_app_callback = close_app_callback
         self.camera_running = False
@@ -137,7 +139,16 @@ class UIControl:
             self.root.after(100, self.update_frame_count)
 
     def update_plot(self):
-        while not self.plot_queue.empty():
+        if self.telemetry is not None:
+            # Son 10 saniyelik fuzzy çıkışı doğrudan tampondan okunur
+            times, values = self.telemetry.since(datetime.now().timestamp() - 10, 'fuzzy_output')
+            self.xdata = [datetime.fromtimestamp(t) for t in times]
+            self.ydata = values.copy()
+            self.line.set_data(self.xdata, self.ydata)
+            self.ax.relim()
+            self.ax.autoscale_view()
+
+        while self.plot_queue is not None and not self.plot_queue.empty():
             timestamp, y = self.plot_queue.get()
             # timestamp'ı datetime objesine dönüştür
             if isinstance(timestamp, str):